@@ -22,10 +22,21 @@
 """
 
 import os
+import hashlib
+import argparse
+import weakref
 import logging
 import pandas as pd
-from collections import defaultdict
-from typing import Dict, List, Optional
+import question_registry
+from logger import setup_logging
+from build_manifest import BuildManifest, fingerprint_value
+from question_registry import (
+    QuestionRegistry,
+    column_mapping_fingerprint,
+    load_column_mapping,
+    save_column_mapping,
+)
+from typing import Any, Dict, List, Optional
 from parameters import (
     get_path,                    # 获取单个文件或目录路径
     get_category_specific_path,  # 获取特定分类的路径
@@ -37,17 +48,25 @@ from parameters import (
     QUESTION_MAP,              # 问题编号到问题文本的映射
 )
 
-# 暂时注释掉日志配置
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('workflow.log', encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
+# 配置日志系统（全流程共用的日志后端）
+setup_logging()
 logger = logging.getLogger(__name__)
 
+# clean_text 的替换规则，按顺序执行
+CLEAN_TEXT_REPLACEMENTS = (
+    ('\n', ''), ('\r', ''), ('\\n', ''), ('\\r', ''),
+    ('\t', ' '), ('\\t', ' '),
+)
+
+# 预清理结果在 DataFrame.attrs 中的键名
+PRECLEANED_TEXT_ATTR = 'precleaned_text'
+
+# 构建清单中代表整个预处理阶段的目标名称
+STAGE_TARGET = '01:all'
+
+# 影响输出内容的代码文件，修改后全部输出视为过期
+CODE_FILES = (__file__, question_registry.__file__)
+
 def ensure_directory_exists(file_path: str) -> None:
     """
     确保文件路径的目录存在，如不存在则创建
@@ -84,11 +103,7 @@ def clean_text(text: str) -> str:
         text = str(text)
         
     # 处理换行符和制表符
-    replacements = {
-        '\n': '', '\r': '', '\\n': '', '\\r': '',
-        '\t': ' ', '\\t': ' '
-    }
-    for old, new in replacements.items():
+    for old, new in CLEAN_TEXT_REPLACEMENTS:
         text = text.replace(old, new)
         
     # 处理多余的空格
@@ -96,6 +111,99 @@ def clean_text(text: str) -> str:
     
     return text
 
+def clean_text_series(texts: pd.Series) -> pd.Series:
+    """
+    clean_text 的向量化版本，对整列文本一次性清理
+
+    参数:
+        texts: 任意类型的Series，每个值先按 str() 转为文本
+
+    返回:
+        pd.Series: 清理后的文本，与逐个调用 clean_text 的结果一致
+    """
+    texts = texts.map(str)
+    for old, new in CLEAN_TEXT_REPLACEMENTS:
+        texts = texts.str.replace(old, new, regex=False)
+    # \s 与 str.split() 使用相同的空白字符定义
+    return texts.str.replace(r'\s+', ' ', regex=True).str.strip()
+
+class PrecleanedText:
+    """
+    DataFrame 中所有问题列的预清理结果，供各文本生成函数直接按列读取
+
+    各生成函数原先逐行 iterrows，行内的值会按所在视图统一类型
+    （整表视图或 ['_id', 列] 两列视图，如整数ID在两列视图中可能变为浮点数），
+    这里分别保留两种视图下的取值，使输出与逐行处理时完全一致。
+
+    属性:
+        question_columns: 除 '_id' 外的列名（保持原有顺序）
+        frame_ids: 整表视图下每行的 '_id'
+        columns: 列名 -> {
+            'frame_text': 整表视图下每行清理后的回答，空值为 None,
+            'frame_nonblank': 每行回答去除首尾空白后是否非空（空值为 False）,
+            'pair_ids': 两列视图下非空回答对应的 '_id',
+            'pair_text': 两列视图下清理后的非空回答
+        }
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self._owner = weakref.ref(df)
+        self.question_columns = [col for col in df.columns if col != '_id']
+
+        frame_values = df.to_numpy()
+        column_positions = {col: i for i, col in enumerate(df.columns)}
+        self.frame_ids = frame_values[:, column_positions['_id']].tolist()
+        self.columns: Dict[str, Dict[str, List[Any]]] = {}
+
+        for column in self.question_columns:
+            valid_mask = df[column].notna().to_numpy()
+            frame_raw = pd.Series(frame_values[valid_mask, column_positions[column]], dtype=object)
+            frame_cleaned = clean_text_series(frame_raw).tolist()
+
+            frame_text: List[Optional[str]] = [None] * len(valid_mask)
+            frame_nonblank = [False] * len(valid_mask)
+            nonblank = (frame_raw.map(str).str.strip() != "").tolist()
+            for position, row_index in enumerate(valid_mask.nonzero()[0]):
+                frame_text[row_index] = frame_cleaned[position]
+                frame_nonblank[row_index] = nonblank[position]
+
+            # 两列视图的类型与整表视图相同时，取值完全一致，直接复用
+            pair_values = df[['_id', column]].to_numpy()
+            if pair_values.dtype == frame_values.dtype:
+                pair_ids = [self.frame_ids[i] for i in valid_mask.nonzero()[0]]
+                pair_text = frame_cleaned
+            else:
+                pair_ids = pair_values[valid_mask, 0].tolist()
+                pair_text = clean_text_series(pd.Series(pair_values[valid_mask, 1], dtype=object)).tolist()
+
+            self.columns[column] = {
+                'frame_text': frame_text,
+                'frame_nonblank': frame_nonblank,
+                'pair_ids': pair_ids,
+                'pair_text': pair_text,
+            }
+
+    def belongs_to(self, df: pd.DataFrame) -> bool:
+        """是否由该 DataFrame 计算得到（派生出的 DataFrame 会继承 attrs，需要区分）"""
+        return self._owner() is df
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> 'PrecleanedText':
+        # pandas 在派生 DataFrame/Series 时会深拷贝 attrs，共享引用即可，避免复制整份清理结果
+        return self
+
+def get_precleaned_text(df: pd.DataFrame) -> PrecleanedText:
+    """
+    获取 DataFrame 的预清理结果，首次调用时计算并缓存在 df.attrs 中
+
+    注意:
+        - 缓存计算后不应再修改 df 的内容
+    """
+    precleaned = df.attrs.get(PRECLEANED_TEXT_ATTR)
+    if not isinstance(precleaned, PrecleanedText) or not precleaned.belongs_to(df):
+        precleaned = PrecleanedText(df)
+        df.attrs[PRECLEANED_TEXT_ATTR] = precleaned
+    return precleaned
+
 def format_answer_with_id(id_: int, answer: str) -> str:
     """
     格式化带ID的回答文本
@@ -163,39 +271,6 @@ def get_all_question_numbers() -> List[int]:
     # 转换为列表并排序
     return sorted(list(all_numbers))
 
-def find_best_match_column(target_text: str, columns: List[str]) -> str:
-    """
-    在DataFrame的列名中找到与目标问题文本最匹配的列名
-    
-    参数:
-        target_text: 标准问题文本
-        columns: DataFrame中的列名列表
-        
-    返回:
-        str: 最匹配的列名
-    """
-    # 移除标点符号和空格后比较
-    def normalize_text(text: str) -> str:
-        return ''.join(char for char in text if char.isalnum())
-    
-    target_normalized = normalize_text(target_text)
-    
-    # 计算每个列名与目标文本的相似度
-    best_match = None
-    best_similarity = 0
-    
-    for col in columns:
-        col_normalized = normalize_text(col)
-        # 计算两个标准化文本之间的相似度
-        # 这里使用一个简单的包含关系检查
-        if target_normalized in col_normalized or col_normalized in target_normalized:
-            similarity = len(set(target_normalized) & set(col_normalized)) / len(set(target_normalized) | set(col_normalized))
-            if similarity > best_similarity:
-                best_similarity = similarity
-                best_match = col
-    
-    return best_match if best_match else columns[0]  # 如果没有找到匹配，返回第一个列名
-
 def load_raw_data() -> Optional[tuple[pd.DataFrame, Dict[int, str]]]:
     """
     加载并验证原始访谈数据，同时为问题建立题号映射
@@ -234,21 +309,39 @@ def load_raw_data() -> Optional[tuple[pd.DataFrame, Dict[int, str]]]:
         question_map[0] = '_id'
         logger.info("使用内部ID列 '_id' 映射到题号 0")
         
-        all_columns = [col for col in df.columns if col != '_id']
+        # 一次性建立 CSV 列 <-> 题号 的注册表，并在映射前集中报告未匹配的问题；
+        # CSV表头与大纲问题未变化时直接使用上次保存的列映射
+        outline_numbers = [q_num for q_num in ordered_question_numbers if q_num != 0]
+        mapping_file = get_path('UI_column_map')
+        fingerprint = column_mapping_fingerprint(
+            [col for col in df.columns if col != '_id'], QUESTION_MAP, outline_numbers
+        )
+        cached_mapping = load_column_mapping(mapping_file, fingerprint)
+        if cached_mapping is not None:
+            logger.info(f"使用已保存的列映射: {mapping_file}")
+        registry = QuestionRegistry(
+            df.columns,
+            QUESTION_MAP,
+            skip_headers=['_id'],
+            question_numbers=outline_numbers,
+            header_by_number=cached_mapping
+        )
+        if cached_mapping is None:
+            save_column_mapping(mapping_file, fingerprint, registry.header_by_number)
+        registry.log_unmatched(logger)
         
         for q_num in ordered_question_numbers:
             if q_num == 0:
                 continue
                 
-            standard_question = QUESTION_MAP.get(q_num)
-            if standard_question:
-                matched_column = find_best_match_column(standard_question, all_columns)
-                question_map[q_num] = matched_column
-                if matched_column in all_columns:
-                    all_columns.remove(matched_column)
-                logger.info(f"映射题号 {q_num} 到列 '{matched_column}'")
-            else:
+            entry = registry.entry_for_number(q_num)
+            if entry is None:
                 logger.warning(f"题号 {q_num} 在 QUESTION_MAP 中未找到对应的标准问题")
+                continue
+            if entry.header is None:
+                continue
+            question_map[q_num] = entry.header
+            logger.info(f"映射题号 {q_num} 到列 '{entry.header}'")
         
         missing_numbers = set(ordered_question_numbers) - set(question_map.keys())
         if missing_numbers:
@@ -296,39 +389,11 @@ def generate_by_question_text(df: pd.DataFrame) -> str:
 
         [ID:1] 回答2
         ...
+        
+    注意:
+        - 由 render_text_views 生成，需要多个视图时请直接调用它以避免重复遍历
     """
-    # logger.info("开始生成横向（按问题）格式文本")
-    
-    output_lines = []
-    first_question = True
-    
-    # 获取所有非ID列
-    question_columns = [col for col in df.columns if col != '_id']
-    
-    for column in question_columns:
-        # 除第一个问题外，其他问题前添加分隔线
-        if not first_question:
-            output_lines.append("---")
-            output_lines.append("")
-        else:
-            first_question = False
-            
-        # 添加问题
-        output_lines.append(f"{column}")
-        output_lines.append("")  # 问题和第一个回答之间空一行
-        
-        # 获取该问题的所有非空回答及对应的ID
-        valid_responses = df[['_id', column]].dropna(subset=[column])
-        
-        # 添加带ID的回答，每个回答之间空一行
-        for _, row in valid_responses.iterrows():
-            response = clean_text(str(row[column]))
-            formatted_response = format_answer_with_id(row['_id'], response)
-            output_lines.append(formatted_response)
-            output_lines.append("")  # 回答之间空一行
-    
-    # logger.info("成功生成横向格式文本")
-    return "\n".join(output_lines)
+    return render_text_views(df, {})['by_question']
 
 def generate_by_respondent_text(df: pd.DataFrame) -> str:
     """
@@ -354,46 +419,11 @@ def generate_by_respondent_text(df: pd.DataFrame) -> str:
         
         被访者：[ID:1]
         ...
+        
+    注意:
+        - 由 render_text_views 生成，需要多个视图时请直接调用它以避免重复遍历
     """
-    # logger.info("开始生成纵向（按被访者）格式文本")
-    
-    output_lines = []
-    first_respondent = True
-    
-    # 获取所有非ID列作为问题列
-    question_columns = [col for col in df.columns if col != '_id']
-    
-    for _, row in df.iterrows():
-        # 除第一个被访者外，其他被访者前添加分隔线
-        if not first_respondent:
-            output_lines.append("---")
-            output_lines.append("")
-        else:
-            first_respondent = False
-        
-        # 添加被访者标题（使用内部ID）
-        respondent_id = int(row['_id'])
-        output_lines.append(format_respondent_header(respondent_id))
-        output_lines.append("")  # 被访者标题后空一行
-        
-        # 添加每个问题和回答
-        first_question = True
-        for column in question_columns:
-            # 问题之间空一行（除第一个问题外）
-            if not first_question:
-                output_lines.append("")
-            else:
-                first_question = False
-                
-            # 处理空值情况并清理文本
-            answer = str(row[column]) if pd.notna(row[column]) else "未回答"
-            cleaned_answer = clean_text(answer)
-            
-            output_lines.append(f"问题：{column}")
-            output_lines.append(f"回答：{cleaned_answer}")
-    
-    # logger.info("成功生成纵向格式文本")
-    return "\n".join(output_lines)
+    return render_text_views(df, {})['by_respondent']
 
 def generate_category_question_texts(df: pd.DataFrame, column_question_map: Dict[int, str]) -> Dict[str, str]:
     """
@@ -411,92 +441,11 @@ def generate_category_question_texts(df: pd.DataFrame, column_question_map: Dict
             "分类1": "问题1\n\n[ID:0] 回答1\n\n[ID:1] 回答2\n\n---\n\n问题2...",
             "分类2": "..."
         }
-    """
-    # logger.info("=== 开始生成分类专题文本 ===")
-    # logger.info(f"DataFrame信息: 形状{df.shape}")
-    
-    category_texts = defaultdict(list)
-    
-    # 遍历OUTLINE，处理每个分类下的问题
-    for category, question_numbers in OUTLINE.items():
-        # logger.info(f"\n处理分类: '{category}'")
-        questions_processed = 0
-        questions_found = 0
-        first_question = True
-        
-        # 处理该分类下的每个问题编号
-        for q_num in question_numbers:
-            questions_processed += 1
-            # 使用column_question_map获取对应的列名
-            column_name = column_question_map.get(q_num)
-            
-            if column_name is None:
-                # logger.warning(f"  题号 {q_num} 在数据中未找到对应的列名")
-                continue
-                
-            # logger.info(f"  处理题号 {q_num}: {column_name}")
-            
-            if column_name in df.columns:
-                questions_found += 1
-                # 构建问题文本块
-                question_block_lines = []
-                
-                # 除第一个问题外，其他问题前添加分隔线
-                if not first_question:
-                    question_block_lines.append("---")
-                    question_block_lines.append("")
-                else:
-                    first_question = False
-                
-                # 添加问题标题（使用QUESTION_MAP中的标准问题文本）
-                question_text = QUESTION_MAP.get(q_num, column_name)
-                question_block_lines.append(question_text)
-                question_block_lines.append("")  # 问题和第一个回答之间空一行
-                
-                # 获取并添加所有非空回答，同时清理文本
-                valid_responses = df[['_id', column_name]].dropna(subset=[column_name])
-                # logger.info(f"    - 找到 {len(valid_responses)} 个非空回答")
-                
-                # 添加带ID的回答，每个回答之间空一行
-                for _, row in valid_responses.iterrows():
-                    response = clean_text(str(row[column_name]))
-                    formatted_response = format_answer_with_id(row['_id'], response)
-                    question_block_lines.append(formatted_response)
-                    question_block_lines.append("")  # 回答之间空一行
-                
-                # 将问题块添加到对应分类的列表中
-                block_text = "\n".join(question_block_lines)
-                category_texts[category].append(block_text)
-                # logger.info(f"    √ 成功处理题号 {q_num}")
-            else:
-                # logger.warning(f"    × 列名 '{column_name}' 未在DataFrame的列中找到")
-                pass
         
-        # logger.info(f"  分类 '{category}' 处理完成:")
-        # logger.info(f"  - 总问题数: {len(question_numbers)}")
-        # logger.info(f"  - 处理的问题数: {questions_processed}")
-        # logger.info(f"  - 成功找到的问题数: {questions_found}")
-    
-    # 将每个分类的问题块组合成最终文本
-    final_category_texts = {
-        cat: "\n".join(blocks) 
-        for cat, blocks in category_texts.items()
-    }
-    
-    # logger.info("\n=== 分类专题文本生成总结 ===")
-    # logger.info(f"- 处理的分类总数: {len(OUTLINE)}")
-    # logger.info(f"- 成功生成文本的分类数: {len(final_category_texts)}")
-    # for cat, text in final_category_texts.items():
-    #     logger.info(f"- 分类 '{cat}' 的文本长度: {len(text)} 字符")
-    # logger.info("=============================\n")
-    
-    return final_category_texts
-
-
-
-# 假设以下变量从您的项目中导入
-# from parameters import OUTLINE, QUESTION_MAP, APP_NAME, get_category_specific_path, SDIR_GROUP_UDATA
-# from utils import clean_text, save_text_file
+    注意:
+        - 由 render_text_views 生成，需要多个视图时请直接调用它以避免重复遍历
+    """
+    return render_text_views(df, column_question_map)['category_question']
 
 def generate_category_user_text(df: pd.DataFrame, column_question_map: Dict[int, str]) -> Dict[str, str]:
     """
@@ -514,74 +463,201 @@ def generate_category_user_text(df: pd.DataFrame, column_question_map: Dict[int,
             "分类1": "被访者：[ID:1]\n\n问题：问题A\n回答：回答A\n\n问题：问题B\n回答：回答B\n\n---\n\n被访者：[ID:2]...",
             "分类2": "..."
         }
+        
+    注意:
+        - 由 render_text_views 生成，需要多个视图时请直接调用它以避免重复遍历
     """
-    # logger.info("=== 开始为每个分类生成纵向用户文本 ===")
-    
-    # 初始化一个字典来存储每个分类的最终文本
-    final_category_texts = {}
+    return render_text_views(df, column_question_map)['category_user']
 
-    # 遍历OUTLINE，为每个分类生成一个独立的文本文件内容
-    for category, question_numbers in OUTLINE.items():
-        # logger.info(f"\n处理分类: '{category}'")
-        
-        user_blocks = [] # 用于存储当前分类下所有用户的数据块
-        
-        # 遍历DataFrame中的每一行（即每一个被访者）
-        for index, user_row in df.iterrows():
-            user_id = user_row['_id']
-            user_qa_block_lines = [] # 存储单个用户在该分类下的所有问答
-            
-            # 添加被访者ID作为数据块的开头
-            user_qa_block_lines.append(f"被访者：[ID:{user_id}]")
-            user_qa_block_lines.append("") # ID和第一个问题之间空一行
+def render_text_views(df: pd.DataFrame, column_question_map: Dict[int, str]) -> Dict[str, Any]:
+    """
+    单次遍历 DataFrame，同时生成横向、纵向、分类专题和分类纵向四种文本
 
-            # 遍历该分类下的每个问题编号
-            for q_num in question_numbers:
-                column_name = column_question_map.get(q_num)
-                
-                if column_name and column_name in df.columns:
-                    answer = user_row[column_name]
-                    
-                    # 仅当回答不为空时才处理
-                    if pd.notna(answer) and str(answer).strip() != "":
-                        question_text = QUESTION_MAP.get(q_num, column_name)
-                        cleaned_answer = clean_text(str(answer))
-                        
-                        user_qa_block_lines.append(f"问题：{question_text}")
-                        user_qa_block_lines.append(f"回答：{cleaned_answer}")
-                        user_qa_block_lines.append("") # 每个问答对之间空一行
-
-            # 只有当用户在该分类下有有效回答时，才创建该用户的数据块
-            # （检查 > 2 是因为块至少包含ID行和空行）
+    每个（被访者, 问题）单元格只读取一次预清理结果，再分发到四种视图：
+        - 纵向文本直接追加到当前被访者的段落
+        - 带ID的回答行按列收集，横向文本与分类专题文本共用
+        - 当前被访者的有效回答暂存，按分类组装分类纵向文本
+
+    参数:
+        df: 包含访谈数据的DataFrame
+        column_question_map: 题号到列名的映射字典
+
+    返回:
+        Dict[str, Any]: 包含:
+            - by_question: 横向格式文本 (str)
+            - by_respondent: 纵向格式文本 (str)
+            - category_question: 分类名称 -> 分类专题文本 (Dict[str, str])
+            - category_user: 分类名称 -> 分类纵向文本 (Dict[str, str])
+    """
+    precleaned = get_precleaned_text(df)
+    question_columns = precleaned.question_columns
+
+    # 各分类下有数据列的 (题号, 列名, 问题文本)，按 OUTLINE 顺序
+    category_questions = {
+        category: [
+            (q_num, column_map_name, QUESTION_MAP.get(q_num, column_map_name))
+            for q_num, column_map_name in ((q, column_question_map.get(q)) for q in question_numbers)
+            if column_map_name is not None and column_map_name in precleaned.columns
+        ]
+        for category, question_numbers in OUTLINE.items()
+    }
+
+    answer_lines_by_column: Dict[str, List[str]] = {column: [] for column in question_columns}
+    pair_cursor = {column: 0 for column in question_columns}
+    respondent_lines: List[str] = []
+    user_blocks_by_category: Dict[str, List[str]] = {category: [] for category in OUTLINE}
+
+    for row_index, row_id in enumerate(precleaned.frame_ids):
+        # 纵向文本：除第一个被访者外，其他被访者前添加分隔线
+        if row_index > 0:
+            respondent_lines.append("---")
+            respondent_lines.append("")
+        respondent_lines.append(format_respondent_header(int(row_id)))
+        respondent_lines.append("")  # 被访者标题后空一行
+
+        nonblank_answers: Dict[str, str] = {}
+        for column_index, column in enumerate(question_columns):
+            column_text = precleaned.columns[column]
+            cleaned_answer = column_text['frame_text'][row_index]
+
+            # 纵向文本：问题之间空一行，空值记为"未回答"
+            if column_index > 0:
+                respondent_lines.append("")
+            respondent_lines.append(f"问题：{column}")
+            respondent_lines.append(f"回答：{cleaned_answer if cleaned_answer is not None else '未回答'}")
+
+            if cleaned_answer is None:
+                continue
+
+            # 横向/分类专题文本：带ID的回答行
+            position = pair_cursor[column]
+            pair_cursor[column] = position + 1
+            answer_lines_by_column[column].append(
+                format_answer_with_id(column_text['pair_ids'][position], column_text['pair_text'][position])
+            )
+
+            # 分类纵向文本：仅保留去除空白后非空的回答
+            if column_text['frame_nonblank'][row_index]:
+                nonblank_answers[column] = cleaned_answer
+
+        # 分类纵向文本：组装当前被访者在每个分类下的问答块
+        for category, questions in category_questions.items():
+            user_qa_block_lines = [f"被访者：[ID:{row_id}]", ""]
+            for _, column_name, question_text in questions:
+                if column_name in nonblank_answers:
+                    user_qa_block_lines.append(f"问题：{question_text}")
+                    user_qa_block_lines.append(f"回答：{nonblank_answers[column_name]}")
+                    user_qa_block_lines.append("")
+            # 只有当被访者在该分类下有有效回答时才创建数据块，并移除最后一个多余的空行
             if len(user_qa_block_lines) > 2:
-                # 移除最后一个多余的空行
-                if user_qa_block_lines[-1] == "":
-                    user_qa_block_lines.pop()
+                user_qa_block_lines.pop()
+                user_blocks_by_category[category].append("\n".join(user_qa_block_lines))
+
+    def question_block_lines(header: str, column: str) -> List[str]:
+        # 问题标题后空一行，每个回答之后空一行
+        lines = [header, ""]
+        for answer_line in answer_lines_by_column[column]:
+            lines.append(answer_line)
+            lines.append("")
+        return lines
+
+    # 横向文本：问题之间用分隔线隔开
+    question_lines: List[str] = []
+    for column_index, column in enumerate(question_columns):
+        if column_index > 0:
+            question_lines.extend(["---", ""])
+        question_lines.extend(question_block_lines(column, column))
+
+    # 分类专题文本：使用 QUESTION_MAP 中的标准问题文本作为标题
+    category_question_texts: Dict[str, str] = {}
+    for category, questions in category_questions.items():
+        blocks = []
+        for _, column_name, question_text in questions:
+            block_lines = ["---", ""] if blocks else []
+            block_lines.extend(question_block_lines(question_text, column_name))
+            blocks.append("\n".join(block_lines))
+        if blocks:
+            category_question_texts[category] = "\n".join(blocks)
+
+    category_user_texts = {
+        category: "\n\n---\n\n".join(user_blocks)
+        for category, user_blocks in user_blocks_by_category.items()
+        if user_blocks
+    }
 
-                user_blocks.append("\n".join(user_qa_block_lines))
+    return {
+        'by_question': "\n".join(question_lines),
+        'by_respondent': "\n".join(respondent_lines),
+        'category_question': category_question_texts,
+        'category_user': category_user_texts,
+    }
 
-        # 将所有用户的数据块用分隔符连接起来，形成该分类的最终文本
-        if user_blocks:
-            final_category_texts[category] = "\n\n---\n\n".join(user_blocks)
-            # logger.info(f"  √ 分类 '{category}' 的纵向文本已生成")
-        else:
-            # logger.warning(f"  - 分类 '{category}' 未生成纵向文本（可能所有用户在该分类下均无有效回答）")
-            pass
+def compute_stage_inputs(manifest: BuildManifest) -> Dict[str, Optional[str]]:
+    """
+    整个预处理阶段的输入指纹：-id.csv 文件、访谈大纲（分类与问题文本）以及生成输出的代码
 
-    # logger.info("\n=== 分类纵向用户文本生成完成 ===")
-    return final_category_texts
+    返回:
+        Dict[str, Optional[str]]: 输入名到指纹的映射，-id.csv 缺失时其指纹为 None
+    """
+    return {
+        'UI_id': manifest.hash_file(get_path('UI_id')),
+        'outline': fingerprint_value({'outline': OUTLINE, 'questions': QUESTION_MAP}),
+        'code': fingerprint_value([manifest.hash_file(path) for path in CODE_FILES]),
+    }
+
+def compute_category_inputs(df: pd.DataFrame, column_question_map: Dict[int, str],
+                            category: str, code_fingerprint: Optional[str]) -> Dict[str, Optional[str]]:
+    """
+    分类文本的输入指纹：该分类的问题集合（题号、列名、问题文本）与对应列的数据
+
+    参数:
+        df: 包含访谈数据的DataFrame
+        column_question_map: 题号到列名的映射字典
+        category: 分类名称
+        code_fingerprint: 生成输出的代码指纹
+    """
+    questions = [
+        (q_num, column_question_map[q_num], QUESTION_MAP.get(q_num, column_question_map[q_num]))
+        for q_num in OUTLINE.get(category, [])
+        if column_question_map.get(q_num) in df.columns
+    ]
+    columns = ['_id'] + [column for _, column, _ in questions]
+    data_hash = hashlib.sha1(
+        pd.util.hash_pandas_object(df[columns], index=False).to_numpy().tobytes()
+    ).hexdigest()
+    return {'questions': fingerprint_value(questions), 'data': data_hash, 'code': code_fingerprint}
+
+def parse_arguments() -> argparse.Namespace:
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="访谈数据预处理：生成横向、纵向与分类文本")
+    parser.add_argument('--force', action='store_true',
+                        help="忽略构建清单，重新生成全部输出文件")
+    return parser.parse_args()
 
 def main() -> None:
     """
     主函数：协调整个数据转换流程
+
+    根据 APP_PATH 下的构建清单增量生成：输入未变化且输出完好时整个阶段直接跳过；
+    否则只重新写出输入指纹发生变化的文件。
     """
+    args = parse_arguments()
     logger.info("开始数据转换流程")
     
+    manifest = BuildManifest(get_path('build_manifest'))
+    stage_inputs = compute_stage_inputs(manifest)
+    if not args.force and manifest.is_up_to_date(STAGE_TARGET, stage_inputs):
+        logger.info(f"输入未变化且输出完好，跳过预处理 (构建清单: {get_path('build_manifest')})")
+        manifest.save()
+        return
+    
     # 用于收集生成的文件信息
     horizontal_file = None
     vertical_file = None
     category_q_files = []
     category_u_files = []
+    skipped_files = []
+    stage_outputs = []
     
     # 加载原始数据
     result = load_raw_data()
@@ -591,62 +667,92 @@ def main() -> None:
         
     df, column_question_map = result
     
-    # 生成横向格式文本
-    horizontal_text = generate_by_question_text(df)
+    # 单次遍历生成全部四种文本
+    text_views = render_text_views(df, column_question_map)
+    
+    def build_target(target: str, inputs: Dict[str, Optional[str]], content: str, file_path: str) -> Optional[bool]:
+        """写出单个目标：输入未变化时跳过并返回 None，否则返回是否保存成功"""
+        stage_outputs.append(file_path)
+        if not args.force and manifest.is_up_to_date(target, inputs):
+            skipped_files.append(file_path)
+            return None
+        if not save_text_file(content, file_path):
+            return False
+        manifest.record(target, inputs, [file_path])
+        return True
+    
+    whole_data_inputs = {'UI_id': stage_inputs['UI_id'], 'code': stage_inputs['code']}
+    
+    # 保存横向格式文本
     horizontal_path = get_path('UI_qtxt')
-    if save_text_file(horizontal_text, horizontal_path):
+    saved = build_target('01:UI_qtxt', whole_data_inputs, text_views['by_question'], horizontal_path)
+    if saved is False:
+        logger.error("保存横向格式文本失败，退出程序")
+        return
+    if saved:
         horizontal_file = {
             "name": os.path.basename(horizontal_path),
             "path": os.path.dirname(horizontal_path)
         }
-    else:
-        logger.error("保存横向格式文本失败，退出程序")
-        return
     
-    # 生成纵向格式文本
-    vertical_text = generate_by_respondent_text(df)
+    # 保存纵向格式文本
     vertical_path = get_path('UI_utxt')
-    if save_text_file(vertical_text, vertical_path):
+    saved = build_target('01:UI_utxt', whole_data_inputs, text_views['by_respondent'], vertical_path)
+    if saved is False:
+        logger.error("保存纵向格式文本失败，退出程序")
+        return
+    if saved:
         vertical_file = {
             "name": os.path.basename(vertical_path),
             "path": os.path.dirname(vertical_path)
         }
-    else:
-        logger.error("保存纵向格式文本失败，退出程序")
-        return
     
-    # 生成并保存分类专题文本
-    category_texts = generate_category_question_texts(df, column_question_map)
+    # 保存分类专题文本
+    category_texts = text_views['category_question']
+    category_inputs = {
+        category: compute_category_inputs(df, column_question_map, category, stage_inputs['code'])
+        for category in OUTLINE
+    }
     
     for category, text in category_texts.items():
         category_path = get_category_specific_path(category, SDIR_GROUP_QDATA)
         file_name = f"{APP_NAME}_question_{category}.txt"
         file_path = os.path.join(category_path, file_name)
-        if save_text_file(text, file_path):
+        saved = build_target(f"01:question:{category}", category_inputs[category], text, file_path)
+        if saved:
             category_q_files.append({
                 "name": file_name,
                 "path": category_path
             })
-        else:
+        elif saved is False:
             logger.error(f"保存分类 '{category}' 的文本失败")
 
     # --- 开始纵向分类文本处理 (新增部分) ---
-    logger.info("开始生成纵向(按用户)分类文本...")
-    category_user_texts = generate_category_user_text(df, column_question_map)
+    logger.info("开始保存纵向(按用户)分类文本...")
+    category_user_texts = text_views['category_user']
 
     for category, text in category_user_texts.items():
         # 使用新的 SDIR_GROUP_UDATA
         category_path = get_category_specific_path(category, SDIR_GROUP_UDATA) 
         file_name = f"{APP_NAME}_user_{category}.txt"
         file_path = os.path.join(category_path, file_name)
-        if save_text_file(text, file_path):
+        saved = build_target(f"01:user:{category}", category_inputs[category], text, file_path)
+        if saved:
             category_u_files.append({
                 "name": file_name,
                 "path": category_path
             })
-        else:
+        elif saved is False:
             logger.error(f"保存纵向分类 '{category}' 的文本失败")
     
+    # 全部目标都已是最新时记录整个阶段，下次运行可直接跳过
+    if all(manifest.is_up_to_date(target, inputs) for target, inputs in
+           [('01:UI_qtxt', whole_data_inputs), ('01:UI_utxt', whole_data_inputs)]
+           + [(f"01:question:{category}", category_inputs[category]) for category in category_texts]
+           + [(f"01:user:{category}", category_inputs[category]) for category in category_user_texts]):
+        manifest.record(STAGE_TARGET, stage_inputs, stage_outputs)
+    manifest.save()
+    
     # 打印生成文件的总结报告
     logger.info("\n=== 文件生成报告 ===")
     
@@ -672,6 +778,9 @@ def main() -> None:
             full_path = os.path.join(file_info['path'], file_info['name'])
             logger.info(f"文件{i}: {full_path}")
     
+    if skipped_files:
+        logger.info(f"输入未变化、未重新生成的文件: {len(skipped_files)} 个")
+    
     logger.info("\n数据转换流程成功完成")
 
 if __name__ == "__main__":
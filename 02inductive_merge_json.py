@@ -6,9 +6,19 @@
 
 数据流程：
 1. 通过 parameters.py 接口获取所有归纳编码JSON文件路径
-2. 验证文件完整性和格式
+2. 流式读取并验证文件（增量合并索引中未变化的文件直接复用上次的合并结果）
 3. 合并所有JSON文件内容
-4. 保存合并后的数据
+4. 保存合并后的数据，并更新增量合并索引
+5. 将合并结果写入列式编码存储 (coding_store)，供 03/04 直接按表读取
+
+输入文件通过 json_stream 流式读取：问题对象的 initial_codes 逐条目解码、验证，
+并立即按输出格式写入暂存文件 (QuestionSpool)，内存中只保留问题文本与 respondent_id，
+保存时再把各问题对象的文本按顺序拷贝到输出文件，任何阶段都不会完整载入文档。
+
+增量合并索引 (inductive_merge_index) 记录每个输入文件的大小、修改时间、SHA-1，
+以及合并结果中每个问题对象来自哪个文件的第几个元素、位于合并结果的哪个字节区间。
+重复运行时只重新解析、验证内容发生变化的文件，其余问题对象的文本直接从上次的合并结果中拷贝，
+再按原有规则排序拼接；所有输入均未变化且合并结果完好时不重写输出文件。
 
 依赖说明：
 - parameters.py: 项目配置和路径管理
@@ -16,20 +26,25 @@
 
 import os
 import json
+import hashlib
 import logging
 import re
+import tempfile
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import List, Dict, Any, Optional, Tuple
-
-# 配置日志系统
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('workflow.log', encoding='utf-8'),
-        logging.StreamHandler()
-    ]
+from typing import List, Dict, Any, BinaryIO, Iterable, Optional, Tuple
+
+import numpy as np
+
+from logger import setup_logging
+from coding_store import CodingStore, build_coding_store
+from json_stream import (
+    ITEM, QUESTION_END, QUESTION_FIELD, QUESTION_START, STREAM_END, STREAM_ENTRY, STREAM_START,
+    JsonRootTypeError, JsonStreamError, iter_question_events
 )
+
+# 配置日志系统（全流程共用的日志后端）
+setup_logging()
 logger = logging.getLogger(__name__)
 
 try:
@@ -43,52 +58,310 @@ except ImportError as e:
     logger.critical(f"无法从 parameters.py 导入配置: {e}")
     raise
 
+# 是否启用增量合并索引（False 时每次都重新解析全部输入文件）
+USE_MERGE_INDEX = True
+
+# 增量合并索引格式版本，结构变化时递增以使旧索引失效
+MERGE_INDEX_FORMAT_VERSION = 2
+
+# 是否在合并结果之外生成列式编码存储（供 03/04 直接按表读取）
+USE_CODING_STORE = True
+
+# 拷贝问题对象文本时每次读取的字节数
+COPY_CHUNK_SIZE = 1 << 20
+
+# 每个问题对象必须包含的字段
+REQUIRED_QUESTION_FIELDS = ('question_text', 'initial_codes', 'codes', 'themes')
+
 
 # ======================================================================
 # 1. 输入机制模块 (@ds-n1-load)
 # ======================================================================
 
-def validate_json_file(file_path: str) -> Tuple[bool, Optional[List[Dict[str, Any]]]]:
+@dataclass
+class FileDiagnostics:
+    """单个输入文件在唯一一次解析中收集到的全部问题，供合并与问题汇总报告共用"""
+    filename: str
+    structure_issues: List[str] = field(default_factory=list)
+    field_issues: List[str] = field(default_factory=list)
+    question_count: Optional[int] = None  # 根结构为列表时的元素个数
+
+    @property
+    def is_valid(self) -> bool:
+        return not self.structure_issues and not self.field_issues
+
+
+@dataclass
+class QuestionSegment:
     """
-    验证JSON文件的有效性和格式
+    合并结果中的一个问题对象：其按输出格式序列化后的文本位于暂存文件或上次的合并结果中
+
+    属性:
+        file_path: 来源文件路径
+        file_index: 在来源文件中的位置
+        offset, length: 序列化文本的字节位置
+        in_output: True 表示文本位于上次的合并结果中（文件未变化、复用），否则位于 QuestionSpool 中
+        question_text: 问题文本（只对本次重新解析的问题记录）
+        respondent_ids: 各 initial_codes 条目的 respondent_id（只对本次重新解析的问题记录）
+    """
+    file_path: str
+    file_index: int
+    offset: int
+    length: int
+    in_output: bool = False
+    question_text: Optional[str] = None
+    respondent_ids: Optional[List[Any]] = None
+
+
+class QuestionSpool:
+    """新解析的问题对象按合并结果中的格式逐段写入的临时文件，合并时再按顺序拷贝到输出文件"""
+
+    def __init__(self):
+        self._file = tempfile.TemporaryFile()
+
+    def __enter__(self) -> 'QuestionSpool':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._file.close()
+
+    def tell(self) -> int:
+        return self._file.seek(0, os.SEEK_END)
+
+    def write(self, text: str) -> None:
+        self._file.write(text.encode('utf-8'))
+
+    def copy_to(self, target: BinaryIO, offset: int, length: int) -> None:
+        _copy_byte_range(self._file, target, offset, length)
+
+
+def _copy_byte_range(source: BinaryIO, target: BinaryIO, offset: int, length: int) -> None:
+    source.seek(offset)
+    while length > 0:
+        chunk = source.read(min(COPY_CHUNK_SIZE, length))
+        if not chunk:
+            raise IOError("源文件在拷贝过程中被截断")
+        target.write(chunk)
+        length -= len(chunk)
+
+
+def _format_json_value(value: Any, depth: int) -> str:
+    """按 json.dump(indent=2) 在第 depth 层嵌套中的格式序列化一个值"""
+    return json.dumps(value, ensure_ascii=False, indent=2).replace('\n', '\n' + '  ' * depth)
+
+
+def diagnose_json_file(file_path: str,
+                       spool: Optional[QuestionSpool] = None) -> Tuple[FileDiagnostics, Optional[List[QuestionSegment]]]:
+    """
+    流式读取JSON文件一次，同时完成验证、问题收集，并把问题对象写入暂存文件
+
+    问题对象的 initial_codes 逐条目读取并立即写出，任何时候只有一个条目在内存中。
+    只为文件的第一个问题输出日志，全部问题记录在诊断结果中。
 
     参数:
         file_path: JSON文件路径
+        spool: 问题对象的暂存文件，为 None 时只做诊断
 
     返回:
-        Tuple[bool, Optional[List[Dict[str, Any]]]]: 
-            - 验证结果（True/False）
-            - 验证通过时返回解析后的数据，失败时返回None
+        Tuple[FileDiagnostics, Optional[List[QuestionSegment]]]:
+            - 文件的诊断结果
+            - 验证通过时返回各问题对象的片段，失败时返回None
     """
+    filename = os.path.basename(file_path)
+    diagnostics = FileDiagnostics(filename, question_count=0)
+    segments: List[QuestionSegment] = []
+    emit = spool.write if spool is not None else (lambda text: None)
+
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            
-        if not isinstance(data, list):
-            logger.warning(f"文件格式错误 '{os.path.basename(file_path)}': 根结构不是列表")
-            return False, None
-            
-        # 验证每个问题对象的结构
-        for idx, item in enumerate(data):
-            if not isinstance(item, dict):
-                logger.warning(f"文件 '{os.path.basename(file_path)}' 中第 {idx+1} 个元素不是字典")
-                return False, None
-                
-            # 验证必需字段
-            required_fields = ['question_text', 'initial_codes', 'codes', 'themes']
-            missing_fields = [field for field in required_fields if field not in item]
-            if missing_fields:
-                logger.warning(f"文件 '{os.path.basename(file_path)}' 中第 {idx+1} 个元素缺少必需字段: {missing_fields}")
-                return False, None
-        
-        return True, data
-        
-    except json.JSONDecodeError as e:
-        logger.error(f"JSON解析错误 '{os.path.basename(file_path)}': {e}")
-        return False, None
+        for event, index, payload in iter_question_events(file_path, stream_key='initial_codes'):
+            if event == QUESTION_START:
+                diagnostics.question_count += 1
+                keys: List[str] = []
+                respondent_ids: List[Any] = []
+                question_text = 'Unknown Question'
+                start = spool.tell() if spool is not None else 0
+                emit('  {')
+            elif event == QUESTION_FIELD:
+                key, value = payload
+                emit((',' if keys else '') + '\n    ' + json.dumps(key, ensure_ascii=False) + ': '
+                     + _format_json_value(value, 2))
+                keys.append(key)
+                if key == 'question_text':
+                    question_text = value
+                elif key == 'initial_codes':
+                    # initial_codes 不是数组，无法读取 respondent_id
+                    respondent_ids = [None]
+            elif event == STREAM_START:
+                emit((',' if keys else '') + '\n    ' + json.dumps(payload, ensure_ascii=False) + ': [')
+                keys.append(payload)
+                entry_count = 0
+            elif event == STREAM_ENTRY:
+                emit((',' if entry_count else '') + '\n      ' + _format_json_value(payload, 3))
+                entry_count += 1
+                respondent_ids.append(payload.get('respondent_id') if isinstance(payload, dict) else None)
+            elif event == STREAM_END:
+                emit('\n    ]' if entry_count else ']')
+            elif event == QUESTION_END:
+                emit('\n  }' if keys else '}')
+                missing_fields = [field_name for field_name in REQUIRED_QUESTION_FIELDS if field_name not in keys]
+                if missing_fields:
+                    if diagnostics.is_valid:
+                        logger.warning(f"文件 '{filename}' 中第 {index+1} 个元素缺少必需字段: {missing_fields}")
+                    diagnostics.field_issues.append(f"  - {filename}: 缺少字段 {', '.join(missing_fields)}")
+                elif spool is not None:
+                    segments.append(QuestionSegment(file_path, index, start, spool.tell() - start,
+                                                    question_text=question_text, respondent_ids=respondent_ids))
+            elif event == ITEM:
+                diagnostics.question_count += 1
+                if diagnostics.is_valid:
+                    logger.warning(f"文件 '{filename}' 中第 {index+1} 个元素不是字典")
+                diagnostics.structure_issues.append(f"  - {filename}: 包含非字典类型的元素")
+    except JsonRootTypeError:
+        logger.warning(f"文件格式错误 '{filename}': 根结构不是列表")
+        return FileDiagnostics(filename, structure_issues=[f"  - {filename}: 根结构不是列表"]), None
+    except JsonStreamError as e:
+        logger.error(f"JSON解析错误 '{filename}': {e}")
+        return FileDiagnostics(filename, structure_issues=[f"  - {filename}: JSON解析失败"]), None
     except Exception as e:
-        logger.error(f"验证文件时发生错误 '{os.path.basename(file_path)}': {e}")
-        return False, None
+        logger.error(f"验证文件时发生错误 '{filename}': {e}")
+        return FileDiagnostics(filename, structure_issues=[f"  - {filename}: 其他错误 - {str(e)}"]), None
+
+    return diagnostics, (segments if diagnostics.is_valid else None)
+
+def _file_sha1(file_path: str) -> str:
+    with open(file_path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+class MergeIndex:
+    """
+    增量合并索引：输入文件状态与合并结果中各问题对象的来源与字节位置
+
+    参数:
+        index_file: 索引文件路径
+        output_file: 合并结果文件路径；索引只在合并结果与记录时一致时有效
+
+    索引结构:
+        {"version": 2,
+         "output": {"size": int, "mtime_ns": int},
+         "files": {绝对路径: {"size": int, "mtime_ns": int, "sha1": str}, ...},
+         "entries": [[绝对路径, 文件内位置, 字节偏移, 字节长度], ...]}   # 与合并结果中的问题对象一一对应
+    """
+
+    def __init__(self, index_file: str, output_file: str):
+        self.index_file = index_file
+        self.output_file = output_file
+        self._files: Dict[str, Dict[str, Any]] = {}
+        self._cached_segments: Dict[str, List[QuestionSegment]] = {}
+        self._new_files: Dict[str, Dict[str, Any]] = {}
+        self._entries: List[List[Any]] = []
+        self.reused_files = 0
+        self.parsed_files = 0
+        self.load()
+
+    @staticmethod
+    def _stat(file_path: str) -> Optional[Dict[str, int]]:
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+    def load(self) -> bool:
+        """
+        加载索引，索引缺失、格式不一致或合并结果在外部被修改时从空索引开始
+
+        返回:
+            bool: 是否成功加载
+        """
+        if not self.index_file or not os.path.exists(self.index_file):
+            return False
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                payload = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"读取增量合并索引失败，将重新解析全部文件: {e}")
+            return False
+        if not isinstance(payload, dict) or payload.get('version') != MERGE_INDEX_FORMAT_VERSION:
+            logger.info("增量合并索引格式已变化，将重新解析全部文件")
+            return False
+        if payload.get('output') != self._stat(self.output_file):
+            logger.info("合并结果文件缺失或已在外部修改，将重新解析全部文件")
+            return False
+
+        cached_segments: Dict[str, List[QuestionSegment]] = {}
+        for file_path, file_index, offset, length in payload.get('entries', []):
+            cached_segments.setdefault(file_path, []).append(
+                QuestionSegment(file_path, file_index, offset, length, in_output=True))
+        self._files = payload.get('files', {})
+        self._cached_segments = {
+            file_path: sorted(segments, key=lambda segment: segment.file_index)
+            for file_path, segments in cached_segments.items()
+        }
+        return True
+
+    def cached_segments(self, file_path: str) -> Optional[List[QuestionSegment]]:
+        """文件内容与上次合并时一致时返回其问题对象在合并结果中的片段，否则返回 None（需要重新解析）"""
+        key = os.path.abspath(file_path)
+        record = self._files.get(key)
+        segments = self._cached_segments.get(key)
+        state = self._stat(key)
+        if record is None or segments is None or state is None:
+            return None
+        if state['size'] != record['size'] or state['mtime_ns'] != record['mtime_ns']:
+            # 修改时间变化但内容未变（如被重新保存）时仍可复用
+            sha1 = _file_sha1(key)
+            if sha1 != record['sha1']:
+                return None
+            record = {**state, 'sha1': sha1}
+        self._new_files[key] = record
+        self.reused_files += 1
+        return [QuestionSegment(file_path, segment.file_index, segment.offset, segment.length, in_output=True)
+                for segment in segments]
+
+    def update(self, file_path: str) -> None:
+        """记录重新解析并验证通过的文件的当前状态"""
+        key = os.path.abspath(file_path)
+        state = self._stat(key)
+        if state is not None:
+            self._new_files[key] = {**state, 'sha1': _file_sha1(key)}
+        self.parsed_files += 1
+
+    def set_entries(self, segments: List[QuestionSegment], positions: List[Tuple[int, int]]) -> None:
+        """记录合并结果中每个问题对象的来源与其在新合并结果中的字节位置"""
+        self._entries = [[os.path.abspath(segment.file_path), segment.file_index, offset, length]
+                         for segment, (offset, length) in zip(segments, positions)]
+
+    def is_unchanged(self) -> bool:
+        """本次合并的输入文件集合与内容均与上次一致（合并结果无需重写）"""
+        return self.parsed_files == 0 and set(self._new_files) == set(self._files)
+
+    def save(self) -> bool:
+        """
+        合并结果保存后写入索引（先写临时文件再原子替换）
+
+        返回:
+            bool: 是否写入成功
+        """
+        if not self.index_file:
+            return False
+        temp_file = f"{self.index_file}.tmp"
+        try:
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'version': MERGE_INDEX_FORMAT_VERSION,
+                    'output': self._stat(self.output_file),
+                    'files': self._new_files,
+                    'entries': self._entries,
+                }, f, ensure_ascii=False)
+            os.replace(temp_file, self.index_file)
+            return True
+        except OSError as e:
+            logger.error(f"保存增量合并索引失败 '{self.index_file}': {e}")
+            return False
 
 def get_all_inductive_json_paths() -> Optional[List[str]]:
     """
@@ -176,16 +449,23 @@ def natural_sort_key(filename: str) -> Tuple[int, str]:
     primary_key = numbers[0] if numbers else 0
     return (primary_key, filename)
 
-def merge_all_inductive_jsons(file_paths_list: List[str]) -> List[Dict[str, Any]]:
+def merge_all_inductive_jsons(file_paths_list: List[str],
+                              spool: QuestionSpool,
+                              merge_index: Optional[MergeIndex] = None,
+                              diagnostics: Optional[Dict[str, FileDiagnostics]] = None) -> List[QuestionSegment]:
     """
-    接收一个扁平的文件路径列表，将所有JSON文件的内容合并成一个单一的列表。
+    接收一个扁平的文件路径列表，将所有JSON文件的问题对象按顺序合并成一个单一的列表。
     使用更灵活的排序机制，不再严格依赖序号。
+    问题对象不在内存中保存：每个文件流式读取一次，序列化后的文本写入暂存文件，这里只排列其片段。
     
     参数:
         file_paths_list: JSON文件路径列表
+        spool: 新解析的问题对象的暂存文件
+        merge_index: 可选的增量合并索引，内容未变化的文件直接复用上次合并结果中的片段
+        diagnostics: 可选的字典，按文件路径收集每个文件的诊断结果，供 generate_issue_report 使用
         
     返回:
-        List[Dict[str, Any]]: 合并后的问题对象列表
+        List[QuestionSegment]: 合并后按顺序排列的问题对象片段
     """
     if not file_paths_list:
         logger.info("[JSON-MERGE]: 接收到的文件列表为空，无需合并")
@@ -213,8 +493,19 @@ def merge_all_inductive_jsons(file_paths_list: List[str]) -> List[Dict[str, Any]
         order_numbers, prefix_type = extract_file_order(filename)
         logger.info(f"  提取的排序信息: 序号={order_numbers}, 类型={prefix_type}")
         
-        # 验证文件
-        is_valid, data = validate_json_file(file_path)
+        # 验证文件（内容未变化的文件复用上次验证通过的结果）
+        data = merge_index.cached_segments(file_path) if merge_index is not None else None
+        if data is not None:
+            # 上次合并时已验证通过，无结构与字段问题
+            file_diagnostics = FileDiagnostics(filename, question_count=len(data))
+            logger.info("  文件未变化，复用上次的合并结果")
+        else:
+            file_diagnostics, data = diagnose_json_file(file_path, spool)
+            if file_diagnostics.is_valid and data and merge_index is not None:
+                merge_index.update(file_path)
+        is_valid = file_diagnostics.is_valid
+        if diagnostics is not None:
+            diagnostics[file_path] = file_diagnostics
         if is_valid and data:
             # 将每个问题对象与其序号一起存储
             for idx, question in enumerate(data):
@@ -223,8 +514,9 @@ def merge_all_inductive_jsons(file_paths_list: List[str]) -> List[Dict[str, Any]
                 file_contents.append({
                     'order': order_number,
                     'file_index': idx,
-                    'question': question,
+                    'segment': question,
                     'filename': filename,
+                    'file_path': file_path,
                     'prefix_type': prefix_type
                 })
                 logger.info(f"    问题 {idx + 1}: 分配序号 {order_number}")
@@ -244,79 +536,140 @@ def merge_all_inductive_jsons(file_paths_list: List[str]) -> List[Dict[str, Any]
         logger.info(f"  - 文件: {item['filename']}, 序号: {item['order']}, "
                    f"文件内位置: {item['file_index']}, 类型: {item['prefix_type']}")
     
-    # 提取排序后的问题对象
-    aggregated_question_objects = [item['question'] for item in file_contents]
+    # 提取排序后的问题对象片段
+    aggregated_question_objects = [item['segment'] for item in file_contents]
     
     # 合并完成后的统计信息
     logger.info("\n[JSON-MERGE] 合并完成统计:")
     logger.info(f"- 总文件数: {len(file_paths_list)}")
     logger.info(f"- 成功处理: {processed_files}")
     logger.info(f"- 处理失败: {failed_files}")
+    if merge_index is not None:
+        logger.info(f"- 复用未变化文件: {merge_index.reused_files}, 重新解析: {merge_index.parsed_files}")
     logger.info(f"- 合并后的问题对象总数: {len(aggregated_question_objects)}")
     
     return aggregated_question_objects
 
-def validate_respondent_id(merged_data: List[Dict[str, Any]]) -> bool:
+def format_id_ranges(ids: Iterable[int]) -> str:
+    """将ID集合格式化为紧凑的区间表示，如 [1, 2, 3, 7, 9, 10] -> '1-3, 7, 9-10'"""
+    sorted_ids = np.unique(np.asarray(ids if isinstance(ids, np.ndarray) else list(ids), dtype=np.int64))
+    if sorted_ids.size == 0:
+        return ''
+    # 相邻ID不连续处即为区间边界
+    breaks = np.flatnonzero(np.diff(sorted_ids) != 1) + 1
+    starts = np.concatenate(([0], breaks))
+    ends = np.concatenate((breaks, [sorted_ids.size])) - 1
+    return ', '.join(
+        str(sorted_ids[start]) if start == end else f"{sorted_ids[start]}-{sorted_ids[end]}"
+        for start, end in zip(starts, ends)
+    )
+
+def _integral_id(id_: Any) -> Optional[int]:
+    """respondent_id 的整数值：整数或整数值的浮点数（与按数值比较的旧实现一致），其他值返回 None"""
+    if isinstance(id_, int):
+        return int(id_)
+    if isinstance(id_, float) and id_.is_integer():
+        return int(id_)
+    return None
+
+def validate_respondent_id_lists(question_texts: List[str], id_lists: List[List[Any]]) -> bool:
     """
-    验证合并后的数据中respondent_id是否符合要求：
-    每个问题下的respondent_id应该是从1到n的完整序列
-    
+    验证合并数据中respondent_id是否符合要求：
+    每个问题下的respondent_id应该是从1到n的完整序列（n为该问题下不同ID的个数），且没有重复
+
+    直接接收每个问题的问题文本与 respondent_id 列表（流式合并时只收集了这两项，无需完整的问题对象）。
+    所有 (问题, respondent_id) 对一次性收集为 NumPy 数组，用 bincount 向量化地统计每个问题的
+    去重ID数、重复ID与超出 1..n 的ID，只为验证失败的问题展开缺失、多余与重复ID的区间。
+
     参数:
-        merged_data: 合并后的问题对象列表
-        
+        question_texts: 各问题的问题文本
+        id_lists: 各问题的 respondent_id 列表，与 question_texts 一一对应
+
     返回:
         bool: 验证通过返回True，否则返回False
     """
-    if not merged_data:
-        logger.warning("验证ID: 数据为空")
-        return False
-        
     try:
         all_valid = True
-        for question in merged_data:
-            question_text = question.get('question_text', 'Unknown Question')
-            
-            # 获取该问题下的所有ID
-            question_ids = [response['respondent_id'] for response in question['initial_codes']]
-            unique_ids = sorted(set(question_ids))
-            
-            # 计算期望的ID序列
-            expected_ids = list(range(1, len(unique_ids) + 1))
-            
-            # 检查该问题下的ID是否完整
-            if unique_ids != expected_ids:
-                logger.error(f"\n验证ID: 问题 '{question_text}' 的ID序列不完整")
-                logger.error(f"期望ID序列: {expected_ids}")
-                logger.error(f"实际ID序列: {unique_ids}")
-                # 找出缺失的ID
-                missing_ids = set(expected_ids) - set(unique_ids)
-                if missing_ids:
-                    logger.error(f"缺失的ID: {sorted(missing_ids)}")
-                # 找出多余的ID
-                extra_ids = set(unique_ids) - set(expected_ids)
-                if extra_ids:
-                    logger.error(f"多余的ID: {sorted(extra_ids)}")
-                all_valid = False
-                
-            # 检查该问题下是否有重复ID
-            if len(unique_ids) != len(question_ids):
-                logger.error(f"\n验证ID: 问题 '{question_text}' 存在重复ID")
-                # 统计重复的ID
-                from collections import Counter
-                id_counts = Counter(question_ids)
-                duplicate_ids = {id_: count for id_, count in id_counts.items() if count > 1}
-                for id_, count in duplicate_ids.items():
-                    logger.error(f"ID {id_} 在该问题中重复出现 {count} 次")
+        question_count = len(question_texts)
+        counts = np.array([len(question_ids) for question_ids in id_lists], dtype=np.int64)
+        all_ids = [id_ for question_ids in id_lists for id_ in question_ids]
+        # 每个回答所属的问题序号；同时也是下面每个计数位置所属的问题序号
+        slot_question = np.repeat(np.arange(question_count, dtype=np.int64), counts)
+        question_idx = slot_question
+
+        # 整数值的浮点数（如 1.0）按对应整数比较；非整数ID（如字符串、1.5）无法参与序列比较，单独报告并排除
+        if not set(map(type, all_ids)) <= {int}:
+            integral_ids = [_integral_id(id_) for id_ in all_ids]
+            is_int = np.array([id_ is not None for id_ in integral_ids], dtype=bool)
+            for q in np.unique(question_idx[~is_int]):
+                invalid_ids = [all_ids[pos] for pos in np.flatnonzero(~is_int & (question_idx == q))]
+                logger.error(f"\n验证ID: 问题 '{question_texts[q]}' 包含非整数ID: {invalid_ids[:10]}"
+                             f"{' 等' if len(invalid_ids) > 10 else ''}")
                 all_valid = False
-                
+            all_ids = [id_ for id_ in integral_ids if id_ is not None]
+            question_idx = question_idx[is_int]
+
+        ids = np.fromiter(all_ids, dtype=np.int64, count=len(all_ids))
+
+        # 问题 q 的ID若完整，必落在 1..len(initial_codes) 内：为每个问题分配长度为 len(initial_codes)
+        # 的计数区间，用一次 bincount 统计区间内每个ID的出现次数，无需排序
+        offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        in_range = (ids >= 1) & (ids <= counts[question_idx])
+        occurrences = np.bincount(offsets[question_idx[in_range]] + ids[in_range] - 1,
+                                  minlength=slot_question.size)
+
+        # 全部ID都在区间内且没有重复时，每个问题的ID恰好是 1..n
+        if all_valid and in_range.all() and not (occurrences > 1).any():
+            logger.info("验证ID: 所有问题的ID序列都符合要求")
+            return True
+        slot_ids = np.arange(slot_question.size, dtype=np.int64) - offsets[slot_question] + 1
+
+        # 区间外的ID（小于1或大于回答数）必为多余ID，数量很少，单独去重计数
+        out_pairs, out_occurrences = np.unique(
+            np.stack((question_idx[~in_range], ids[~in_range]), axis=1), axis=0, return_counts=True)
+        out_question = out_pairs[:, 0] if out_pairs.size else np.empty(0, dtype=np.int64)
+        out_ids = out_pairs[:, 1] if out_pairs.size else np.empty(0, dtype=np.int64)
+
+        # 期望序列为 1..n（n 为去重ID数），大于 n 的区间内ID与全部区间外ID即为多余ID
+        present = occurrences > 0
+        unique_counts = (np.bincount(slot_question[present], minlength=question_count)
+                         + np.bincount(out_question, minlength=question_count))
+        is_extra = present & (slot_ids > unique_counts[slot_question])
+        extra_counts = (np.bincount(slot_question[is_extra], minlength=question_count)
+                        + np.bincount(out_question, minlength=question_count))
+        is_duplicate = occurrences > 1
+        duplicate_counts = (np.bincount(slot_question[is_duplicate], minlength=question_count)
+                            + np.bincount(out_question[out_occurrences > 1], minlength=question_count))
+
+        for q in np.flatnonzero(extra_counts):
+            # 问题 q 的计数区间是连续的切片，区间内第 k 个位置对应ID k+1
+            slots = slice(offsets[q], offsets[q] + counts[q])
+            expected_count = int(unique_counts[q])
+            present_ids = np.concatenate((np.flatnonzero(present[slots]) + 1, out_ids[out_question == q]))
+            missing_ids = np.flatnonzero(~present[slots][:expected_count]) + 1
+            extra_ids = np.concatenate((np.flatnonzero(is_extra[slots]) + 1, out_ids[out_question == q]))
+            logger.error(f"\n验证ID: 问题 '{question_texts[q]}' 的ID序列不完整")
+            logger.error(f"期望ID序列: 1-{expected_count}")
+            logger.error(f"实际ID: {format_id_ranges(present_ids)}")
+            if missing_ids.size:
+                logger.error(f"缺失的ID ({missing_ids.size} 个): {format_id_ranges(missing_ids)}")
+            logger.error(f"多余的ID ({extra_ids.size} 个): {format_id_ranges(extra_ids)}")
+            all_valid = False
+
+        for q in np.flatnonzero(duplicate_counts):
+            slots = slice(offsets[q], offsets[q] + counts[q])
+            out_duplicate = (out_question == q) & (out_occurrences > 1)
+            duplicate_ids = np.concatenate((np.flatnonzero(is_duplicate[slots]) + 1, out_ids[out_duplicate]))
+            max_occurrence = int(np.concatenate((occurrences[slots], out_occurrences[out_duplicate])).max())
+            logger.error(f"\n验证ID: 问题 '{question_texts[q]}' 存在重复ID")
+            logger.error(f"重复的ID ({duplicate_ids.size} 个，最多出现 {max_occurrence} 次): "
+                         f"{format_id_ranges(duplicate_ids)}")
+            all_valid = False
         if all_valid:
             logger.info("验证ID: 所有问题的ID序列都符合要求")
             return True
         return False
         
-    except KeyError as e:
-        logger.error(f"验证ID: 数据结构错误，缺少必要字段: {e}")
-        return False
     except Exception as e:
         logger.error(f"验证ID: 意外错误 {e}")
         return False
@@ -325,22 +678,27 @@ def validate_respondent_id(merged_data: List[Dict[str, Any]]) -> bool:
 # 3. 输出机制模块 (@ds-n1-save)
 # ======================================================================
 
-def save_merged_json(data_to_save: List[Dict[str, Any]], output_filepath: str) -> bool:
+def save_merged_json(segments: List[QuestionSegment], output_filepath: str,
+                     spool: QuestionSpool) -> Optional[List[Tuple[int, int]]]:
     """
-    将合并后的数据保存到指定的输出路径。
+    将合并后的问题对象按顺序写入指定的输出路径（先写临时文件再原子替换）。
+    各问题对象的文本从暂存文件或上次的合并结果中逐块拷贝，输出与 json.dump(indent=2) 的结果逐字节一致。
+    片段在合并时已逐个通过结构与字段验证，无需再解析输出文件。
     
     参数:
-        data_to_save: 要保存的数据
+        segments: 按顺序排列的问题对象片段
         output_filepath: 输出文件路径
+        spool: 新解析的问题对象的暂存文件
         
     返回:
-        bool: 保存成功返回True，失败返回False
+        Optional[List[Tuple[int, int]]]: 保存成功时返回每个问题对象在输出文件中的 (字节偏移, 字节长度)，失败时返回None
     """
-    if not data_to_save:
+    if not segments:
         logger.warning("待保存的数据为空，不生成输出文件")
-        return False
+        return None
 
     logger.info(f"准备保存合并后的JSON文件到: {output_filepath}")
+    temp_filepath = f"{output_filepath}.tmp"
     
     try:
         # 确保输出目录存在
@@ -349,24 +707,57 @@ def save_merged_json(data_to_save: List[Dict[str, Any]], output_filepath: str) -
             logger.info(f"输出目录 '{output_dir}' 不存在，将自动创建")
             os.makedirs(output_dir)
 
-        # 保存数据
-        with open(output_filepath, 'w', encoding='utf-8') as f:
-            json.dump(data_to_save, f, ensure_ascii=False, indent=2)
-            
-        # 验证保存的文件
-        is_valid, _ = validate_json_file(output_filepath)
-        if not is_valid:
-            logger.error("保存的文件验证失败")
-            return False
-            
+        positions: List[Tuple[int, int]] = []
+        previous_output = open(output_filepath, 'rb') if any(segment.in_output for segment in segments) else None
+        try:
+            with open(temp_filepath, 'wb') as f:
+                f.write(b'[\n')
+                for idx, segment in enumerate(segments):
+                    if idx:
+                        f.write(b',\n')
+                    positions.append((f.tell(), segment.length))
+                    if segment.in_output:
+                        _copy_byte_range(previous_output, f, segment.offset, segment.length)
+                    else:
+                        spool.copy_to(f, segment.offset, segment.length)
+                f.write(b'\n]')
+        finally:
+            if previous_output is not None:
+                previous_output.close()
+        os.replace(temp_filepath, output_filepath)
+
         logger.info("数据已成功保存并验证")
-        return True
+        return positions
         
     except Exception as e:
         logger.error(f"保存文件时发生错误: {e}")
-        return False
+        if os.path.exists(temp_filepath):
+            os.remove(temp_filepath)
+        return None
 
-def generate_issue_report(file_paths_list: List[str], merged_data: List[Dict[str, Any]]) -> None:
+def update_coding_store(store_path: str, merged_json_path: str, segments: List[QuestionSegment]) -> bool:
+    """
+    合并结果或各来源文件自上次建库以来有变化时重建列式编码存储
+
+    参数:
+        store_path: 编码存储文件路径
+        merged_json_path: 合并结果文件路径
+        segments: 合并结果中按顺序排列的问题对象片段，提供各问题对象的来源文件与文件内位置
+
+    返回:
+        bool: 存储是否可用（无需重建或重建成功）
+    """
+    store = CodingStore.open(store_path, merged_json_path)
+    if store is not None:
+        with store:
+            if store.is_current(segment.file_path for segment in segments):
+                logger.info(f"编码存储与合并结果一致，无需重建: {store_path}")
+                return True
+    return build_coding_store(store_path, merged_json_path,
+                              [(segment.file_path, segment.file_index) for segment in segments])
+
+def generate_issue_report(file_paths_list: List[str], merged_data: List[QuestionSegment],
+                          diagnostics: Optional[Dict[str, FileDiagnostics]] = None) -> None:
     """
     生成问题汇总报告，包括：
     1. JSON结构问题
@@ -376,8 +767,13 @@ def generate_issue_report(file_paths_list: List[str], merged_data: List[Dict[str
     
     参数:
         file_paths_list: 所有JSON文件路径
-        merged_data: 合并后的数据
+        merged_data: 合并后的问题对象片段
+        diagnostics: 合并时收集的各文件诊断结果；缺少某个文件的结果时才重新读取该文件
     """
+    diagnostics = diagnostics or {}
+    file_diagnostics = [diagnostics[path] if path in diagnostics else diagnose_json_file(path)[0]
+                        for path in file_paths_list]
+
     logger.info("\n" + "="*50)
     logger.info("问题汇总报告")
     logger.info("="*50)
@@ -385,38 +781,9 @@ def generate_issue_report(file_paths_list: List[str], merged_data: List[Dict[str
     # 1. 检查每个文件的结构问题
     logger.info("\n1. JSON结构问题:")
     logger.info("-" * 30)
-    structure_issues = []
-    field_issues = []
-    
-    for file_path in file_paths_list:
-        filename = os.path.basename(file_path)
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                
-            if not isinstance(data, list):
-                structure_issues.append(f"  - {filename}: 根结构不是列表")
-                continue
-                
-            # 检查必需字段
-            for item in data:
-                if not isinstance(item, dict):
-                    structure_issues.append(f"  - {filename}: 包含非字典类型的元素")
-                    continue
-                    
-                missing_fields = []
-                for field in ['question_text', 'initial_codes', 'codes', 'themes']:
-                    if field not in item:
-                        missing_fields.append(field)
-                
-                if missing_fields:
-                    field_issues.append(f"  - {filename}: 缺少字段 {', '.join(missing_fields)}")
-                    
-        except json.JSONDecodeError:
-            structure_issues.append(f"  - {filename}: JSON解析失败")
-        except Exception as e:
-            structure_issues.append(f"  - {filename}: 其他错误 - {str(e)}")
-            
+    structure_issues = [issue for item in file_diagnostics for issue in item.structure_issues]
+    field_issues = [issue for item in file_diagnostics for issue in item.field_issues]
+
     if structure_issues:
         for issue in structure_issues:
             logger.error(issue)
@@ -435,18 +802,8 @@ def generate_issue_report(file_paths_list: List[str], merged_data: List[Dict[str
     # 3. 问题编码重复问题
     logger.info("\n3. 问题编码重复问题:")
     logger.info("-" * 30)
-    question_counts = {}
-    for file_path in file_paths_list:
-        filename = os.path.basename(file_path)
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                if isinstance(data, list):
-                    count = len(data)
-                    if count > 1:
-                        question_counts[filename] = count
-        except:
-            continue
+    question_counts = {item.filename: item.question_count for item in file_diagnostics
+                       if item.question_count is not None and item.question_count > 1}
             
     if question_counts:
         for filename, count in question_counts.items():
@@ -496,34 +853,54 @@ def main() -> None:
             logger.error("由于配置错误，无法获取输入文件列表。任务终止。")
             return
 
-        # 2. 合并JSON文件
-        merged_data = merge_all_inductive_jsons(input_paths)
-        if not merged_data:
-            logger.error("合并过程未产生有效数据。任务终止。")
-            return
-            
-        # 2.1 验证respondent_id
-        if not validate_respondent_id(merged_data):
-            logger.error("respondent_id验证失败。任务终止。")
-            return
-
-        # 3. 保存合并结果
         try:
             output_directory = get_path('inductive_global_dir')
             output_filename = f"{APP_NAME}_inductive_codes.json"
             full_output_path = os.path.join(output_directory, output_filename)
-            
-            if save_merged_json(merged_data, full_output_path):
-                logger.info(f"任务成功完成，输出文件: {full_output_path}")
-            else:
-                logger.error("保存合并结果失败")
-                
+            merge_index = MergeIndex(get_path('inductive_merge_index'), full_output_path) if USE_MERGE_INDEX else None
+            coding_store_path = get_path('inductive_coding_store') if USE_CODING_STORE else None
         except KeyError:
-            logger.critical("无法获取输出目录路径。请确保 'inductive_global_dir' key 在 parameters.py 中已定义")
+            logger.critical("无法获取输出路径。请确保 'inductive_global_dir'、'inductive_merge_index' 与 "
+                            "'inductive_coding_store' key 在 parameters.py 中已定义")
             return
-            
+
+        with QuestionSpool() as spool:
+            # 2. 合并JSON文件（每个输入文件只流式读取一次，诊断结果留给问题汇总报告）
+            diagnostics: Dict[str, FileDiagnostics] = {}
+            merged_data = merge_all_inductive_jsons(input_paths, spool, merge_index, diagnostics)
+            if not merged_data:
+                logger.error("合并过程未产生有效数据。任务终止。")
+                return
+
+            # 3. 保存合并结果（输入均未变化时上次的结果已通过验证，无需重写）
+            if merge_index is not None and merge_index.is_unchanged():
+                logger.info(f"所有输入文件均未变化，合并结果保持不变: {full_output_path}")
+                merged_saved = True
+            else:
+                # 3.1 验证respondent_id（复用的问题对象上次保存前已验证通过，只验证本次重新解析的问题）
+                parsed_segments = [segment for segment in merged_data if not segment.in_output]
+                if parsed_segments and not validate_respondent_id_lists(
+                        [segment.question_text for segment in parsed_segments],
+                        [segment.respondent_ids for segment in parsed_segments]):
+                    logger.error("respondent_id验证失败。任务终止。")
+                    return
+
+                positions = save_merged_json(merged_data, full_output_path, spool)
+                merged_saved = positions is not None
+                if merged_saved:
+                    if merge_index is not None:
+                        merge_index.set_entries(merged_data, positions)
+                        merge_index.save()
+                    logger.info(f"任务成功完成，输出文件: {full_output_path}")
+                else:
+                    logger.error("保存合并结果失败")
+
+            # 3.2 更新供 03/04 读取的列式编码存储
+            if merged_saved and coding_store_path:
+                update_coding_store(coding_store_path, full_output_path, merged_data)
+
         # 4. 生成问题汇总报告
-        generate_issue_report(input_paths, merged_data)
+        generate_issue_report(input_paths, merged_data, diagnostics)
             
     except Exception as e:
         logger.critical(f"执行过程中发生未预期的错误: {e}")
@@ -10,28 +10,20 @@ MaxQDA Theme Code Generator
 """
 
 import os
-import json
+import argparse
 import re
 import csv
 import pandas as pd
-from fuzzywuzzy import process, fuzz
 import logging
+from collections import deque
 from datetime import datetime
-from typing import List, Dict, Any, Optional, Tuple, Set
-
-def setup_logging() -> None:
-    """配置日志系统，包含文件和控制台输出。"""
-    log_format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    logging.basicConfig(
-        level=logging.INFO,
-        format=log_format,
-        handlers=[
-            logging.FileHandler('workflow.log', mode='a', encoding='utf-8'),
-            logging.StreamHandler()
-        ]
-    )
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple, Set, Iterable, Iterator
+from logger import setup_logging
 
-setup_logging()
+# 配置日志系统（全流程共用的日志后端），须在导入 parameters 之前调用以使用本脚本的格式
+setup_logging(fmt='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 # 导入配置参数
@@ -40,6 +32,7 @@ try:
         get_path,
         P_DBUG_RESPONDENT_ID,
         P_DBUG_QUESTION_TEXT_RAW,
+        QUESTION_MAP,
         get_id_manager
     )
     logger.info("成功从 parameters.py 导入配置")
@@ -47,8 +40,106 @@ except ImportError as e:
     logger.critical(f"无法从 parameters.py 导入配置: {e}")
     raise
 
-# 全局调试控制
-PRINT_CURRENT_ITEM_DETAILS = True
+from quote_locator import locate_quote, QuoteLocationCache, LOCATOR_MODE_INDEXED
+from coding_index import build_theme_lookup, group_initial_codes_by_respondent
+from coding_store import CodingStore
+from json_stream import (
+    ITEM, QUESTION_END, QUESTION_FIELD, QUESTION_START, STREAM_ENTRY, STREAM_START,
+    JsonRootTypeError, JsonStreamError, iter_question_events
+)
+from question_registry import QuestionRegistry
+
+# 引文模糊定位模式: 'indexed'(q-gram 过滤后打分) 或 'legacy'(枚举全部子串打分)
+QUOTE_LOCATOR_MODE = LOCATOR_MODE_INDEXED
+
+# 是否将引文定位缓存持久化到 03_inductive_coding_dir，重复转换时跳过模糊匹配（默认关闭，只使用本次运行的内存缓存）
+USE_DISK_QUOTE_CACHE = False
+
+# 是否优先从 02 阶段生成的列式编码存储读取LLM分析数据（存储缺失或过期时读取合并后的JSON）
+USE_CODING_STORE = True
+
+# 并行转换时每个进程分到的受访者分片数，分片越多负载越均衡
+PARALLEL_SHARDS_PER_WORKER = 4
+
+# 流式写出MaxQDA文件时的写缓冲区大小（字节）
+MAXQDA_WRITE_BUFFER_SIZE = 1 << 20
+
+class DebugTrace:
+    """
+    针对单个调试目标（被访者、可选的问题）的转换过程跟踪
+
+    目标由 parameters.py 中的 P_DBUG_RESPONDENT_ID / P_DBUG_QUESTION_TEXT_RAW 指定，
+    P_DBUG_QUESTION_TEXT_RAW 可以是问题编号（按 QUESTION_MAP 解析）或问题文本，为 None 时跟踪该被访者的全部问题。
+    转换循环在进入每个问题时调用 enter()，只有命中目标时 active 为 True；
+    其余位置以 `if DEBUG_TRACE.active:` 守卫，未命中时除一次属性读取外没有任何开销。
+    跟踪记录以 DEBUG 级别写入 "<模块名>.trace" 日志记录器，不受根日志级别限制。
+    """
+
+    def __init__(self):
+        self.target_respondent_id: Optional[str] = None
+        self.target_question_key: Optional[str] = None
+        self.active = False
+        self._respondent_id: Optional[str] = None
+        self._question_key: Optional[str] = None
+
+    def configure(self, respondent_id: Any, question: Any,
+                  question_registry: Optional[QuestionRegistry] = None) -> None:
+        """
+        设置调试目标
+
+        参数:
+            respondent_id: 目标被访者ID（任意格式，经 normalize_respondent_id 标准化），None 表示关闭跟踪
+            question: 目标问题编号或问题文本，None 表示该被访者的全部问题
+            question_registry: 问题注册表，用于将目标问题解析为CSV问题列并提示无法匹配的情况
+        """
+        self.target_respondent_id = normalize_respondent_id(str(respondent_id).strip()) \
+                                    if respondent_id is not None else None
+        entry = None
+        if question is None:
+            self.target_question_key = None
+        elif question_registry is not None:
+            entry = question_registry.entry_for_number(question) if isinstance(question, int) \
+                    else question_registry.resolve(question)
+        if question is not None:
+            if entry is not None:
+                self.target_question_key = entry.key
+            else:
+                question_text = QUESTION_MAP.get(question, question) if isinstance(question, int) else question
+                self.target_question_key = clean_text_for_maxqda(question_text, is_for_code_name=True)
+        self.active = False
+
+        if self.target_respondent_id is None:
+            return
+        if question is not None and question_registry is not None and \
+                (entry is None or entry.header is None):
+            logger.warning(f"调试目标问题 '{question}' 未匹配到任何CSV问题列，将不会输出跟踪信息")
+        logger.info(f"已开启调试跟踪: 被访者 {self.target_respondent_id}, "
+                    f"问题 '{self.target_question_key if self.target_question_key is not None else '全部'}'")
+
+    def enter(self, respondent_id: Optional[str], question_key: Optional[str]) -> None:
+        """进入一个 (被访者, 问题) 单元，更新 active"""
+        self._respondent_id = respondent_id
+        self._question_key = question_key
+        self.active = (
+            self.target_respondent_id is not None
+            and respondent_id == self.target_respondent_id
+            and (self.target_question_key is None or question_key == self.target_question_key)
+        )
+
+    def leave(self) -> None:
+        self.active = False
+
+    def event(self, message: str, *args: Any) -> None:
+        """记录一条跟踪信息（参数按 % 格式延迟格式化），调用方应先检查 active"""
+        TRACE_LOGGER.debug("[跟踪 被访者=%s 问题=%.30s] " + message,
+                           self._respondent_id, self._question_key, *args)
+
+# 调试跟踪记录器：级别固定为 DEBUG，只有命中调试目标时才会产生记录
+TRACE_LOGGER = logging.getLogger(f"{__name__}.trace")
+TRACE_LOGGER.setLevel(logging.DEBUG)
+
+# 当前进程的调试跟踪状态
+DEBUG_TRACE = DebugTrace()
 
 # TODO: 未来的被访者ID可能全部转换为标准的内部_id, 该函数可能需要修改为直接返回内部_id
 def normalize_respondent_id(respondent_id: str) -> Optional[str]:
@@ -73,58 +164,87 @@ def normalize_respondent_id(respondent_id: str) -> Optional[str]:
     
     return None
 
+# 编码名称清理的字符映射：换行转空格（须在移除结尾标点之前完成）、移除 '#'、路径分隔符、双引号，以及中文标点统一为英文标点
+# （双引号在此前已统一为单引号，因此不再需要单独映射中英文引号）
+_CODE_NAME_PUNCTUATION_MAP = {
+    '？': '?', '！': '!', '：': ':', '；': ';',
+    '，': ',', '。': '.', '（': '(', '）': ')',
+    '【': '[', '】': ']', '《': '<', '》': '>',
+    '…': '...', '—': '-', '～': '~', '·': '.'
+}
+_MAXQDA_CODE_NAME_TABLE = str.maketrans({
+    '\r': ' ', '\n': ' ', '#': None,
+    '\\': '/', '"': "'",
+    **_CODE_NAME_PUNCTUATION_MAP
+})
+
+_TRAILING_PUNCTUATION_RE = re.compile(r'[.!?:;,]+$')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# 编码名称清理结果的缓存容量（问题标题、编码名称在一次转换中会被反复清理）
+CODE_NAME_CLEAN_CACHE_SIZE = 8192
+
 def clean_text_for_maxqda(text: Optional[str], is_for_code_name: bool = False) -> str:
     """
     清理和标准化文本以适配MaxQDA格式。
     
     参数:
         text: 需要清理的文本，可以为None
-        is_for_code_name: 如果为True，应用额外的编码名称清理规则
+        is_for_code_name: 如果为True，应用额外的编码名称清理规则（结果经 LRU 缓存）
     
     返回:
         str: 清理后的文本字符串
     """
-    global PRINT_CURRENT_ITEM_DETAILS
     if text is None:
         return ""
-    
-    # 基本清理
-    cleaned_text = str(text).replace('\r\n', ' ').replace('\n', ' ').replace('\r', ' ').replace('#', '')
-    
     if is_for_code_name:
-        # 处理路径分隔符和引号
-        cleaned_text = cleaned_text.replace('\\', '/').replace('"', "'")
-        
-        # 统一中英文标点
-        punctuation_map = {
-            '？': '?', '！': '!', '：': ':', '；': ';',
-            '，': ',', '。': '.', '"': '"', '"': '"',
-            ''': "'", ''': "'", '（': '(', '）': ')',
-            '【': '[', '】': ']', '《': '<', '》': '>',
-            '…': '...', '—': '-', '～': '~', '·': '.'
-        }
-        for ch, en in punctuation_map.items():
-            cleaned_text = cleaned_text.replace(ch, en)
-            
-        # 移除结尾的标点符号
-        cleaned_text = re.sub(r'[.!?:;,]+$', '', cleaned_text)
-        
-    # 规范化空格
-    cleaned_text = re.sub(r'\s+', ' ', cleaned_text).strip()
+        return _clean_code_name_for_maxqda(str(text))
     
-    if PRINT_CURRENT_ITEM_DETAILS:
-        logger.debug(f"文本清理 - 原文: '{str(text)[:50]}...', 清理后: '{cleaned_text[:50]}...'")
+    # 移除 '#' 后规范化空格（换行属于空白字符，由同一次替换转为空格）
+    cleaned_text = _WHITESPACE_RE.sub(' ', str(text).replace('#', '')).strip()
     
+    logger.debug("文本清理 - 原文: '%.50s...', 清理后: '%.50s...'", text, cleaned_text)
+    return cleaned_text
 
+@lru_cache(maxsize=CODE_NAME_CLEAN_CACHE_SIZE)
+def _clean_code_name_for_maxqda(text: str) -> str:
+    """clean_text_for_maxqda(is_for_code_name=True) 的实际实现"""
+    # 一次完成基本清理、路径分隔符与引号处理、中英文标点统一
+    cleaned_text = text.translate(_MAXQDA_CODE_NAME_TABLE)
+    
+    # 移除结尾的标点符号
+    cleaned_text = _TRAILING_PUNCTUATION_RE.sub('', cleaned_text)
+    
+    # 规范化空格
+    cleaned_text = _WHITESPACE_RE.sub(' ', cleaned_text).strip()
+    
+    logger.debug("编码名称清理 - 原文: '%.50s...', 清理后: '%.50s...'", text, cleaned_text)
     return cleaned_text
 
-def _find_locations_for_single_quote(text_to_search_in: str, quote_to_find: str) -> List[Dict[str, Any]]:
+def normalize_question_key(question_text: Any) -> str:
+    """问题文本（CSV列名或LLM结果中的 question_text）到父编码名称的规范化"""
+    return clean_text_for_maxqda(question_text, is_for_code_name=True)
+
+def build_question_registry(loaded_csv_headers: List[str], respondent_id_csv_column: str) -> QuestionRegistry:
+    """以 CSV 表头和 QUESTION_MAP 建立问题注册表，问题键为清理后的父编码名称"""
+    return QuestionRegistry(
+        loaded_csv_headers,
+        QUESTION_MAP,
+        normalize=normalize_question_key,
+        skip_headers=[respondent_id_csv_column]
+    )
+
+def _find_locations_for_single_quote(text_to_search_in: str, quote_to_find: str,
+                                     mode: Optional[str] = None,
+                                     quote_cache: Optional[QuoteLocationCache] = None) -> List[Dict[str, Any]]:
     """
     在文本中查找引文的所有出现位置，支持模糊匹配。
     
     参数:
         text_to_search_in: 要搜索的源文本
         quote_to_find: 要定位的引文文本
+        mode: 模糊定位模式，'legacy' 或 'indexed'，默认使用 QUOTE_LOCATOR_MODE
+        quote_cache: 可选的引文定位缓存，命中时跳过定位
     
     返回:
         List[Dict]: 包含每个匹配位置信息的字典列表
@@ -135,79 +255,22 @@ def _find_locations_for_single_quote(text_to_search_in: str, quote_to_find: str)
             - match_type: 'exact'(精确匹配) 或 'fuzzy'(模糊匹配)
             - score: (仅模糊匹配) 匹配相似度分数
     """
-    global PRINT_CURRENT_ITEM_DETAILS
-    
-    if not quote_to_find:
-        return []
-        
-    processed_text = re.sub(r'\s+', ' ', text_to_search_in).strip()
-    processed_quote = re.sub(r'\s+', ' ', quote_to_find).strip()
+    if DEBUG_TRACE.active:
+        DEBUG_TRACE.event("尝试定位引文: '%.50s...' 在文本中: '%.70s...'", quote_to_find, text_to_search_in)
     
-    if not processed_quote:
-        return []
-        
-    if PRINT_CURRENT_ITEM_DETAILS:
-        logger.debug(f"尝试定位引文: '{processed_quote[:50]}...' 在文本中: '{processed_text[:70]}...'")
-    
-    # 首先尝试精确匹配
-    locations = []
-    current_pos = 0
-    while current_pos < len(processed_text):
-        idx = processed_text.find(processed_quote, current_pos)
-        if idx == -1:
-            break
-        locations.append({
-            'start': idx,
-            'end': idx + len(processed_quote),
-            'matched_text': processed_text[idx : idx + len(processed_quote)],
-            'match_type': 'exact'
-        })
-        current_pos = idx + len(processed_quote)
+    if quote_cache is not None:
+        locations = quote_cache.locate(text_to_search_in, quote_to_find, mode=mode or QUOTE_LOCATOR_MODE)
+    else:
+        locations = locate_quote(text_to_search_in, quote_to_find, mode=mode or QUOTE_LOCATOR_MODE)
     
-    if locations:
-        if PRINT_CURRENT_ITEM_DETAILS:
-            logger.debug(f"精确匹配找到 {len(locations)} 处")
-        return locations
-        
-    # 如果精确匹配失败，尝试模糊匹配
-    if PRINT_CURRENT_ITEM_DETAILS:
-        logger.debug(f"精确匹配失败，尝试模糊匹配引文: '{processed_quote[:50]}...'")
-    
-    threshold = 85 
-    min_len_for_fuzzy = 3
-    if len(processed_quote) >= min_len_for_fuzzy:
-        possible_substrings = [processed_text[i:j] for i in range(len(processed_text)) 
-                               for j in range(i + len(processed_quote) - int(len(processed_quote)*0.3),
-                                              i + len(processed_quote) + int(len(processed_quote)*0.3) + 1)
-                               if j <= len(processed_text) and len(processed_text[i:j]) >= min_len_for_fuzzy]
-        if not possible_substrings:
-             if PRINT_CURRENT_ITEM_DETAILS: print(f"        模糊定位: 没有生成用于比较的子字符串。")
-             return []
-        results = process.extractBests(processed_quote, possible_substrings,
-                                       scorer=fuzz.ratio, score_cutoff=threshold, limit=5) 
-        temp_fuzzy_locations = []
-        for matched_text, score in results:
-            s_idx = 0
-            while s_idx < len(processed_text):
-                pos = processed_text.find(matched_text, s_idx)
-                if pos == -1: break
-                is_new = True
-                for loc_in_temp in temp_fuzzy_locations:
-                    if loc_in_temp['start'] == pos and loc_in_temp['end'] == pos + len(matched_text):
-                        is_new = False; break
-                if is_new:
-                    temp_fuzzy_locations.append({'start': pos, 'end': pos + len(matched_text),
-                                                 'matched_text': matched_text, 
-                                                 'match_type': 'fuzzy', 'score': score})
-                s_idx = pos + len(matched_text)
-        if temp_fuzzy_locations:
-            temp_fuzzy_locations.sort(key=lambda x: x['score'], reverse=True)
-            if temp_fuzzy_locations: # 确保列表非空
-                 locations.append(temp_fuzzy_locations[0]) 
-                 if PRINT_CURRENT_ITEM_DETAILS:
-                     print(f"        模糊定位: 找到 {len(temp_fuzzy_locations)} 个潜在匹配。选用最佳: '{locations[0]['matched_text'][:30]}...' (得分: {locations[0].get('score')})")
-        elif PRINT_CURRENT_ITEM_DETAILS:
-            print(f"        模糊定位: 未找到足够相似的片段。")
+    if DEBUG_TRACE.active:
+        if not locations:
+            DEBUG_TRACE.event("引文定位: 未找到足够相似的片段")
+        elif locations[0]['match_type'] == 'exact':
+            DEBUG_TRACE.event("精确匹配找到 %d 处", len(locations))
+        else:
+            DEBUG_TRACE.event("模糊定位: 选用最佳: '%.30s...' (得分: %s)",
+                              locations[0]['matched_text'], locations[0].get('score'))
     return locations
 
 def validate_initial_code_entry(entry: Dict, question_text: str) -> bool:
@@ -272,15 +335,175 @@ def validate_theme_entry(theme: Dict, question_text: str) -> bool:
         
     return True
 
-def load_llm_json_data(merged_json_filepath: str) -> Optional[Dict[str, Any]]:
+def _add_question_analysis(llm_data_by_question_map: Dict[str, Dict[str, Any]], question_idx: int,
+                           question_fields: Dict[str, Any], valid_initial_codes: List[Dict],
+                           invalid_initial_code_count: int) -> None:
+    """
+    验证一个问题分析条目的主题与编码定义，并将其并入问题映射（重复问题按原规则去重合并）
+
+    Args:
+        llm_data_by_question_map: 清理后的问题文本到分析数据的映射
+        question_idx: 问题在JSON文件中的序号（从1开始）
+        question_fields: 问题对象中除逐条读取的 initial_codes 以外的字段
+        valid_initial_codes: 已通过验证的初始编码条目
+        invalid_initial_code_count: 未通过验证的初始编码条目数
+    """
+    q_text_from_json = question_fields.get("question_text", "")
+    cleaned_q_text_for_key = normalize_question_key(q_text_from_json)
+    logger.debug("处理问题 %d: '%s' (清理后: '%s')", question_idx, q_text_from_json, cleaned_q_text_for_key)
+
+    if invalid_initial_code_count:
+        logger.warning(f"问题 '{q_text_from_json}' 的 {invalid_initial_code_count} 个初始编码条目无效")
+
+    # 验证并过滤有效的主题
+    themes = question_fields.get("themes", [])
+    valid_themes = [
+        theme for theme in themes
+        if validate_theme_entry(theme, q_text_from_json)
+    ]
+
+    if len(valid_themes) < len(themes):
+        logger.warning(f"问题 '{q_text_from_json}' 的 {len(themes) - len(valid_themes)} 个主题编码条目无效")
+
+    # 验证codes数组
+    codes = question_fields.get("codes", [])
+    valid_codes = [
+        code for code in codes
+        if isinstance(code, dict) and "code_name" in code and "code_definition" in code
+    ]
+
+    if len(valid_codes) < len(codes):
+        logger.warning(f"问题 '{q_text_from_json}' 的 {len(codes) - len(valid_codes)} 个编码定义无效")
+
+    # 更新或创建问题数据映射
+    if cleaned_q_text_for_key not in llm_data_by_question_map:
+        llm_data_by_question_map[cleaned_q_text_for_key] = {
+            'themes_for_this_question': valid_themes,
+            'all_initial_code_entries_for_question': valid_initial_codes,
+            'code_definitions_for_this_question': valid_codes
+        }
+        logger.info(f"问题 '{q_text_from_json}' 处理完成: {len(valid_initial_codes)} 个初始编码, "
+                  f"{len(valid_themes)} 个主题, {len(valid_codes)} 个编码定义")
+    else:
+        logger.warning(f"发现重复问题 '{q_text_from_json}'，正在合并数据...")
+        # 合并数据时去重
+        existing_data = llm_data_by_question_map[cleaned_q_text_for_key]
+
+        # 使用集合去重
+        existing_themes = {theme['theme_name']: theme for theme in existing_data['themes_for_this_question']}
+        for theme in valid_themes:
+            if theme['theme_name'] not in existing_themes:
+                existing_data['themes_for_this_question'].append(theme)
+
+        # 使用respondent_id去重初始编码
+        existing_codes = {
+            (code.get('respondent_id', ''), code.get('original_answer_segment', '')): code
+            for code in existing_data['all_initial_code_entries_for_question']
+        }
+        for code in valid_initial_codes:
+            key = (code.get('respondent_id', ''), code.get('original_answer_segment', ''))
+            if key not in existing_codes:
+                existing_data['all_initial_code_entries_for_question'].append(code)
+
+        # 使用code_name去重编码定义
+        existing_definitions = {
+            code['code_name']: code
+            for code in existing_data['code_definitions_for_this_question']
+        }
+        for code in valid_codes:
+            if code['code_name'] not in existing_definitions:
+                existing_data['code_definitions_for_this_question'].append(code)
+
+def _collect_questions_from_store(coding_store: CodingStore,
+                                  llm_data_by_question_map: Dict[str, Dict[str, Any]]) -> int:
+    """从列式编码存储读取全部问题对象并并入问题映射，返回问题对象数"""
+    questions = coding_store.load_questions()
+    for question_idx, question_analysis in enumerate(questions, 1):
+        # 验证问题文本
+        q_text_from_json = question_analysis.get("question_text", "")
+        if not q_text_from_json:
+            logger.warning(f"第 {question_idx} 个问题分析条目缺少question_text字段，已跳过")
+            continue
+        initial_codes = question_analysis.get("initial_codes", [])
+        valid_initial_codes = [
+            code for code in initial_codes
+            if validate_initial_code_entry(code, q_text_from_json)
+        ]
+        _add_question_analysis(llm_data_by_question_map, question_idx, question_analysis,
+                               valid_initial_codes, len(initial_codes) - len(valid_initial_codes))
+    return len(questions)
+
+def _collect_questions_from_json(merged_json_filepath: str,
+                                 llm_data_by_question_map: Dict[str, Dict[str, Any]]) -> Optional[int]:
+    """
+    流式读取合并后的JSON文件并将各问题对象并入问题映射：initial_codes 逐条目解码并立即验证，只保留有效条目
+
+    Returns:
+        Optional[int]: 问题对象数，存在不是对象的问题分析条目时返回None
+    """
+    question_count = 0
+    for event, index, payload in iter_question_events(merged_json_filepath, stream_key='initial_codes'):
+        if event == QUESTION_START:
+            question_count += 1
+            question_fields: Dict[str, Any] = {}
+            valid_initial_codes: List[Dict] = []
+            pending_initial_codes: List[Any] = []  # question_text 出现在 initial_codes 之后时暂存，问题结束时再验证
+            invalid_initial_code_count = 0
+        elif event == QUESTION_FIELD:
+            key, value = payload
+            question_fields[key] = value
+            if key == 'initial_codes':
+                # initial_codes 不是数组时按原样在问题结束时逐个验证
+                valid_initial_codes, pending_initial_codes, invalid_initial_code_count = [], list(value), 0
+        elif event == STREAM_START:
+            valid_initial_codes, pending_initial_codes, invalid_initial_code_count = [], [], 0
+        elif event == STREAM_ENTRY:
+            if 'question_text' not in question_fields:
+                pending_initial_codes.append(payload)
+            elif not question_fields['question_text']:
+                continue
+            elif validate_initial_code_entry(payload, question_fields['question_text']):
+                valid_initial_codes.append(payload)
+            else:
+                invalid_initial_code_count += 1
+        elif event == QUESTION_END:
+            # 验证问题文本
+            q_text_from_json = question_fields.get("question_text", "")
+            if not q_text_from_json:
+                logger.warning(f"第 {question_count} 个问题分析条目缺少question_text字段，已跳过")
+                continue
+            for code in pending_initial_codes:
+                if validate_initial_code_entry(code, q_text_from_json):
+                    valid_initial_codes.append(code)
+                else:
+                    invalid_initial_code_count += 1
+            _add_question_analysis(llm_data_by_question_map, question_count, question_fields,
+                                   valid_initial_codes, invalid_initial_code_count)
+        elif event == ITEM:
+            logger.error(f"JSON文件格式错误：第 {index + 1} 个问题分析条目不是对象")
+            return None
+    return question_count
+
+def load_llm_json_data(merged_json_filepath: str, coding_store_path: Optional[str] = None) -> Optional[Dict[str, Any]]:
     """
     加载并处理LLM分析的JSON数据。
     
+    提供 coding_store_path 且列式编码存储与合并结果一致时直接从存储按表读取；
+    否则流式读取JSON文件：initial_codes 逐条目解码并立即验证，只保留有效条目，
+    不会同时在内存中持有完整文档。两种方式得到的结果相同。
+    
     Args:
         merged_json_filepath: 合并后的LLM分析JSON文件路径
+        coding_store_path: 可选，02 阶段生成的列式编码存储路径
         
     Returns:
         Optional[Dict]: 清理后的问题文本到分析数据的映射，加载失败时返回None
+        每个问题的分析数据包含:
+            - themes_for_this_question: 有效的主题列表
+            - theme_lookup_for_this_question: 清理后的初始编码名称 -> 清理后的主题名称
+            - all_initial_code_entries_for_question: 有效的初始编码条目
+            - initial_codes_by_respondent: 规范化被访者ID -> 该被访者的初始编码条目
+            - code_definitions_for_this_question: 有效的编码定义
     """
     logger.info(f"开始加载LLM分析JSON文件: {merged_json_filepath}")
     
@@ -289,99 +512,37 @@ def load_llm_json_data(merged_json_filepath: str) -> Optional[Dict[str, Any]]:
         return None
         
     try:
-        with open(merged_json_filepath, 'r', encoding='utf-8') as f:
-            llm_analysis_data = json.load(f)
-            
-        if not isinstance(llm_analysis_data, list):
-            logger.error("JSON文件格式错误：根级别应该是数组")
-            return None
-            
-        logger.info(f"成功加载LLM JSON文件，包含 {len(llm_analysis_data)} 个问题的分析")
-        
         llm_data_by_question_map = {}
-        for question_idx, question_analysis in enumerate(llm_analysis_data, 1):
-            # 验证问题文本
-            q_text_from_json = question_analysis.get("question_text", "")
-            if not q_text_from_json:
-                logger.warning(f"第 {question_idx} 个问题分析条目缺少question_text字段，已跳过")
-                continue
-                
-            cleaned_q_text_for_key = clean_text_for_maxqda(q_text_from_json, is_for_code_name=True)
-            logger.debug(f"处理问题 {question_idx}: '{q_text_from_json}' (清理后: '{cleaned_q_text_for_key}')")
-            
-            # 验证并过滤有效的初始编码
-            initial_codes = question_analysis.get("initial_codes", [])
-            valid_initial_codes = [
-                code for code in initial_codes
-                if validate_initial_code_entry(code, q_text_from_json)
-            ]
-            
-            if len(valid_initial_codes) < len(initial_codes):
-                logger.warning(f"问题 '{q_text_from_json}' 的 {len(initial_codes) - len(valid_initial_codes)} 个初始编码条目无效")
-            
-            # 验证并过滤有效的主题
-            themes = question_analysis.get("themes", [])
-            valid_themes = [
-                theme for theme in themes
-                if validate_theme_entry(theme, q_text_from_json)
-            ]
-            
-            if len(valid_themes) < len(themes):
-                logger.warning(f"问题 '{q_text_from_json}' 的 {len(themes) - len(valid_themes)} 个主题编码条目无效")
-            
-            # 验证codes数组
-            codes = question_analysis.get("codes", [])
-            valid_codes = [
-                code for code in codes
-                if isinstance(code, dict) and "code_name" in code and "code_definition" in code
-            ]
-            
-            if len(valid_codes) < len(codes):
-                logger.warning(f"问题 '{q_text_from_json}' 的 {len(codes) - len(valid_codes)} 个编码定义无效")
-            
-            # 更新或创建问题数据映射
-            if cleaned_q_text_for_key not in llm_data_by_question_map:
-                llm_data_by_question_map[cleaned_q_text_for_key] = {
-                    'themes_for_this_question': valid_themes,
-                    'all_initial_code_entries_for_question': valid_initial_codes,
-                    'code_definitions_for_this_question': valid_codes
-                }
-                logger.info(f"问题 '{q_text_from_json}' 处理完成: {len(valid_initial_codes)} 个初始编码, "
-                          f"{len(valid_themes)} 个主题, {len(valid_codes)} 个编码定义")
-            else:
-                logger.warning(f"发现重复问题 '{q_text_from_json}'，正在合并数据...")
-                # 合并数据时去重
-                existing_data = llm_data_by_question_map[cleaned_q_text_for_key]
-                
-                # 使用集合去重
-                existing_themes = {theme['theme_name']: theme for theme in existing_data['themes_for_this_question']}
-                for theme in valid_themes:
-                    if theme['theme_name'] not in existing_themes:
-                        existing_data['themes_for_this_question'].append(theme)
-                
-                # 使用respondent_id去重初始编码
-                existing_codes = {
-                    (code.get('respondent_id', ''), code.get('original_answer_segment', '')): code
-                    for code in existing_data['all_initial_code_entries_for_question']
-                }
-                for code in valid_initial_codes:
-                    key = (code.get('respondent_id', ''), code.get('original_answer_segment', ''))
-                    if key not in existing_codes:
-                        existing_data['all_initial_code_entries_for_question'].append(code)
+        coding_store = CodingStore.open(coding_store_path, merged_json_filepath) if coding_store_path else None
+        if coding_store is not None:
+            logger.info(f"从编码存储读取LLM分析数据: '{coding_store_path}'")
+            with coding_store:
+                question_count = _collect_questions_from_store(coding_store, llm_data_by_question_map)
+        else:
+            question_count = _collect_questions_from_json(merged_json_filepath, llm_data_by_question_map)
+            if question_count is None:
+                return None
+
+        logger.info(f"成功加载LLM JSON文件，包含 {question_count} 个问题的分析")
                 
-                # 使用code_name去重编码定义
-                existing_definitions = {
-                    code['code_name']: code
-                    for code in existing_data['code_definitions_for_this_question']
-                }
-                for code in valid_codes:
-                    if code['code_name'] not in existing_definitions:
-                        existing_data['code_definitions_for_this_question'].append(code)
+        # 重复问题合并完成后，为每个问题一次性建立 "初始编码 -> 主题" 与 "被访者 -> 初始编码" 索引
+        for question_data in llm_data_by_question_map.values():
+            question_data['theme_lookup_for_this_question'] = build_theme_lookup(
+                question_data['themes_for_this_question'],
+                normalize=normalize_question_key
+            )
+            question_data['initial_codes_by_respondent'] = group_initial_codes_by_respondent(
+                question_data['all_initial_code_entries_for_question'],
+                normalize_respondent_id
+            )
                 
         logger.info(f"LLM编码数据已映射到 {len(llm_data_by_question_map)} 个问题")
         return llm_data_by_question_map
         
-    except json.JSONDecodeError as e:
+    except JsonRootTypeError:
+        logger.error("JSON文件格式错误：根级别应该是数组")
+        return None
+    except JsonStreamError as e:
         logger.error(f"解析JSON文件 '{merged_json_filepath}' 失败: {e}")
         return None
     except Exception as e:
@@ -446,7 +607,8 @@ def load_interview_csv_data(original_csv_filepath: str, respondent_id_csv_column
         logger.debug("错误堆栈:", exc_info=True)
         return None, None
 
-def load_data(merged_json_path: str, original_csv_path: str, respondent_id_col: str = None) -> Tuple[Optional[Dict], Optional[List[Dict]], Optional[List[str]]]:
+def load_data(merged_json_path: str, original_csv_path: str, respondent_id_col: str = None,
+              coding_store_path: Optional[str] = None) -> Tuple[Optional[Dict], Optional[List[Dict]], Optional[List[str]]]:
     """
     加载MaxQDA转换过程所需的所有数据。
     
@@ -454,6 +616,7 @@ def load_data(merged_json_path: str, original_csv_path: str, respondent_id_col:
         merged_json_path: 合并后的LLM分析JSON文件路径
         original_csv_path: 原始访谈CSV文件路径
         respondent_id_col: 可选，指定ID列名。如果不指定，使用第一列作为ID列
+        coding_store_path: 可选，列式编码存储路径，与合并结果一致时代替JSON文件读取
         
     返回:
         Tuple[Optional[Dict], Optional[List[Dict]], Optional[List[str]]]: 包含:
@@ -464,7 +627,7 @@ def load_data(merged_json_path: str, original_csv_path: str, respondent_id_col:
     """
     logger.info("开始数据加载流程...")
     
-    llm_data = load_llm_json_data(merged_json_path)
+    llm_data = load_llm_json_data(merged_json_path, coding_store_path)
     original_data, csv_headers = load_interview_csv_data(original_csv_path, respondent_id_col)
     
     if llm_data is not None and original_data is not None and csv_headers is not None:
@@ -479,10 +642,19 @@ def get_segments_and_codes_for_answer(
     original_answer_processed: str,
     current_respondent_id: str,
     llm_initial_code_entries_for_respondent: List[Dict],
-    themes_for_current_question: List[Dict],
-    parent_question_cleaned: str
+    theme_lookup_for_current_question: Dict[str, str],
+    parent_question_cleaned: str,
+    quote_cache: Optional[QuoteLocationCache] = None
 ) -> List[Dict]:
-    """获取答案的分段和编码信息"""
+    """
+    获取答案的分段和编码信息
+    
+    参数:
+        llm_initial_code_entries_for_respondent: 当前被访者在该问题下的初始编码条目，
+            由 load_llm_json_data 按被访者分组得到
+        theme_lookup_for_current_question: load_llm_json_data 建立的
+            清理后初始编码名称 -> 清理后主题名称 索引
+    """
     aggregated_segments_map = {}
     
     # 标准化当前被访者ID
@@ -491,16 +663,8 @@ def get_segments_and_codes_for_answer(
     if not normalized_current_id:
         return []
     
-    # 处理每个编码条目
+    # 处理每个编码条目（条目已在加载时按被访者分组，无需再比较 respondent_id）
     for llm_entry in llm_initial_code_entries_for_respondent:
-        # 标准化编码条目中的被访者ID
-
-        # TODO: 合并的JSON文件已经在 02inductive_merge_json.py 中验证过，无需再次验证了，直接获取respondent_id即可
-        entry_id = normalize_respondent_id(llm_entry.get('respondent_id'))
-        #TODO: 这里直接比较 _id 与 respondent_id 是否一致即可
-        if entry_id != normalized_current_id:
-            continue
-            
         code_names_list = llm_entry.get("code_name", [])
         supporting_quotes_list = llm_entry.get("supporting_quote", [])
         pairs_list = llm_entry.get("pairs", [])
@@ -542,7 +706,8 @@ def get_segments_and_codes_for_answer(
                     continue
                     
                 # 在原文中定位引文
-                found_locations = _find_locations_for_single_quote(original_answer_processed, quote_to_find)
+                found_locations = _find_locations_for_single_quote(original_answer_processed, quote_to_find,
+                                                                   quote_cache=quote_cache)
                 if not found_locations:
                     continue
                     
@@ -559,26 +724,17 @@ def get_segments_and_codes_for_answer(
                             'codes_to_apply_set': set()
                         }
                         
-                    # 尝试找到对应的主题
-                    found_theme = False
-                    for theme_entry in themes_for_current_question:
-                        theme_name_raw = theme_entry.get("theme_name")
-                        included_ics = theme_entry.get("included_initial_codes", [])
-                        cleaned_included_ics = [clean_text_for_maxqda(ic, True) for ic in included_ics]
-                        
-                        if cleaned_initial_code in cleaned_included_ics:
-                            cleaned_theme_name = clean_text_for_maxqda(theme_name_raw, is_for_code_name=True)
-                            if cleaned_theme_name:
-                                # 构建三级编码
-                                hierarchical_code = f"{parent_question_cleaned}\\{cleaned_theme_name}\\{cleaned_initial_code}"
-                                found_theme = True
-                                aggregated_segments_map[segment_key]['codes_to_apply_set'].add(hierarchical_code)
-                                break
-                                
-                    # 如果没找到主题，使用二级编码
-                    if not found_theme:
+                    # 查找对应的主题
+                    cleaned_theme_name = theme_lookup_for_current_question.get(cleaned_initial_code)
+                    if cleaned_theme_name:
+                        # 构建三级编码
+                        hierarchical_code = f"{parent_question_cleaned}\\{cleaned_theme_name}\\{cleaned_initial_code}"
+                    else:
+                        # 如果没找到主题，使用二级编码
                         hierarchical_code = f"{parent_question_cleaned}\\{cleaned_initial_code}"
-                        aggregated_segments_map[segment_key]['codes_to_apply_set'].add(hierarchical_code)
+                    aggregated_segments_map[segment_key]['codes_to_apply_set'].add(hierarchical_code)
+                    if DEBUG_TRACE.active:
+                        DEBUG_TRACE.event("片段 [%d, %d) 应用编码: %s", start, end, hierarchical_code)
                         
             except Exception as e:
                 logger.warning(f"处理编码-引文对时出错: {e}")
@@ -684,15 +840,234 @@ def build_tagged_from_question( question_for_tagging: str, original_answer: str)
     return final_line 
 
 # --- 主转换流程控制函数 ---
-def run_maxqda_conversion(
+def plan_question_coding(
+    loaded_llm_data_map: Dict[str, Any],
+    question_registry: QuestionRegistry,
+    respondent_id_csv_column: str,
+    questions_to_skip_coding: List[str]
+) -> List[Tuple[str, str, Optional[Dict[str, Any]]]]:
+    """
+    在受访者循环开始前，为每个问题列确定父编码名称及其对应的LLM编码数据。
+
+    LLM结果中的问题先按清理后的问题文本与CSV列名精确对应，
+    对应不上时再经问题注册表按大纲题号对应；仍无法对应的问题在此集中报告。
+
+    参数:
+        loaded_llm_data_map: 问题到LLM分析数据的映射
+        question_registry: 由CSV表头建立的问题注册表
+        respondent_id_csv_column: 受访者ID列名（不在返回结果中）
+        questions_to_skip_coding: 需要跳过编码的问题列表
+
+    返回:
+        List[Tuple[str, str, Optional[Dict]]]: 按列顺序排列的 (CSV列名, 父编码名称, LLM数据)，
+                                               没有可用编码数据的问题 LLM数据为 None
+    """
+    llm_key_by_number: Dict[int, str] = {}
+    unresolved_llm_questions = []
+    for llm_question_key in loaded_llm_data_map:
+        entry = question_registry.entry_for_key(llm_question_key)
+        if entry is None or entry.header is None:
+            unresolved_llm_questions.append(llm_question_key)
+        elif entry.number is not None:
+            llm_key_by_number.setdefault(entry.number, llm_question_key)
+    if unresolved_llm_questions:
+        logger.warning(f"以下LLM编码结果中的问题未对应任何CSV列，其编码不会写入MaxQDA文件: {unresolved_llm_questions}")
+
+    question_plan = []
+    for header in question_registry.headers:
+        if header == respondent_id_csv_column:
+            continue
+        entry = question_registry.entry_for_header(header)
+        llm_data = None
+        if header not in questions_to_skip_coding:
+            llm_data = loaded_llm_data_map.get(entry.key)
+            if llm_data is None and entry.number in llm_key_by_number:
+                llm_data = loaded_llm_data_map[llm_key_by_number[entry.number]]
+        question_plan.append((header, entry.key, llm_data))
+    return question_plan
+
+def build_respondent_block(
+    respondent_dict_data: Dict[str, str],
+    question_plan: List[Tuple[str, str, Optional[Dict[str, Any]]]],
+    respondent_id_csv_column: str,
+    quote_cache: QuoteLocationCache
+) -> Optional[str]:
+    """
+    生成单个受访者的MaxQDA文本块（#TEXT 标题、各问题的回答及结尾空行）。
+
+    参数:
+        respondent_dict_data: 受访者的一行CSV数据
+        question_plan: plan_question_coding 的返回值
+        respondent_id_csv_column: 受访者ID列名
+        quote_cache: 引文定位缓存
+
+    返回:
+        Optional[str]: 文本块；受访者ID无法识别时返回 None
+    """
+    current_respondent_id = respondent_dict_data.get(respondent_id_csv_column, "").strip()
+
+    # 标准化当前受访者ID
+    normalized_id = normalize_respondent_id(current_respondent_id)
+    if not normalized_id:
+        return None
+
+    # 写入受访者标题
+    block_parts = [f"#TEXT {normalized_id}\n\n"]
+
+    # 处理每个问题
+    for question_header_from_csv, current_parent_code_q_cleaned, llm_data in question_plan:
+        # 获取原始回答并清理
+        original_answer_raw = respondent_dict_data.get(question_header_from_csv, "")
+        original_answer_processed = clean_text_for_maxqda(original_answer_raw)
+
+        # 如果回答为空，跳过此问题
+        if not original_answer_processed:
+            continue
+
+        DEBUG_TRACE.enter(normalized_id, current_parent_code_q_cleaned)
+
+        # 检查是否有编码数据
+        if llm_data is not None:
+            respondent_initial_codes = llm_data.get('initial_codes_by_respondent', {}).get(normalized_id, [])
+            theme_lookup = llm_data.get('theme_lookup_for_this_question', {})
+
+            # 处理编码并生成分段
+            located_segments = get_segments_and_codes_for_answer(
+                original_answer_processed,
+                normalized_id,
+                respondent_initial_codes,
+                theme_lookup,
+                current_parent_code_q_cleaned,
+                quote_cache=quote_cache
+            )
+
+            # 如果找到编码，生成带编码的输出
+            if located_segments:
+                non_overlapping = resolve_overlaps_and_aggregate_codes(
+                    located_segments,
+                    original_answer_processed
+                )
+                tagged_line = build_tagged_line_from_segments(
+                    original_answer_processed,
+                    non_overlapping
+                )
+                block_parts.append(f"{tagged_line}\n\n")
+            else:
+                # 没有找到编码，输出添加题目编码的原始文本
+                block_parts.append(f"{original_answer_processed}\n\n")
+        else:
+            # 没有编码数据，输出带有问题编码的原始文本
+            tagged_with_question_code = build_tagged_from_question(
+                question_header_from_csv,
+                original_answer_processed
+            )
+            block_parts.append(f"{tagged_with_question_code}\n\n")
+
+    DEBUG_TRACE.leave()
+
+    # 受访者之间添加空行
+    block_parts.append("\n")
+    return "".join(block_parts)
+
+# --- 多进程转换 ---
+# 子进程的只读状态，由 _init_conversion_worker 在每个工作进程启动时设置一次
+_WORKER_STATE: Dict[str, Any] = {}
+
+def _init_conversion_worker(
+    question_plan: List[Tuple[str, str, Optional[Dict[str, Any]]]],
+    respondent_id_csv_column: str,
+    quote_cache_entries: Dict[str, List[Dict[str, Any]]],
+    debug_trace: DebugTrace
+) -> None:
+    """工作进程初始化：保存共享的只读数据，并以主进程已有的缓存条目预热本进程缓存"""
+    global DEBUG_TRACE
+    DEBUG_TRACE = debug_trace
+    quote_cache = QuoteLocationCache()
+    quote_cache.merge(quote_cache_entries)
+    _WORKER_STATE.update(
+        question_plan=question_plan,
+        id_column=respondent_id_csv_column,
+        quote_cache=quote_cache,
+        known_cache_keys=set(quote_cache_entries),
+    )
+
+def _convert_respondent_shard(
+    respondent_shard: List[Dict[str, str]]
+) -> Tuple[List[Optional[str]], Dict[str, List[Dict[str, Any]]], int, int]:
+    """
+    在工作进程中转换一批受访者。
+
+    返回:
+        Tuple: (按输入顺序排列的文本块, 本批新增的缓存条目, 本批缓存命中次数, 本批缓存未命中次数)
+    """
+    quote_cache: QuoteLocationCache = _WORKER_STATE['quote_cache']
+    hits_before, misses_before = quote_cache.hits, quote_cache.misses
+    blocks = [
+        build_respondent_block(
+            respondent_dict_data,
+            _WORKER_STATE['question_plan'],
+            _WORKER_STATE['id_column'],
+            quote_cache
+        )
+        for respondent_dict_data in respondent_shard
+    ]
+    known_keys = _WORKER_STATE['known_cache_keys']
+    new_entries = {key: locations for key, locations in quote_cache.snapshot().items()
+                   if key not in known_keys}
+    known_keys.update(new_entries)
+    return (blocks, new_entries,
+            quote_cache.hits - hits_before, quote_cache.misses - misses_before)
+
+def _iter_conversion_in_pool(
+    question_plan: List[Tuple[str, str, Optional[Dict[str, Any]]]],
+    loaded_original_interviews: List[Dict[str, str]],
+    respondent_id_csv_column: str,
+    quote_cache: QuoteLocationCache,
+    workers: int
+) -> Iterator[Optional[str]]:
+    """
+    将受访者按原始顺序切分为连续分片，交由进程池并行转换，逐个产出文本块。
+
+    每个工作进程只在启动时接收一次问题编码计划（只读），分片结果按提交顺序取回，
+    因此产出的文本块顺序与串行转换一致；各进程新增的缓存条目与命中统计合并回 quote_cache。
+    同时在途的分片不超过 workers + 1 个（取回一个分片后才提交下一个），
+    已完成但尚未写出的分片结果不会在内存中堆积。
+    """
+    shard_count = min(len(loaded_original_interviews), workers * PARALLEL_SHARDS_PER_WORKER)
+    shard_size = -(-len(loaded_original_interviews) // shard_count)
+    shards = [loaded_original_interviews[start:start + shard_size]
+              for start in range(0, len(loaded_original_interviews), shard_size)]
+    logger.info(f"使用 {workers} 个进程并行转换 {len(loaded_original_interviews)} 位受访者 ({len(shards)} 个分片)")
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_conversion_worker,
+        initargs=(question_plan, respondent_id_csv_column, quote_cache.snapshot(), DEBUG_TRACE)
+    ) as executor:
+        remaining_shards = iter(shards)
+        in_flight = deque(executor.submit(_convert_respondent_shard, shard)
+                          for _, shard in zip(range(workers + 1), remaining_shards))
+        while in_flight:
+            shard_blocks, new_entries, hits, misses = in_flight.popleft().result()
+            next_shard = next(remaining_shards, None)
+            if next_shard is not None:
+                in_flight.append(executor.submit(_convert_respondent_shard, next_shard))
+            quote_cache.merge(new_entries, hits=hits, misses=misses)
+            yield from shard_blocks
+
+def iter_maxqda_blocks(
     loaded_llm_data_map: Dict[str, Any],
     loaded_original_interviews: List[Dict[str, str]],
     loaded_csv_headers: List[str],
     respondent_id_csv_column: str,
-    questions_to_skip_coding: List[str] = None
-) -> str:
+    questions_to_skip_coding: List[str] = None,
+    quote_cache: Optional[QuoteLocationCache] = None,
+    workers: int = 1
+) -> Iterator[str]:
     """
-    执行MaxQDA转换流程，将LLM分析数据转换为MaxQDA格式。
+    执行MaxQDA转换流程，按受访者顺序逐个产出MaxQDA格式的文本块。
+
+    一次只持有一个受访者（并行时为一个分片）的输出，配合 save_maxqda_blocks 可流式写出文件。
 
     参数:
         loaded_llm_data_map: 问题到LLM分析数据的映射
@@ -700,6 +1075,8 @@ def run_maxqda_conversion(
         loaded_csv_headers: CSV文件的列标题列表
         respondent_id_csv_column: 受访者ID列名
         questions_to_skip_coding: 需要跳过编码的问题列表
+        quote_cache: 可选的引文定位缓存，未提供时使用仅在本次转换内有效的内存缓存
+        workers: 并行转换的进程数，1 表示在当前进程中串行转换；两种方式的输出完全一致
     
         处理策略：
             1. 有编码且找到匹配问题的编码 -> 输出带编码的文本
@@ -707,110 +1084,133 @@ def run_maxqda_conversion(
             3. 没有编码数据但匹配问题的编码 -> 输出原始文本
             4. 没有编码数据但没找到匹配问题的编码 -> 报告问题，跳过
     
-    返回:
-        str: MaxQDA格式的文本内容
+    产出:
+        str: 单个受访者的文本块，核心数据不完整时不产出任何内容
     """
     logger.info("开始MaxQDA格式转换")
     
-    # 获取调试目标
-    target_id_for_debug = str(P_DBUG_RESPONDENT_ID).strip() if P_DBUG_RESPONDENT_ID is not None else None
-    target_q_cleaned_for_debug = clean_text_for_maxqda(P_DBUG_QUESTION_TEXT_RAW, is_for_code_name=True) \
-                               if P_DBUG_QUESTION_TEXT_RAW is not None else None
-    
-    # 标准化调试目标ID
-    if target_id_for_debug:
-        target_id_for_debug = normalize_respondent_id(target_id_for_debug)
-    
     # 验证输入数据
     if not all([loaded_llm_data_map, loaded_original_interviews, loaded_csv_headers]):
         logger.error("核心数据不完整，无法继续")
-        return ""
-    
-    structured_text_parts = []
-    unmatched_questions = set()  # 记录未匹配的问题
-    skipped_questions = set()    # 记录被跳过的问题
+        return
 
-    try:    
-        # 处理每个受访者的数据
-        for i, respondent_dict_data in enumerate(loaded_original_interviews):
-            current_respondent_id = respondent_dict_data.get(respondent_id_csv_column, "").strip()
-            
-            # 标准化当前受访者ID
-            normalized_id = normalize_respondent_id(current_respondent_id)
-            if not normalized_id:
-                continue
-            
-            # 写入受访者标题
-            structured_text_parts.append(f"#TEXT {normalized_id}\n\n")
-            
-            # 处理每个问题
-            for question_header_from_csv in loaded_csv_headers:
-                # 跳过ID列
-                if question_header_from_csv == respondent_id_csv_column:
-                    continue
-                
-                # 获取原始回答并清理
-                original_answer_raw = respondent_dict_data.get(question_header_from_csv, "")
-                original_answer_processed = clean_text_for_maxqda(original_answer_raw)
-                
-                # 如果回答为空，跳过此问题
-                if not original_answer_processed:
-                    continue
+    if quote_cache is None:
+        quote_cache = QuoteLocationCache()
+    if questions_to_skip_coding is None:
+        questions_to_skip_coding = []
 
-                current_parent_code_q_cleaned = clean_text_for_maxqda(
-                    question_header_from_csv, 
-                    is_for_code_name=True
-                )
-                
-                # 检查是否有编码数据
-                if (current_parent_code_q_cleaned in loaded_llm_data_map and 
-                    question_header_from_csv not in questions_to_skip_coding):
-                    # 获取编码数据
-                    llm_data = loaded_llm_data_map[current_parent_code_q_cleaned]
-                    all_initial_codes = llm_data.get('all_initial_code_entries_for_question', [])
-                    themes_for_question = llm_data.get('themes_for_this_question', [])
-                    
-                    # 处理编码并生成分段
-                    located_segments = get_segments_and_codes_for_answer(
-                        original_answer_processed,
-                        normalized_id,
-                        all_initial_codes,
-                        themes_for_question,
-                        current_parent_code_q_cleaned
-                    )
-                    
-                    # 如果找到编码，生成带编码的输出
-                    if located_segments:
-                        non_overlapping = resolve_overlaps_and_aggregate_codes(
-                            located_segments,
-                            original_answer_processed
-                        )
-                        tagged_line = build_tagged_line_from_segments(
-                            original_answer_processed,
-                            non_overlapping
-                        )
-                        structured_text_parts.append(f"{tagged_line}\n\n")
-                    else:
-                        # 没有找到编码，输出添加题目编码的原始文本
-                        structured_text_parts.append(f"{original_answer_processed}\n\n")
-                else:
-                    # 没有编码数据，输出带有问题编码的原始文本
-                    tagged_with_question_code = build_tagged_from_question(
-                        question_header_from_csv,
-                        original_answer_processed
-                    )
-                    structured_text_parts.append(f"{tagged_with_question_code}\n\n")
-            
-            # 受访者之间添加空行
-            structured_text_parts.append("\n")
-            
-        logger.info("成功生成MaxQDA格式文本")
-        return "".join(structured_text_parts)
-        
+    # 一次性建立问题注册表（CSV列名 <-> 大纲题号 <-> 父编码名称），并集中报告无法对应的问题
+    question_registry = build_question_registry(loaded_csv_headers, respondent_id_csv_column)
+    question_registry.log_unmatched(logger)
+    question_plan = plan_question_coding(
+        loaded_llm_data_map,
+        question_registry,
+        respondent_id_csv_column,
+        questions_to_skip_coding
+    )
+
+    # 设置调试跟踪目标
+    DEBUG_TRACE.configure(P_DBUG_RESPONDENT_ID, P_DBUG_QUESTION_TEXT_RAW, question_registry)
+
+    if workers > 1 and len(loaded_original_interviews) > 1:
+        respondent_blocks = _iter_conversion_in_pool(
+            question_plan,
+            loaded_original_interviews,
+            respondent_id_csv_column,
+            quote_cache,
+            workers
+        )
+    else:
+        respondent_blocks = (
+            build_respondent_block(
+                respondent_dict_data,
+                question_plan,
+                respondent_id_csv_column,
+                quote_cache
+            )
+            for respondent_dict_data in loaded_original_interviews
+        )
+
+    for block in respondent_blocks:
+        if block is not None:
+            yield block
+
+    logger.info("成功生成MaxQDA格式文本")
+    logger.info(quote_cache.stats_summary())
+
+def run_maxqda_conversion(
+    loaded_llm_data_map: Dict[str, Any],
+    loaded_original_interviews: List[Dict[str, str]],
+    loaded_csv_headers: List[str],
+    respondent_id_csv_column: str,
+    questions_to_skip_coding: List[str] = None,
+    quote_cache: Optional[QuoteLocationCache] = None,
+    workers: int = 1
+) -> str:
+    """
+    执行MaxQDA转换流程，返回完整的MaxQDA格式文本。
+
+    参数同 iter_maxqda_blocks；大型项目请直接将 iter_maxqda_blocks 交给 save_maxqda_blocks 流式写出。
+
+    返回:
+        str: MaxQDA格式的文本内容，出错时返回空字符串
+    """
+    try:
+        return "".join(iter_maxqda_blocks(
+            loaded_llm_data_map,
+            loaded_original_interviews,
+            loaded_csv_headers,
+            respondent_id_csv_column,
+            questions_to_skip_coding=questions_to_skip_coding,
+            quote_cache=quote_cache,
+            workers=workers
+        ))
     except Exception as e:
         logger.error(f"生成MaxQDA输出时出错: {e}")
         return ""
 
+def save_maxqda_blocks(blocks: Iterable[str], output_maxqda_filepath: str) -> bool:
+    """
+    将MaxQDA文本块流式写入文件。
+
+    先经缓冲写入同目录下的临时文件，全部写完后再原子替换目标文件；
+    转换中途出错或没有任何内容时删除临时文件，保留原有的输出文件。
+
+    参数:
+        blocks: 文本块的可迭代对象（通常为 iter_maxqda_blocks 的返回值）
+        output_maxqda_filepath: 输出文件路径
+
+    返回:
+        bool: 保存成功返回True，否则返回False
+    """
+    temp_filepath = f"{output_maxqda_filepath}.tmp"
+    try:
+        # 确保输出目录存在
+        os.makedirs(os.path.dirname(output_maxqda_filepath), exist_ok=True)
+
+        written_blocks = 0
+        with open(temp_filepath, 'w', encoding='utf-8', buffering=MAXQDA_WRITE_BUFFER_SIZE) as f:
+            for block in blocks:
+                if block:
+                    f.write(block)
+                    written_blocks += 1
+
+        if not written_blocks:
+            logger.error("结构化文本为空，无法保存")
+            os.remove(temp_filepath)
+            return False
+
+        os.replace(temp_filepath, output_maxqda_filepath)
+        logger.info(f"成功保存MaxQDA文件: {output_maxqda_filepath} (共 {written_blocks} 个文本块)")
+        return True
+
+    except Exception as e:
+        logger.error(f"保存MaxQDA文件时出错: {e}")
+        logger.debug("错误堆栈:", exc_info=True)
+        if os.path.exists(temp_filepath):
+            os.remove(temp_filepath)
+        return False
+
 def get_original_id_and_save_maxqda(structured_txt: str, output_maxqda_filepath: str) -> bool:
     """
     将生成的MaxQDA结构化文本保存到文件。
@@ -827,26 +1227,19 @@ def get_original_id_and_save_maxqda(structured_txt: str, output_maxqda_filepath:
     if not structured_txt:
         logger.error("结构化文本为空，无法保存")
         return False
-        
-    try:
-        # 确保输出目录存在
-        os.makedirs(os.path.dirname(output_maxqda_filepath), exist_ok=True)
-        
-        # 写入文件
-        with open(output_maxqda_filepath, 'w', encoding='utf-8') as f:
-            f.write(structured_txt)
-            
-        logger.info(f"成功保存MaxQDA文件: {output_maxqda_filepath}")
-        return True
-        
-    except Exception as e:
-        logger.error(f"保存MaxQDA文件时出错: {e}")
-        logger.debug("错误堆栈:", exc_info=True)
-        return False
+
+    return save_maxqda_blocks([structured_txt], output_maxqda_filepath)
 
 # ======================================================================
 # 主程序
 # ======================================================================
+def parse_arguments() -> argparse.Namespace:
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="将LLM归纳编码结果转换为MaxQDA导入文件")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="并行转换的进程数，默认 1 (串行)")
+    return parser.parse_args()
+
 def main() -> None:
     """
     主执行函数，编排MaxQDA转换流程。
@@ -857,6 +1250,8 @@ def main() -> None:
     3. 执行转换流程
     4. 处理执行过程中的错误
     """
+    args = parse_arguments()
+
     logger.info("="*80)
     logger.info("开始任务: 生成最终MaxQDA导入文件")
     logger.info("脚本: 03inductive_create_maxqda_themecode.py | 版本: 3.0")
@@ -870,18 +1265,22 @@ def main() -> None:
         merged_json_path = get_path('inductive_merged_json')
         original_csv_path = get_path('UI')
         output_maxqda_path = get_path('inductive_maxqda_themecode')
-        
+        quote_cache_path = get_path('inductive_quote_cache') if USE_DISK_QUOTE_CACHE else None
+        coding_store_path = get_path('inductive_coding_store') if USE_CODING_STORE else None
 
         logger.info("文件路径配置:")
         logger.info(f"  - 合并JSON: '{merged_json_path}'")
         logger.info(f"  - 原始CSV: '{original_csv_path}'")
         logger.info(f"  - 输出MaxQDA: '{output_maxqda_path}'")
+        logger.info(f"  - 引文定位缓存: '{quote_cache_path or '仅内存'}'")
+        logger.info(f"  - 编码存储: '{coding_store_path or '不使用'}'")
 
         # 步骤2: 加载所有源数据
         logger.info("\n步骤2: 加载源数据...")
         llm_data, original_data, csv_headers = load_data(
             merged_json_path, 
-            original_csv_path
+            original_csv_path,
+            coding_store_path=coding_store_path
         )
 
         if not (llm_data and original_data and csv_headers):
@@ -900,16 +1299,21 @@ def main() -> None:
         # 步骤3: 执行核心转换流程
         logger.info("\n步骤3: 执行核心转换流程...")
         
-        structured_text = run_maxqda_conversion(
+        quote_cache = QuoteLocationCache(cache_file=quote_cache_path)
+        maxqda_blocks = iter_maxqda_blocks(
             llm_data,
             original_data,
             csv_headers,
             id_column,  # 使用第一列作为ID列
-            questions_to_skip_coding=questions_to_skip
+            questions_to_skip_coding=questions_to_skip,
+            quote_cache=quote_cache,
+            workers=args.workers
         )
         
-        # 保存结果
-        if not get_original_id_and_save_maxqda(structured_text, output_maxqda_path):
+        # 边转换边写出结果
+        saved = save_maxqda_blocks(maxqda_blocks, output_maxqda_path)
+        quote_cache.save()
+        if not saved:
             logger.error("MAXQDA文本保存失败")
             return
             
@@ -31,17 +31,18 @@ from parameters import (
     SDIR_GROUP_QDATA,           # categor的 question data 路径
     SDIR_GROUP_CBOOK,           # category的 codebook data 路径
 )
-# 配置日志系统
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('workflow.log', encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
+from coding_index import build_theme_lookup
+from coding_store import CodingStore
+from question_registry import QuestionRegistry
+from logger import setup_logging
+
+# 配置日志系统（全流程共用的日志后端）
+setup_logging()
 logger = logging.getLogger(__name__)
 
+# 是否从 02 阶段生成的列式编码存储读取未变化的问题JSON
+USE_CODING_STORE = True
+
 # ---信息提取模块--
 
 # 解析单个JSON文件，提取核心编码，从json文件中提取编码信息，输入为json.load(f)的返回值
@@ -67,12 +68,8 @@ def extract_code_details(question_data: Dict[str, Any]) -> List[Dict[str, Any]]:
     
     extracted_codes = []
     
-    # 1. 快速建立问题内 "编码 -> 主题" 的映射
-    theme_map = {
-        initial_code: theme.get('theme_name', 'N/A')
-        for theme in question_data.get('themes', [])
-        for initial_code in theme.get('included_initial_codes', [])
-    }
+    # 1. 快速建立问题内 "编码 -> 主题" 的映射（与 03 MaxQDA 转换共用同一索引规则）
+    theme_map = build_theme_lookup(question_data.get('themes', []))
 
     # 2. 遍历该问题中定义的所有编码 ("codes" 列表)
     for code_info in question_data.get('codes', []):
@@ -155,6 +152,26 @@ def select_excerpts_quote(quotes: List[str], n: int = -1) -> List[str]:
     return sorted(quotes, key=len, reverse=True)[:n]
 
 # ---核心任务流---
+def parse_question_number(filename: str) -> Optional[int]:
+    """
+    从 inductive_questionN.json 形式的文件名中解析问题编号，格式不符时返回 None
+
+    查找 "inductive_question" 后面可能存在的非数字字符(\D*)，然后捕获第一个连续的数字串(\d+)，
+    能正确处理 "inductive_question12.json", "inductive_question_12.json", "inductive_question12-13.json" 等情况
+    """
+    match = re.search(r'inductive_question\D*(\d+)', os.path.basename(filename))
+    return int(match.group(1)) if match else None
+
+def check_question_text(question_registry: QuestionRegistry, question_text: str, json_path: str) -> None:
+    """检查JSON中的 question_text 是否对应文件名中的大纲题号，不一致时发出警告"""
+    expected_number = parse_question_number(json_path)
+    entry = question_registry.resolve(question_text)
+    if entry is None:
+        logger.warning(f"文件 {os.path.basename(json_path)} 中的问题 '{question_text}' 未对应任何大纲问题")
+    elif entry.number != expected_number:
+        logger.warning(f"文件 {os.path.basename(json_path)} 中的问题 '{question_text}' "
+                       f"对应大纲题号 {entry.number}，与文件名中的题号 {expected_number} 不一致")
+
 def get_and_validate_json_files_in_category(category: str) -> Tuple[bool, List[str], set, set]:
     """
     获取给定分类目录中的JSON文件，并验证其是否与大纲(OUTLINE)一致。
@@ -194,24 +211,12 @@ def get_and_validate_json_files_in_category(category: str) -> Tuple[bool, List[s
     # 3. 提取实际文件的编号
     actual_numbers = set()
     for f in json_files:
-        try:
-            # 使用正则表达式来灵活地解析文件名
-            # 这个模式会查找 "inductive_question" 后面可能存在的非数字字符(\D*)，然后捕获第一个连续的数字串(\d+)
-            # 它能正确处理 "inductive_question12.json", "inductive_question_12.json", "inductive_question12-13.json" 等情况
-            match = re.search(r'inductive_question\D*(\d+)', f)
-            
-            if match:
-                # 提取捕获到的第一个数字组并转换为整数
-                num = int(match.group(1))
-                actual_numbers.add(num)
-            else:
-                # 如果正则表达式没有匹配到，说明文件名格式不符合预期
-                logger.warning(f"无法从文件名 '{f}' 中解析问题编号，格式不符，已跳过。")
-                
-        except ValueError:
-            # 这个异常捕获理论上不太可能触发，因为正则保证了group(1)是数字，但保留以增加健壮性
-            logger.warning(f"从文件名 '{f}' 中解析出的内容不是有效数字，已跳过。")
-            continue
+        num = parse_question_number(f)
+        if num is not None:
+            actual_numbers.add(num)
+        else:
+            # 如果正则表达式没有匹配到，说明文件名格式不符合预期
+            logger.warning(f"无法从文件名 '{f}' 中解析问题编号，格式不符，已跳过。")
 
     # 4. 对比并返回结果
     if actual_numbers == expected_numbers:
@@ -222,7 +227,7 @@ def get_and_validate_json_files_in_category(category: str) -> Tuple[bool, List[s
         missing = expected_numbers - actual_numbers
         # 找出多余文件对应的文件编号
         extra_nums = actual_numbers - expected_numbers
-        extra_files = {f for f in json_files if int(f.split('.')[0].replace('inductive_question', '')) in extra_nums}
+        extra_files = {f for f in json_files if parse_question_number(f) in extra_nums}
         
         return False, [], missing, extra_files
 
@@ -236,6 +241,14 @@ def generate_category_codebook() -> Dict[str, pd.DataFrame]:
     # 初始化一个字典来存储每个分类的编码本
     codebook_dict = {}
 
+    # 大纲问题注册表，用于核对各JSON文件中的问题文本与题号
+    question_registry = QuestionRegistry([], QUESTION_MAP)
+
+    # 02 阶段生成的列式编码存储（缺失或格式不一致时为 None，全部从JSON文件读取）
+    coding_store = CodingStore.open(get_path('inductive_coding_store')) if USE_CODING_STORE else None
+    if coding_store is not None:
+        logger.info(f"使用编码存储读取未变化的问题JSON: {coding_store.db_path}")
+
     # 外层循环: 遍历所有分类
     # **修正点**: 使用 UNIQUE_CATEGORIES 遍历可以确保我们处理所有定义过的分类
     for category in UNIQUE_CATEGORIES:
@@ -266,14 +279,18 @@ def generate_category_codebook() -> Dict[str, pd.DataFrame]:
         for json_path in valid_json_paths: 
             # 内层循环: 遍历JSON文件中的内容 (这里是为 @codebook-extract 任务预留的框架)
             try:
-                with open(json_path, 'r', encoding='utf-8') as f:
-                    question_data_list = json.load(f)
-                    if not question_data_list: continue
-
-                    question_data = question_data_list[0] 
-                    # 调用函数1: 提取单个文件中的所有编码信息
-                    codes_from_file = extract_code_details(question_data)
-                    all_codes_for_category.extend(codes_from_file)
+                # 文件自 02 阶段建库以来未变化时直接从编码存储读取，否则解析JSON文件
+                question_data_list = coding_store.load_source_questions(json_path) if coding_store is not None else None
+                if question_data_list is None:
+                    with open(json_path, 'r', encoding='utf-8') as f:
+                        question_data_list = json.load(f)
+                if not question_data_list: continue
+
+                question_data = question_data_list[0] 
+                check_question_text(question_registry, question_data.get('question_text', ''), json_path)
+                # 调用函数1: 提取单个文件中的所有编码信息
+                codes_from_file = extract_code_details(question_data)
+                all_codes_for_category.extend(codes_from_file)
 
             except Exception as e:
                 logger.error(f"处理文件 {json_path} 时出错: {e}")
@@ -312,6 +329,9 @@ def generate_category_codebook() -> Dict[str, pd.DataFrame]:
         logger.info(f"分类 '{category}' 编码本生成完毕，共包含 {len(df)} 个编码条目。")
         logger.info(f"--- 完成处理分类: '{category}' ---\n")
 
+    if coding_store is not None:
+        coding_store.close()
+
     # TODO: @codebook-save 逻辑
     logger.info("任务 @codebook 已完成所有数据处理和转换。")
     return codebook_dict
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+MaxQDA 文本清理基准测试
+
+对比 03inductive_create_maxqda_themecode.clean_text_for_maxqda 的原实现（逐个 str.replace、
+每次调用重新查找正则）与当前实现（单个 str.translate 映射表、预编译正则、编码名称路径 LRU 缓存），
+统计单次调用耗时，并逐条校验两种实现的返回结果是否完全一致。
+
+调用序列按转换时的实际模式构造：
+1. 每个被访者的每个问题：问题标题（编码名称路径）与回答文本（普通路径）
+2. 合并后的归纳编码JSON中每条 initial_codes 的编码名称（编码名称路径）与引文（普通路径）
+3. 按固定随机种子生成的、包含换行、'#'、中英文标点的随机字符串，覆盖各个替换分支
+
+用法:
+    python benchmark_clean_text.py [--apps bilibili 金铲铲之战] [--repeat R] [--random N]
+"""
+
+import os
+import re
+import csv
+import json
+import time
+import random
+import logging
+import argparse
+import importlib
+from typing import Callable, List, Optional, Tuple
+
+from parameters import PROJECT_ROOT, DATA_DIR_BASE_NAME, SDIR_00_RAW, SDIR_03_INDUCTIVE
+
+maxqda = importlib.import_module('03inductive_create_maxqda_themecode')
+
+DEFAULT_APPS = ['bilibili', '金铲铲之战']
+RANDOM_SEED = 20240501
+RANDOM_ALPHABET = '用户体验很好的游戏abc 123\r\n\t#\\"\'？！：；，。（）【】《》…—～·.!?:;,'
+
+logger = logging.getLogger(maxqda.__name__)
+
+# 原实现的中英文标点映射，按原字典顺序逐个替换（其中 ': "\'", ' 一项来自原代码中的三引号字面量）
+LEGACY_PUNCTUATION_PAIRS = [
+    ('？', '?'), ('！', '!'), ('：', ':'), ('；', ';'),
+    ('，', ','), ('。', '.'), ('"', '"'),
+    (': "\'", ', "'"), ('（', '('), ('）', ')'),
+    ('【', '['), ('】', ']'), ('《', '<'), ('》', '>'),
+    ('…', '...'), ('—', '-'), ('～', '~'), ('·', '.')
+]
+
+
+def legacy_clean_text_for_maxqda(text: Optional[str], is_for_code_name: bool = False) -> str:
+    """clean_text_for_maxqda 的原实现，作为对照基准"""
+    if text is None:
+        return ""
+
+    cleaned_text = str(text).replace('\r\n', ' ').replace('\n', ' ').replace('\r', ' ').replace('#', '')
+
+    if is_for_code_name:
+        cleaned_text = cleaned_text.replace('\\', '/').replace('"', "'")
+        for ch, en in LEGACY_PUNCTUATION_PAIRS:
+            cleaned_text = cleaned_text.replace(ch, en)
+        cleaned_text = re.sub(r'[.!?:;,]+$', '', cleaned_text)
+
+    cleaned_text = re.sub(r'\s+', ' ', cleaned_text).strip()
+
+    logger.debug("文本清理 - 原文: '%.50s...', 清理后: '%.50s...'", text, cleaned_text)
+
+    return cleaned_text
+
+
+def _app_dir(app_name: str) -> str:
+    return os.path.join(PROJECT_ROOT, DATA_DIR_BASE_NAME, f"{app_name}_dir")
+
+
+def load_conversion_calls(app_name: str) -> List[Tuple[str, bool]]:
+    """按转换流程的调用模式构造 (文本, is_for_code_name) 序列，数据文件不存在时返回空列表"""
+    calls: List[Tuple[str, bool]] = []
+
+    id_csv = os.path.join(_app_dir(app_name), SDIR_00_RAW, f"{app_name}-id.csv")
+    if os.path.exists(id_csv):
+        with open(id_csv, 'r', encoding='utf-8-sig') as f:
+            reader = csv.reader(f)
+            headers = next(reader, [])
+            for row in reader:
+                for header, answer in zip(headers[1:], row[1:]):
+                    calls.append((header, True))
+                    calls.append((answer, False))
+
+    merged_json = os.path.join(_app_dir(app_name), SDIR_03_INDUCTIVE, f"{app_name}_inductive_codes.json")
+    if os.path.exists(merged_json):
+        with open(merged_json, 'r', encoding='utf-8') as f:
+            questions = json.load(f)
+        for question in questions:
+            for entry in question.get('initial_codes', []):
+                for code_name in entry.get('code_name', []):
+                    calls.append((code_name, True))
+                for quote in entry.get('supporting_quote', []):
+                    calls.append((quote, False))
+    return calls
+
+
+def make_random_calls(count: int) -> List[Tuple[str, bool]]:
+    """生成覆盖各替换分支的随机字符串（两种路径各一次）"""
+    rng = random.Random(RANDOM_SEED)
+    calls = []
+    for _ in range(count):
+        text = ''.join(rng.choice(RANDOM_ALPHABET) for _ in range(rng.randint(0, 30)))
+        calls.append((text, True))
+        calls.append((text, False))
+    return calls
+
+
+def run_calls(func: Callable[[Optional[str], bool], str], calls: List[Tuple[str, bool]],
+              repeat: int, before_round: Optional[Callable[[], None]] = None) -> Tuple[float, List[str]]:
+    """依次执行全部调用，返回最快一轮的耗时和结果"""
+    best_elapsed = float('inf')
+    results: List[str] = []
+    for _ in range(repeat):
+        if before_round is not None:
+            before_round()
+        start = time.perf_counter()
+        results = [func(text, is_for_code_name) for text, is_for_code_name in calls]
+        best_elapsed = min(best_elapsed, time.perf_counter() - start)
+    return best_elapsed, results
+
+
+def benchmark_calls(label: str, calls: List[Tuple[str, bool]], repeat: int) -> bool:
+    """对一组调用运行基准测试并打印结果，返回新旧实现结果是否一致"""
+    if not calls:
+        print(f"[{label}] 未找到可用的数据，跳过")
+        return True
+
+    clear_cache = maxqda._clean_code_name_for_maxqda.cache_clear
+    legacy_time, legacy_results = run_calls(legacy_clean_text_for_maxqda, calls, repeat)
+    cold_time, current_results = run_calls(maxqda.clean_text_for_maxqda, calls, repeat, clear_cache)
+    warm_time, warm_results = run_calls(maxqda.clean_text_for_maxqda, calls, repeat)
+
+    mismatches = [i for i, (a, b, c) in enumerate(zip(legacy_results, current_results, warm_results))
+                  if not a == b == c]
+    code_name_calls = sum(1 for _, is_for_code_name in calls if is_for_code_name)
+
+    def per_call(elapsed: float) -> str:
+        return f"{elapsed / len(calls) * 1e9:8.0f} ns/次"
+
+    print(f"[{label}] 共 {len(calls)} 次调用 (编码名称路径 {code_name_calls})")
+    print(f"  原实现        : {per_call(legacy_time)}")
+    print(f"  当前(冷缓存)  : {per_call(cold_time)}  (加速 {legacy_time / max(cold_time, 1e-9):.1f}x)")
+    print(f"  当前(热缓存)  : {per_call(warm_time)}  (加速 {legacy_time / max(warm_time, 1e-9):.1f}x)")
+    if mismatches:
+        print(f"  × 结果不一致: {len(mismatches)} 次，例如 {calls[mismatches[0]]!r}")
+    else:
+        print("  √ 两种实现结果完全一致")
+    return not mismatches
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="MaxQDA 文本清理基准测试")
+    parser.add_argument('--apps', nargs='+', default=DEFAULT_APPS, help="要测试的应用名称")
+    parser.add_argument('--repeat', type=int, default=3, help="每种实现重复运行的次数，取最快一轮")
+    parser.add_argument('--random', type=int, default=20000, help="随机字符串数量，0 表示不测试")
+    args = parser.parse_args()
+
+    all_consistent = True
+    for app_name in args.apps:
+        all_consistent = benchmark_calls(app_name, load_conversion_calls(app_name), args.repeat) and all_consistent
+    if args.random > 0:
+        all_consistent = benchmark_calls('随机字符串', make_random_calls(args.random), args.repeat) and all_consistent
+    if not all_consistent:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+引文定位引擎基准测试
+
+对比 quote_locator 的 legacy（枚举全部子串）与 indexed（q-gram 过滤后打分）两种模式，
+在随仓库附带的数据集上统计耗时，并逐条校验两种模式的返回结果是否完全一致。
+
+数据来源：
+1. 金铲铲之战: 合并后的归纳编码JSON中每条 initial_codes 的 original_answer_segment 与 supporting_quote
+2. bilibili: 尚无LLM编码结果，从 -id.csv 的回答中按固定随机种子截取片段并做少量删改，
+   模拟LLM改写引文的情况，以覆盖模糊匹配路径
+
+用法:
+    python benchmark_quote_locator.py [--apps bilibili 金铲铲之战] [--limit N] [--repeat R]
+"""
+
+import os
+import csv
+import json
+import time
+import random
+import argparse
+from typing import Dict, List, Tuple
+
+from parameters import PROJECT_ROOT, DATA_DIR_BASE_NAME, SDIR_00_RAW, SDIR_03_INDUCTIVE
+from quote_locator import (
+    locate_quote,
+    LOCATOR_MODE_LEGACY,
+    LOCATOR_MODE_INDEXED,
+    MIN_LEN_FOR_FUZZY,
+)
+
+DEFAULT_APPS = ['bilibili', '金铲铲之战']
+RANDOM_SEED = 20240501
+
+
+def _app_dir(app_name: str) -> str:
+    return os.path.join(PROJECT_ROOT, DATA_DIR_BASE_NAME, f"{app_name}_dir")
+
+
+def load_llm_quote_pairs(app_name: str) -> List[Tuple[str, str]]:
+    """从合并后的归纳编码JSON中读取 (回答, 引文) 对，文件不存在时返回空列表"""
+    merged_json = os.path.join(_app_dir(app_name), SDIR_03_INDUCTIVE, f"{app_name}_inductive_codes.json")
+    if not os.path.exists(merged_json):
+        return []
+    with open(merged_json, 'r', encoding='utf-8') as f:
+        questions = json.load(f)
+    pairs = []
+    for question in questions:
+        for entry in question.get('initial_codes', []):
+            answer = entry.get('original_answer_segment') or ''
+            for quote in entry.get('supporting_quote', []):
+                if answer and quote:
+                    pairs.append((answer, quote))
+    return pairs
+
+
+def _perturb(snippet: str, rng: random.Random) -> str:
+    """删除一个字符并替换一个字符，模拟LLM对引文的轻微改写"""
+    chars = list(snippet)
+    del chars[rng.randrange(len(chars))]
+    chars[rng.randrange(len(chars))] = rng.choice('的了是在我也')
+    return ''.join(chars)
+
+
+def load_synthetic_quote_pairs(app_name: str) -> List[Tuple[str, str]]:
+    """从 -id.csv 的回答中截取引文片段，三分之二做轻微改写以走模糊匹配路径"""
+    id_csv = os.path.join(_app_dir(app_name), SDIR_00_RAW, f"{app_name}-id.csv")
+    if not os.path.exists(id_csv):
+        return []
+    rng = random.Random(RANDOM_SEED)
+    pairs = []
+    with open(id_csv, 'r', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        for row in reader:
+            for answer in row[1:]:
+                answer = answer.strip()
+                if len(answer) < 12:
+                    continue
+                length = rng.randint(8, min(60, len(answer)))
+                start = rng.randrange(len(answer) - length + 1)
+                snippet = answer[start:start + length]
+                if len(pairs) % 3 != 0:
+                    snippet = _perturb(snippet, rng)
+                pairs.append((answer, snippet))
+    return pairs
+
+
+def load_quote_pairs(app_name: str) -> Tuple[str, List[Tuple[str, str]]]:
+    """优先使用真实的LLM引文，没有编码结果的应用退回合成引文"""
+    pairs = load_llm_quote_pairs(app_name)
+    if pairs:
+        return 'LLM引文', pairs
+    return '合成引文', load_synthetic_quote_pairs(app_name)
+
+
+def run_mode(pairs: List[Tuple[str, str]], mode: str, repeat: int) -> Tuple[float, List[List[Dict]]]:
+    """以指定模式定位全部引文，返回最快一轮的耗时和结果"""
+    best_elapsed = float('inf')
+    results: List[List[Dict]] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = [locate_quote(answer, quote, mode=mode) for answer, quote in pairs]
+        best_elapsed = min(best_elapsed, time.perf_counter() - start)
+    return best_elapsed, results
+
+
+def benchmark_app(app_name: str, limit: int, repeat: int) -> bool:
+    """对单个应用运行基准测试并打印结果，返回两种模式结果是否一致"""
+    source, pairs = load_quote_pairs(app_name)
+    if limit > 0:
+        pairs = pairs[:limit]
+    if not pairs:
+        print(f"[{app_name}] 未找到可用的数据，跳过")
+        return True
+
+    legacy_time, legacy_results = run_mode(pairs, LOCATOR_MODE_LEGACY, repeat)
+    indexed_time, indexed_results = run_mode(pairs, LOCATOR_MODE_INDEXED, repeat)
+
+    mismatches = [i for i, (a, b) in enumerate(zip(legacy_results, indexed_results)) if a != b]
+    fuzzy_count = sum(1 for result in legacy_results if result and result[0]['match_type'] == 'fuzzy')
+    unmatched_count = sum(1 for (_, quote), result in zip(pairs, legacy_results)
+                          if not result and len(quote.strip()) >= MIN_LEN_FOR_FUZZY)
+
+    print(f"[{app_name}] 数据: {source}, 共 {len(pairs)} 对 "
+          f"(模糊匹配 {fuzzy_count}, 未匹配 {unmatched_count})")
+    print(f"  legacy : {legacy_time:8.3f}s")
+    print(f"  indexed: {indexed_time:8.3f}s  (加速 {legacy_time / max(indexed_time, 1e-9):.1f}x)")
+    if mismatches:
+        print(f"  × 结果不一致: {len(mismatches)} 对，例如第 {mismatches[0]} 对")
+    else:
+        print("  √ 两种模式结果完全一致")
+    return not mismatches
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="引文定位引擎基准测试")
+    parser.add_argument('--apps', nargs='+', default=DEFAULT_APPS, help="要测试的应用名称")
+    parser.add_argument('--limit', type=int, default=0, help="每个应用最多使用的引文对数量，0 表示全部")
+    parser.add_argument('--repeat', type=int, default=1, help="每种模式重复运行的次数，取最快一轮")
+    args = parser.parse_args()
+
+    all_consistent = True
+    for app_name in args.apps:
+        all_consistent = benchmark_app(app_name, args.limit, args.repeat) and all_consistent
+    if not all_consistent:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+构建清单模块
+
+记录各构建目标（如 01 阶段的每个输出文件）的输入指纹与输出文件状态，保存在 APP_PATH 下的 JSON 清单中，
+使重复运行时只重新生成输入发生变化或输出被改动、删除的目标。
+
+清单结构：
+    {"version": 1,
+     "files": {绝对路径: {"size": int, "mtime_ns": int, "sha1": str}, ...},
+     "targets": {目标名: {"inputs": {输入名: 指纹, ...}, "outputs": [绝对路径, ...]}, ...}}
+
+文件哈希以 (size, mtime_ns) 为缓存条件：文件状态未变化时直接使用记录的 sha1，
+因此输入未变化的重复运行只需要 stat 与清单比对。
+"""
+
+import os
+import json
+import hashlib
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 清单格式版本，结构变化时递增以使旧清单失效
+MANIFEST_FORMAT_VERSION = 1
+
+# 计算文件哈希时每次读取的字节数
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def fingerprint_value(value: Any) -> str:
+    """任意可 JSON 序列化的值的内容指纹"""
+    return hashlib.sha1(json.dumps(value, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class BuildManifest:
+    """
+    构建目标的输入指纹与输出文件状态
+
+    参数:
+        manifest_file: 清单文件路径，文件不存在或格式不一致时从空清单开始
+    """
+
+    def __init__(self, manifest_file: str):
+        self.manifest_file = manifest_file
+        self._files: Dict[str, Dict[str, Any]] = {}
+        self._targets: Dict[str, Dict[str, Any]] = {}
+        self._dirty = False
+        self.load()
+
+    def load(self) -> bool:
+        """
+        从磁盘加载清单
+
+        返回:
+            bool: 是否成功加载
+        """
+        if not self.manifest_file or not os.path.exists(self.manifest_file):
+            return False
+        try:
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                payload = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"读取构建清单失败，将重新生成全部目标 '{self.manifest_file}': {e}")
+            return False
+        if not isinstance(payload, dict) or payload.get('version') != MANIFEST_FORMAT_VERSION:
+            logger.info(f"构建清单格式已变化，忽略旧清单: '{self.manifest_file}'")
+            return False
+        self._files = payload.get('files', {})
+        self._targets = payload.get('targets', {})
+        return True
+
+    def save(self) -> bool:
+        """
+        将清单写回磁盘（先写临时文件再原子替换），未变化时跳过
+
+        返回:
+            bool: 是否写入成功或无需写入
+        """
+        if not self.manifest_file or not self._dirty:
+            return True
+        temp_file = f"{self.manifest_file}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.manifest_file) or '.', exist_ok=True)
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump({'version': MANIFEST_FORMAT_VERSION, 'files': self._files, 'targets': self._targets},
+                          f, ensure_ascii=False, indent=2)
+            os.replace(temp_file, self.manifest_file)
+            self._dirty = False
+            return True
+        except OSError as e:
+            logger.error(f"保存构建清单失败 '{self.manifest_file}': {e}")
+            return False
+
+    def hash_file(self, path: str) -> Optional[str]:
+        """
+        文件内容的 sha1，文件大小与修改时间未变化时直接使用清单中的记录
+
+        返回:
+            Optional[str]: 文件不存在时返回 None
+        """
+        path = os.path.abspath(path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        record = self._files.get(path)
+        if record and record['size'] == stat.st_size and record['mtime_ns'] == stat.st_mtime_ns:
+            return record['sha1']
+
+        digest = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        self._files[path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha1': digest.hexdigest()}
+        self._dirty = True
+        return digest.hexdigest()
+
+    def _output_intact(self, path: str) -> bool:
+        """输出文件存在且与记录时的状态一致（未被删除或在外部修改）"""
+        record = self._files.get(path)
+        if record is None:
+            return False
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        return record['size'] == stat.st_size and record['mtime_ns'] == stat.st_mtime_ns
+
+    def is_up_to_date(self, target: str, inputs: Dict[str, Optional[str]]) -> bool:
+        """
+        目标是否无需重新生成：输入指纹与上次记录一致，且上次记录的全部输出文件完好
+
+        参数:
+            target: 目标名称
+            inputs: 输入名到指纹的映射，任一指纹为 None（如输入文件缺失）时视为过期
+        """
+        record = self._targets.get(target)
+        if record is None or None in inputs.values() or record['inputs'] != inputs:
+            return False
+        return all(self._output_intact(path) for path in record['outputs'])
+
+    def record(self, target: str, inputs: Dict[str, Optional[str]], outputs: Iterable[str]) -> None:
+        """目标生成成功后记录其输入指纹与输出文件状态"""
+        output_paths: List[str] = []
+        for path in outputs:
+            path = os.path.abspath(path)
+            self.hash_file(path)
+            output_paths.append(path)
+        self._targets[target] = {'inputs': dict(inputs), 'outputs': output_paths}
+        self._dirty = True
+
+    def outputs_of(self, target: str) -> List[str]:
+        """上次记录的目标输出文件列表"""
+        record = self._targets.get(target)
+        return list(record['outputs']) if record else []
@@ -0,0 +1,71 @@
+"""
+编码数据索引模块
+
+为LLM归纳编码结果（inductive_questionN.json / 合并后的 inductive_codes.json）建立查找索引，
+供 03inductive_create_maxqda_themecode.py 与 04create_raw_codebook.py 共用，
+避免在每个被访者、每个编码-引文对上重复扫描 themes 列表。
+
+单个问题对象的结构：
+    {"question_text": str,
+     "initial_codes": [{"respondent_id": ..., "code_name": [...], "supporting_quote": [...], "pairs": [...]}, ...],
+     "codes": [{"code_name": str, "code_definition": str}, ...],
+     "themes": [{"theme_name": str, "theme_definition": str, "included_initial_codes": [...]}, ...]}
+"""
+
+from typing import Any, Callable, Dict, List, Optional
+
+
+def build_theme_lookup(
+    themes: List[Dict[str, Any]],
+    normalize: Optional[Callable[[Any], str]] = None
+) -> Dict[str, str]:
+    """
+    建立 "初始编码 -> 主题名称" 的查找表
+
+    参数:
+        themes: 问题对象中的 themes 列表
+        normalize: 可选的规范化函数，同时作用于初始编码名称和主题名称；
+                   为 None 时使用原始文本
+
+    返回:
+        Dict[str, str]: 规范化后的初始编码名称到规范化后主题名称的映射
+
+    说明:
+        - 同一初始编码出现在多个主题中时，以列表中第一个主题为准
+        - 主题名称为空（或规范化后为空）的主题会被跳过，其编码继续由后续主题匹配
+    """
+    theme_lookup: Dict[str, str] = {}
+    for theme in themes:
+        theme_name = theme.get('theme_name')
+        if normalize is not None:
+            theme_name = normalize(theme_name)
+        if not theme_name:
+            continue
+        for initial_code in theme.get('included_initial_codes', []):
+            code_key = normalize(initial_code) if normalize is not None else initial_code
+            theme_lookup.setdefault(code_key, theme_name)
+    return theme_lookup
+
+
+def group_initial_codes_by_respondent(
+    initial_code_entries: List[Dict[str, Any]],
+    normalize_id: Callable[[Any], Optional[str]]
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    按被访者分组初始编码条目
+
+    参数:
+        initial_code_entries: 问题对象中的 initial_codes 列表
+        normalize_id: 被访者ID规范化函数，返回 None 表示无法识别
+
+    返回:
+        Dict[str, List[Dict]]: 规范化后的被访者ID到其初始编码条目列表的映射，
+                               条目保持原有顺序；无法识别ID的条目被丢弃
+    """
+    entries_by_respondent: Dict[str, List[Dict[str, Any]]] = {}
+    for entry in initial_code_entries:
+        respondent_id = normalize_id(entry.get('respondent_id'))
+        if respondent_id is None:
+            continue
+        entries_by_respondent.setdefault(respondent_id, []).append(entry)
+    return entries_by_respondent
@@ -0,0 +1,553 @@
+"""
+归纳编码列式存储模块
+
+02inductive_merge_json.py 在保存合并结果 (inductive_codes.json) 后，将其规范化写入
+03_inductive_coding_dir 下的 SQLite 数据库，供 03inductive_create_maxqda_themecode.py 与
+04create_raw_codebook.py 直接按表读取，无需重新解析带缩进的JSON文本。
+
+表结构（ID 均为整数列）：
+    meta              (key, value)                                     格式版本与合并结果的文件状态
+    source_files      (file_id, path, size, mtime_ns)                  各问题对象的来源 inductive_questionN.json
+    questions         (question_id, file_id, file_index, question_text, fields_json, initial_codes_in_table)
+    initial_codes     (entry_id, question_id, respondent_id, original_answer_segment, has_quote_range, raw_entry)
+    entry_codes       (entry_id, position, code_name)                  初始编码条目的 code_name 列表
+    entry_quotes      (entry_id, position, supporting_quote, range_start, range_end)
+    code_quote_pairs  (entry_id, position, code_position, quote_position)   pairs 中的 "编码序号-引文序号"
+    code_definitions  (question_id, position, code_name, code_definition)
+    themes            (theme_id, question_id, theme_name, theme_definition)
+    theme_codes       (theme_id, position, initial_code)               主题的 included_initial_codes
+
+结构符合约定（见 coding_index.py）的问题对象与初始编码条目完全拆分到各表中；
+不符合约定的部分（多余字段、类型不符、pairs 格式错误等）以原始JSON保存在 fields_json / raw_entry 列，
+因此读取结果始终与 json.load 合并结果一致（字典键的顺序除外），03 与 04 原有的验证逻辑不受影响。
+
+存储只在与合并结果的文件状态一致时使用；04 按来源文件读取时还要求来源文件自建库以来未变化，
+不满足条件时调用方回退到读取JSON文件。
+"""
+
+import os
+import re
+import json
+import sqlite3
+import logging
+import urllib.request
+from itertools import count, repeat
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from json_stream import (
+    ITEM, QUESTION_END, QUESTION_FIELD, QUESTION_START, STREAM_ENTRY, STREAM_START,
+    iter_question_events
+)
+
+logger = logging.getLogger(__name__)
+
+# 存储格式版本，表结构变化时递增以使旧库失效
+CODING_STORE_FORMAT_VERSION = 1
+
+# 只读连接的内存映射大小（字节），读取时直接映射数据库文件页
+CODING_STORE_MMAP_SIZE = 1 << 28
+
+# 建库时每批写入的行数
+INSERT_BATCH_SIZE = 10000
+
+QUESTION_KEYS = frozenset(('question_text', 'initial_codes', 'codes', 'themes'))
+ENTRY_KEYS = frozenset(('respondent_id', 'original_answer_segment', 'code_name', 'supporting_quote',
+                        'quote_range', 'pairs'))
+CODE_DEFINITION_KEYS = frozenset(('code_name', 'code_definition'))
+THEME_KEYS = frozenset(('theme_name', 'theme_definition', 'included_initial_codes'))
+
+_INT64_MIN, _INT64_MAX = -(1 << 63), (1 << 63) - 1
+_STR_TYPE = frozenset((str,))
+# pairs 元素 "编码序号-引文序号"，序号按整数存储，须能原样还原（无前导零）
+_PAIR_PATTERN = re.compile(r'(0|[1-9][0-9]{0,17})-(0|[1-9][0-9]{0,17})')
+
+_SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE source_files (
+    file_id INTEGER PRIMARY KEY, path TEXT NOT NULL UNIQUE, size INTEGER, mtime_ns INTEGER);
+CREATE TABLE questions (
+    question_id INTEGER PRIMARY KEY, file_id INTEGER, file_index INTEGER, question_text TEXT,
+    fields_json TEXT, initial_codes_in_table INTEGER NOT NULL);
+CREATE TABLE initial_codes (
+    entry_id INTEGER PRIMARY KEY, question_id INTEGER NOT NULL, respondent_id INTEGER,
+    original_answer_segment TEXT, has_quote_range INTEGER NOT NULL DEFAULT 0, raw_entry TEXT);
+CREATE TABLE entry_codes (
+    entry_id INTEGER NOT NULL, position INTEGER NOT NULL, code_name TEXT NOT NULL);
+CREATE TABLE entry_quotes (
+    entry_id INTEGER NOT NULL, position INTEGER NOT NULL, supporting_quote TEXT NOT NULL,
+    range_start INTEGER, range_end INTEGER);
+CREATE TABLE code_quote_pairs (
+    entry_id INTEGER NOT NULL, position INTEGER NOT NULL, code_position INTEGER NOT NULL,
+    quote_position INTEGER NOT NULL);
+CREATE TABLE code_definitions (
+    question_id INTEGER NOT NULL, position INTEGER NOT NULL, code_name TEXT NOT NULL,
+    code_definition TEXT NOT NULL);
+CREATE TABLE themes (
+    theme_id INTEGER PRIMARY KEY, question_id INTEGER NOT NULL, theme_name TEXT NOT NULL,
+    theme_definition TEXT NOT NULL);
+CREATE TABLE theme_codes (
+    theme_id INTEGER NOT NULL, position INTEGER NOT NULL, initial_code TEXT NOT NULL);
+"""
+
+# 数据全部写入后再建立索引（批量排序建索引比逐行维护快）
+_INDEXES = """
+CREATE INDEX questions_by_file ON questions (file_id, file_index);
+CREATE INDEX initial_codes_by_question ON initial_codes (question_id, respondent_id);
+CREATE UNIQUE INDEX entry_codes_by_entry ON entry_codes (entry_id, position);
+CREATE UNIQUE INDEX entry_quotes_by_entry ON entry_quotes (entry_id, position);
+CREATE UNIQUE INDEX code_quote_pairs_by_entry ON code_quote_pairs (entry_id, position);
+CREATE UNIQUE INDEX code_definitions_by_question ON code_definitions (question_id, position);
+CREATE INDEX themes_by_question ON themes (question_id);
+CREATE UNIQUE INDEX theme_codes_by_theme ON theme_codes (theme_id, position);
+"""
+
+
+def _file_state(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _is_int64(value: Any) -> bool:
+    return type(value) is int and _INT64_MIN <= value <= _INT64_MAX
+
+
+def _is_str_list(value: Any) -> bool:
+    return type(value) is list and _STR_TYPE.issuperset(map(type, value))
+
+
+def _is_int64_pair(value: Any) -> bool:
+    return type(value) is list and len(value) == 2 and _is_int64(value[0]) and _is_int64(value[1])
+
+
+def _entry_fits_schema(entry: Any) -> bool:
+    """初始编码条目能否无损拆分到 initial_codes / entry_codes / entry_quotes / code_quote_pairs"""
+    if type(entry) is not dict or not ENTRY_KEYS - {'quote_range'} <= entry.keys() <= ENTRY_KEYS:
+        return False
+    if not (_is_int64(entry['respondent_id']) and type(entry['original_answer_segment']) is str
+            and _is_str_list(entry['code_name']) and _is_str_list(entry['supporting_quote'])
+            and _is_str_list(entry['pairs']) and all(map(_PAIR_PATTERN.fullmatch, entry['pairs']))):
+        return False
+    if 'quote_range' in entry:
+        quote_range = entry['quote_range']
+        return (type(quote_range) is list and len(quote_range) == len(entry['supporting_quote'])
+                and all(map(_is_int64_pair, quote_range)))
+    return True
+
+
+def _question_fields_fit_schema(fields: Dict[str, Any], initial_codes_streamed: bool) -> bool:
+    """问题对象中除 initial_codes 外的字段能否无损拆分到 questions / code_definitions / themes / theme_codes"""
+    if not initial_codes_streamed or fields.keys() != QUESTION_KEYS - {'initial_codes'}:
+        return False
+    codes, themes = fields['codes'], fields['themes']
+    return (type(fields['question_text']) is str
+            and type(codes) is list
+            and all(type(code) is dict and code.keys() == CODE_DEFINITION_KEYS
+                    and type(code['code_name']) is str and type(code['code_definition']) is str
+                    for code in codes)
+            and type(themes) is list
+            and all(type(theme) is dict and theme.keys() == THEME_KEYS
+                    and type(theme['theme_name']) is str and type(theme['theme_definition']) is str
+                    and _is_str_list(theme['included_initial_codes'])
+                    for theme in themes))
+
+
+class CodingTableWriter:
+    """
+    按问题对象逐个写入各表，行数达到 INSERT_BATCH_SIZE 时批量提交到连接
+
+    各表的行按 (所属ID, position) 的顺序写入，rowid 即保持该顺序，读取全部数据时按 rowid 顺序扫描即可。
+    同一个写入器可以依次写入多个JSON文件，问题、条目与主题的ID在文件之间连续编号。
+    """
+
+    _INSERTS = {
+        'questions': "INSERT INTO questions VALUES (?, ?, ?, ?, ?, ?)",
+        'initial_codes': "INSERT INTO initial_codes VALUES (?, ?, ?, ?, ?, ?)",
+        'entry_codes': "INSERT INTO entry_codes VALUES (?, ?, ?)",
+        'entry_quotes': "INSERT INTO entry_quotes VALUES (?, ?, ?, ?, ?)",
+        'code_quote_pairs': "INSERT INTO code_quote_pairs VALUES (?, ?, ?, ?)",
+        'code_definitions': "INSERT INTO code_definitions VALUES (?, ?, ?, ?)",
+        'themes': "INSERT INTO themes VALUES (?, ?, ?, ?)",
+        'theme_codes': "INSERT INTO theme_codes VALUES (?, ?, ?)",
+    }
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+        self._rows: Dict[str, List[Tuple]] = {table: [] for table in self._INSERTS}
+        self._pending = 0
+        self._file_ids: Dict[str, int] = {}
+        self._next_question_id = 0
+        self._next_entry_id = 0
+        self._next_theme_id = 0
+
+    def _added(self, row_count: int) -> None:
+        self._pending += row_count
+        if self._pending >= INSERT_BATCH_SIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        for table, rows in self._rows.items():
+            if rows:
+                self._conn.executemany(self._INSERTS[table], rows)
+                rows.clear()
+        self._pending = 0
+
+    def add_source_file(self, path: str) -> int:
+        """登记来源文件（记录当前文件状态），返回其 file_id；同一路径只登记一次"""
+        path = os.path.abspath(path)
+        if path not in self._file_ids:
+            self._file_ids[path] = len(self._file_ids)
+            size, mtime_ns = _file_state(path) or (None, None)
+            self._conn.execute("INSERT INTO source_files VALUES (?, ?, ?, ?)",
+                               (self._file_ids[path], path, size, mtime_ns))
+        return self._file_ids[path]
+
+    def add_question_file(self, json_path: str,
+                          question_sources: Optional[Iterable[Tuple[str, int]]] = None) -> int:
+        """
+        流式读取根结构为问题对象数组的JSON文件并写入各表
+
+        参数:
+            json_path: JSON文件路径
+            question_sources: 每个问题对象的 (来源文件路径, 在来源文件中的位置)，与问题对象一一对应；
+                为 None 时来源即 json_path 本身
+
+        返回:
+            int: 写入的问题对象数
+
+        异常:
+            JsonStreamError: JSON语法错误或根结构不是数组
+            ValueError: 根数组中存在不是对象的元素
+        """
+        if question_sources is None:
+            file_id = self.add_source_file(json_path)
+            sources = None
+        else:
+            sources = [(self.add_source_file(path), file_index) for path, file_index in question_sources]
+
+        first_question_id = self._next_question_id
+        question_count = 0
+        for event, index, payload in iter_question_events(json_path, stream_key='initial_codes'):
+            question_id = first_question_id + index
+            if event == QUESTION_START:
+                fields: Dict[str, Any] = {}
+                initial_codes_streamed = False
+            elif event == QUESTION_FIELD:
+                key, value = payload
+                fields[key] = value
+                if key == 'initial_codes':
+                    initial_codes_streamed = False
+            elif event == STREAM_START:
+                fields.pop('initial_codes', None)
+                initial_codes_streamed = True
+            elif event == STREAM_ENTRY:
+                self.add_entry(question_id, payload)
+            elif event == QUESTION_END:
+                if sources is None:
+                    source = (file_id, index)
+                else:
+                    source = sources[index] if index < len(sources) else (None, None)
+                self.add_question(question_id, source, fields, initial_codes_streamed)
+                question_count += 1
+                self._next_question_id = question_id + 1
+            elif event == ITEM:
+                raise ValueError(f"'{json_path}' 中第 {index + 1} 个元素不是对象")
+        return question_count
+
+    def add_entry(self, question_id: int, entry: Any) -> None:
+        rows = self._rows
+        entry_id = self._next_entry_id
+        self._next_entry_id += 1
+        if not _entry_fits_schema(entry):
+            respondent_id = entry.get('respondent_id') if type(entry) is dict else None
+            rows['initial_codes'].append((entry_id, question_id, respondent_id if _is_int64(respondent_id) else None,
+                                          None, 0, json.dumps(entry, ensure_ascii=False)))
+            self._added(1)
+            return
+
+        code_names, quotes, pairs = entry['code_name'], entry['supporting_quote'], entry['pairs']
+        quote_range = entry.get('quote_range')
+        rows['initial_codes'].append((entry_id, question_id, entry['respondent_id'],
+                                      entry['original_answer_segment'], int(quote_range is not None), None))
+        rows['entry_codes'].extend(zip(repeat(entry_id), count(), code_names))
+        if quote_range is not None:
+            rows['entry_quotes'].extend((entry_id, position, quote, start, end)
+                                        for position, (quote, (start, end)) in enumerate(zip(quotes, quote_range)))
+        else:
+            rows['entry_quotes'].extend(zip(repeat(entry_id), count(), quotes, repeat(None), repeat(None)))
+        rows['code_quote_pairs'].extend((entry_id, position, *map(int, pair.split('-')))
+                                        for position, pair in enumerate(pairs))
+        self._added(1 + len(code_names) + len(quotes) + len(pairs))
+
+    def add_question(self, question_id: int, source: Tuple[Optional[int], Optional[int]],
+                     fields: Dict[str, Any], initial_codes_streamed: bool) -> None:
+        rows = self._rows
+        file_id, file_index = source
+        if not _question_fields_fit_schema(fields, initial_codes_streamed):
+            question_text = fields.get('question_text')
+            rows['questions'].append((question_id, file_id, file_index,
+                                      question_text if type(question_text) is str else None,
+                                      json.dumps(fields, ensure_ascii=False), int(initial_codes_streamed)))
+            self._added(1)
+            return
+
+        rows['questions'].append((question_id, file_id, file_index, fields['question_text'], None, 1))
+        rows['code_definitions'].extend((question_id, position, code['code_name'], code['code_definition'])
+                                        for position, code in enumerate(fields['codes']))
+        row_count = 1 + len(fields['codes'])
+        for theme in fields['themes']:
+            theme_id = self._next_theme_id
+            self._next_theme_id += 1
+            rows['themes'].append((theme_id, question_id, theme['theme_name'], theme['theme_definition']))
+            rows['theme_codes'].extend(zip(repeat(theme_id), count(), theme['included_initial_codes']))
+            row_count += 1 + len(theme['included_initial_codes'])
+        self._added(row_count)
+
+
+def create_coding_tables(conn: sqlite3.Connection) -> None:
+    """在连接中创建编码存储的全部表（不含索引）"""
+    conn.executescript(_SCHEMA)
+
+
+def create_coding_indexes(conn: sqlite3.Connection) -> None:
+    """数据全部写入后建立索引"""
+    conn.executescript(_INDEXES)
+
+
+def build_coding_store(db_path: str, merged_json_path: str,
+                       question_sources: Iterable[Tuple[str, int]]) -> bool:
+    """
+    流式读取合并结果并写入列式存储（先写临时文件再原子替换）
+
+    参数:
+        db_path: 数据库文件路径
+        merged_json_path: 合并结果 (inductive_codes.json) 路径
+        question_sources: 合并结果中每个问题对象的 (来源文件路径, 在来源文件中的位置)，与问题对象一一对应
+
+    返回:
+        bool: 是否写入成功
+    """
+    question_sources = list(question_sources)
+    merged_state = _file_state(merged_json_path)
+    if merged_state is None:
+        logger.error(f"合并结果文件不存在，无法生成编码存储: '{merged_json_path}'")
+        return False
+
+    temp_path = f"{db_path}.tmp"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    conn = sqlite3.connect(temp_path)
+    try:
+        conn.executescript("PRAGMA journal_mode = OFF; PRAGMA synchronous = OFF;")
+        create_coding_tables(conn)
+
+        writer = CodingTableWriter(conn)
+        question_count = writer.add_question_file(merged_json_path, question_sources)
+        writer.flush()
+        create_coding_indexes(conn)
+
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+            ('version', str(CODING_STORE_FORMAT_VERSION)),
+            ('merged_json', os.path.abspath(merged_json_path)),
+            ('merged_json_size', str(merged_state[0])),
+            ('merged_json_mtime_ns', str(merged_state[1])),
+        ])
+        conn.commit()
+        conn.close()
+        os.replace(temp_path, db_path)
+        logger.info(f"编码存储已生成: '{db_path}' ({question_count} 个问题对象)")
+        return True
+    except Exception as e:
+        conn.close()
+        logger.error(f"生成编码存储失败 '{db_path}': {e}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return False
+
+
+class CodingStore:
+    """
+    列式存储的只读视图
+
+    通过 CodingStore.open() 打开；存储缺失、格式版本不一致或与合并结果不一致时 open() 返回 None。
+    """
+
+    def __init__(self, conn: sqlite3.Connection, db_path: str):
+        self._conn = conn
+        self.db_path = db_path
+        self._source_files: Dict[str, Tuple[int, Optional[int], Optional[int]]] = {
+            path: (file_id, size, mtime_ns)
+            for file_id, path, size, mtime_ns in conn.execute("SELECT file_id, path, size, mtime_ns FROM source_files")
+        }
+
+    @classmethod
+    def open(cls, db_path: str, merged_json_path: Optional[str] = None) -> Optional['CodingStore']:
+        """
+        以只读、内存映射方式打开存储
+
+        参数:
+            db_path: 数据库文件路径
+            merged_json_path: 提供时要求该合并结果与建库时的文件状态一致
+
+        返回:
+            Optional[CodingStore]: 存储不可用时返回 None
+        """
+        if not db_path or not os.path.exists(db_path):
+            return None
+        try:
+            conn = sqlite3.connect(f"file:{urllib.request.pathname2url(os.path.abspath(db_path))}?mode=ro", uri=True)
+        except sqlite3.Error as e:
+            logger.warning(f"打开编码存储失败 '{db_path}': {e}")
+            return None
+        try:
+            conn.execute(f"PRAGMA mmap_size = {CODING_STORE_MMAP_SIZE}")
+            meta = dict(conn.execute("SELECT key, value FROM meta"))
+            if meta.get('version') != str(CODING_STORE_FORMAT_VERSION):
+                logger.info(f"编码存储格式已变化，忽略: '{db_path}'")
+                conn.close()
+                return None
+            if merged_json_path is not None and _file_state(merged_json_path) != (
+                    int(meta['merged_json_size']), int(meta['merged_json_mtime_ns'])):
+                logger.info(f"编码存储与合并结果不一致，忽略: '{db_path}'")
+                conn.close()
+                return None
+            return cls(conn, db_path)
+        except (sqlite3.Error, KeyError, ValueError) as e:
+            logger.warning(f"读取编码存储失败 '{db_path}': {e}")
+            conn.close()
+            return None
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> 'CodingStore':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def is_current(self, source_paths: Iterable[str]) -> bool:
+        """存储中的来源文件集合与给定文件一致，且各文件自建库以来未变化"""
+        source_paths = {os.path.abspath(path) for path in source_paths}
+        if source_paths != set(self._source_files):
+            return False
+        return all(_file_state(path) == (size, mtime_ns)
+                   for path, (_, size, mtime_ns) in self._source_files.items())
+
+    def load_questions(self) -> List[Dict[str, Any]]:
+        """按合并结果中的顺序还原全部问题对象"""
+        return read_questions(self._conn)
+
+    def load_source_questions(self, source_path: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        还原来自某个 inductive_questionN.json 的问题对象（按文件内顺序）
+
+        返回:
+            Optional[List[Dict]]: 文件不在存储中或自建库以来已变化时返回 None
+        """
+        record = self._source_files.get(os.path.abspath(source_path))
+        if record is None:
+            return None
+        file_id, size, mtime_ns = record
+        if size is None or _file_state(source_path) != (size, mtime_ns):
+            return None
+        return read_questions(self._conn, f"WHERE file_id = {file_id}")
+
+
+def read_initial_codes(conn: sqlite3.Connection, entry_filter: str = "",
+                       parameters: Tuple = ()) -> List[Tuple[int, Dict[str, Any]]]:
+    """
+    按 entry_filter（作用于 initial_codes 表的 WHERE 子句）读取初始编码条目
+
+    参数:
+        conn: 含编码存储各表的连接
+        entry_filter: WHERE 子句，为空时读取全部条目
+        parameters: WHERE 子句中占位符的值
+
+    返回:
+        List[Tuple[int, Dict]]: 按写入顺序排列的 (question_id, 条目)
+    """
+    result: List[Tuple[int, Dict[str, Any]]] = []
+    entries: Dict[int, Dict[str, Any]] = {}
+    for entry_id, question_id, respondent_id, segment, has_quote_range, raw_entry in conn.execute(
+            "SELECT entry_id, question_id, respondent_id, original_answer_segment, has_quote_range, raw_entry "
+            f"FROM initial_codes {entry_filter} ORDER BY entry_id", parameters):
+        if raw_entry is not None:
+            result.append((question_id, json.loads(raw_entry)))
+            continue
+        entry = {'respondent_id': respondent_id, 'original_answer_segment': segment,
+                 'code_name': [], 'supporting_quote': [], 'pairs': []}
+        if has_quote_range:
+            entry['quote_range'] = []
+        entries[entry_id] = entry
+        result.append((question_id, entry))
+    if not entries:
+        return result
+
+    child_filter = f"WHERE entry_id IN (SELECT entry_id FROM initial_codes {entry_filter})" if entry_filter else ""
+    for entry_id, code_name in conn.execute(
+            f"SELECT entry_id, code_name FROM entry_codes {child_filter} ORDER BY rowid", parameters):
+        entries[entry_id]['code_name'].append(code_name)
+    for entry_id, quote, start, end in conn.execute(
+            "SELECT entry_id, supporting_quote, range_start, range_end FROM entry_quotes "
+            f"{child_filter} ORDER BY rowid", parameters):
+        entry = entries[entry_id]
+        entry['supporting_quote'].append(quote)
+        if 'quote_range' in entry:
+            entry['quote_range'].append([start, end])
+    for entry_id, code_position, quote_position in conn.execute(
+            "SELECT entry_id, code_position, quote_position FROM code_quote_pairs "
+            f"{child_filter} ORDER BY rowid", parameters):
+        entries[entry_id]['pairs'].append(f"{code_position}-{quote_position}")
+    return result
+
+
+def read_questions(conn: sqlite3.Connection, question_filter: str = "",
+                   parameters: Tuple = ()) -> List[Dict[str, Any]]:
+    """
+    按 question_filter（作用于 questions 表的 WHERE 子句）批量读取各表并组装问题对象
+
+    有筛选条件时按来源文件内的位置排序（用于按来源文件读取），否则按写入顺序排序。
+    """
+    questions: Dict[int, Dict[str, Any]] = {}
+    order = "file_index" if question_filter else "question_id"
+    for question_id, question_text, fields_json, in_table in conn.execute(
+            "SELECT question_id, question_text, fields_json, initial_codes_in_table FROM questions "
+            f"{question_filter} ORDER BY {order}", parameters):
+        if fields_json is None:
+            question = {'question_text': question_text, 'initial_codes': [], 'codes': [], 'themes': []}
+        else:
+            question = json.loads(fields_json)
+            if in_table:
+                question['initial_codes'] = []
+        questions[question_id] = question
+    if not questions:
+        return []
+
+    question_ids = f"SELECT question_id FROM questions {question_filter}"
+    child_filter = f"WHERE question_id IN ({question_ids})" if question_filter else ""
+    child_parameters = parameters if question_filter else ()
+
+    for question_id, entry in read_initial_codes(conn, child_filter, child_parameters):
+        questions[question_id]['initial_codes'].append(entry)
+
+    for question_id, code_name, definition in conn.execute(
+            "SELECT question_id, code_name, code_definition FROM code_definitions "
+            f"{child_filter} ORDER BY rowid", child_parameters):
+        questions[question_id]['codes'].append({'code_name': code_name, 'code_definition': definition})
+
+    themes: Dict[int, Dict[str, Any]] = {}
+    for theme_id, question_id, theme_name, definition in conn.execute(
+            "SELECT theme_id, question_id, theme_name, theme_definition FROM themes "
+            f"{child_filter} ORDER BY theme_id", child_parameters):
+        theme = {'theme_name': theme_name, 'theme_definition': definition, 'included_initial_codes': []}
+        themes[theme_id] = theme
+        questions[question_id]['themes'].append(theme)
+    theme_filter = f"WHERE theme_id IN (SELECT theme_id FROM themes {child_filter})" if question_filter else ""
+    for theme_id, initial_code in conn.execute(
+            f"SELECT theme_id, initial_code FROM theme_codes {theme_filter} ORDER BY rowid", child_parameters):
+        themes[theme_id]['included_initial_codes'].append(initial_code)
+
+    return list(questions.values())
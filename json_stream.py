@@ -0,0 +1,239 @@
+"""
+流式JSON读取模块
+
+逐块读取根结构为数组的JSON文件（如 inductive_questionN.json 与合并后的 inductive_codes.json），
+每次只解码一个数组元素，或问题对象中 initial_codes 数组的一个条目，不会把整个文档读入内存。
+
+- iter_json_array(): 逐个产出根数组的元素（每个元素完整解码）
+- iter_question_events(): 以事件形式产出问题对象，问题对象的 stream_key 字段（默认 initial_codes）
+  逐条目产出，其余字段完整解码：
+
+    (QUESTION_START, 问题序号, None)
+    (QUESTION_FIELD, 问题序号, (键, 值))
+    (STREAM_START,   问题序号, 键)          # stream_key 的值是数组时
+    (STREAM_ENTRY,   问题序号, 条目)
+    (STREAM_END,     问题序号, 键)
+    (QUESTION_END,   问题序号, None)
+    (ITEM,           元素序号, 值)          # 根数组中不是对象的元素
+
+解码使用标准库 json.JSONDecoder.raw_decode，结果与 json.load 一致；对象中重复的键会依次产生事件。
+"""
+
+import re
+import json
+from typing import Any, Iterator, Optional, TextIO, Tuple
+
+# 每次从文件读取的字符数；单个值超过缓冲区时按当前缓冲区大小成倍读取
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+# 事件类型
+QUESTION_START = 'question_start'
+QUESTION_FIELD = 'question_field'
+STREAM_START = 'stream_start'
+STREAM_ENTRY = 'stream_entry'
+STREAM_END = 'stream_end'
+QUESTION_END = 'question_end'
+ITEM = 'item'
+
+_WHITESPACE_RE = re.compile(r'[ \t\n\r]*')
+# 数字之后可能仍属于该数字的字符（如缓冲区恰好截断在 "1e" 或 "-2." 处）
+_NUMBER_TAIL_RE = re.compile(r'[0-9eE.+-]*')
+# 出错位置距缓冲区末尾不超过该字符数时视为可能被截断（覆盖最长的不完整记号，如代理对 "\ud83d\ude0"）
+_TRUNCATION_MARGIN = 12
+
+
+def _may_be_truncated(error: json.JSONDecodeError, buffer_length: int) -> bool:
+    """
+    解码错误是否可能只是因为值被缓冲区截断：未闭合的字符串（必然延伸到缓冲区末尾），
+    或出错位置在缓冲区末尾附近（如截断在 "tru"、"\\u12"、"[1, " 处）；其余语法错误无需继续读取即可报告
+    """
+    return (error.msg.startswith('Unterminated string')
+            or error.pos >= buffer_length - _TRUNCATION_MARGIN)
+
+
+class JsonStreamError(ValueError):
+    """JSON语法错误（含出错位置的字符偏移）"""
+
+
+class JsonRootTypeError(JsonStreamError):
+    """根结构是合法的JSON，但不是数组"""
+
+
+class _StreamReader:
+    """在滑动缓冲区上逐个解码JSON值，已解码的部分及时丢弃"""
+
+    def __init__(self, file: TextIO, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self._file = file
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._pos = 0
+        self._offset = 0  # 缓冲区开头在文件中的字符偏移
+        self._eof = False
+
+    def _fill(self) -> bool:
+        """丢弃已解码的部分并追加读取，文件结束时返回 False"""
+        if self._eof:
+            return False
+        self._offset += self._pos
+        remaining = self._buffer[self._pos:]
+        data = self._file.read(max(self._chunk_size, len(remaining)))
+        self._buffer = remaining + data
+        self._pos = 0
+        if not data:
+            self._eof = True
+            return False
+        return True
+
+    def error(self, message: str) -> JsonStreamError:
+        return JsonStreamError(f"{message} (字符偏移 {self._offset + self._pos})")
+
+    def peek(self) -> Optional[str]:
+        """跳过空白并返回下一个字符（不消耗），文件结束时返回 None"""
+        while True:
+            self._pos = _WHITESPACE_RE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return None
+
+    def next_char(self) -> str:
+        char = self.peek()
+        if char is None:
+            raise self.error("文件意外结束")
+        self._pos += 1
+        return char
+
+    def expect(self, expected: str) -> None:
+        char = self.next_char()
+        if char != expected:
+            raise self.error(f"应为 '{expected}'，实际为 '{char}'")
+
+    def read_value(self) -> Any:
+        """解码下一个完整的JSON值；值可能被缓冲区截断时（包括数字延伸到缓冲区末尾）继续读取后重试"""
+        if self.peek() is None:
+            raise self.error("文件意外结束")
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError as e:
+                if not _may_be_truncated(e, len(self._buffer)) or not self._fill():
+                    raise self.error(f"JSON解析失败: {e.msg}") from e
+                continue
+            if (isinstance(value, (int, float)) and not isinstance(value, bool)
+                    and _NUMBER_TAIL_RE.match(self._buffer, end).end() == len(self._buffer) and self._fill()):
+                continue
+            self._pos = end
+            return value
+
+    def at_end(self) -> bool:
+        return self.peek() is None
+
+
+def _open_root_array(reader: _StreamReader) -> bool:
+    """消耗根数组的 '['，数组为空时同时消耗 ']' 并返回 False"""
+    if reader.peek() != '[':
+        reader.read_value()
+        raise JsonRootTypeError("根结构不是数组")
+    reader.expect('[')
+    if reader.peek() == ']':
+        reader.expect(']')
+        return False
+    return True
+
+
+def _close_array_item(reader: _StreamReader) -> bool:
+    """消耗数组元素之后的 ',' 或 ']'，数组结束时返回 False"""
+    char = reader.next_char()
+    if char == ',':
+        return True
+    if char == ']':
+        return False
+    raise reader.error(f"数组元素之间应为 ',' 或 ']'，实际为 '{char}'")
+
+
+def _check_trailing_data(reader: _StreamReader) -> None:
+    if not reader.at_end():
+        raise reader.error("根数组之后存在多余数据")
+
+
+def iter_json_array(file_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Any]:
+    """
+    逐个产出根数组的元素
+
+    异常:
+        JsonRootTypeError: 根结构不是数组
+        JsonStreamError: JSON语法错误
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        reader = _StreamReader(f, chunk_size)
+        if _open_root_array(reader):
+            while True:
+                yield reader.read_value()
+                if not _close_array_item(reader):
+                    break
+        _check_trailing_data(reader)
+
+
+def _iter_object_events(reader: _StreamReader, index: int, stream_key: str) -> Iterator[Tuple[str, int, Any]]:
+    reader.expect('{')
+    yield QUESTION_START, index, None
+    if reader.peek() == '}':
+        reader.expect('}')
+        yield QUESTION_END, index, None
+        return
+
+    while True:
+        if reader.peek() != '"':
+            raise reader.error("对象的键应为字符串")
+        key = reader.read_value()
+        reader.expect(':')
+        if key == stream_key and reader.peek() == '[':
+            reader.expect('[')
+            yield STREAM_START, index, key
+            if reader.peek() == ']':
+                reader.expect(']')
+            else:
+                while True:
+                    yield STREAM_ENTRY, index, reader.read_value()
+                    if not _close_array_item(reader):
+                        break
+            yield STREAM_END, index, key
+        else:
+            yield QUESTION_FIELD, index, (key, reader.read_value())
+
+        char = reader.next_char()
+        if char == '}':
+            break
+        if char != ',':
+            raise reader.error(f"对象成员之间应为 ',' 或 '}}'，实际为 '{char}'")
+    yield QUESTION_END, index, None
+
+
+def iter_question_events(file_path: str, stream_key: str = 'initial_codes',
+                         chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Tuple[str, int, Any]]:
+    """
+    以事件形式逐个产出根数组中的问题对象（事件类型见模块说明）
+
+    参数:
+        file_path: JSON文件路径
+        stream_key: 逐条目产出的数组字段名
+        chunk_size: 每次读取的字符数
+
+    异常:
+        JsonRootTypeError: 根结构不是数组
+        JsonStreamError: JSON语法错误（此前已产出的事件仍然有效）
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        reader = _StreamReader(f, chunk_size)
+        if _open_root_array(reader):
+            index = 0
+            while True:
+                if reader.peek() == '{':
+                    yield from _iter_object_events(reader, index, stream_key)
+                else:
+                    yield ITEM, index, reader.read_value()
+                index += 1
+                if not _close_array_item(reader):
+                    break
+        _check_trailing_data(reader)
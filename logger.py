@@ -1,18 +1,203 @@
 """
-自定义日志记录器模块
+日志模块
+
+提供整个流水线共用的日志后端：
+- setup_logging(): 配置根日志记录器。所有记录先进入内存队列 (QueueHandler)，
+  由后台线程 (QueueListener) 写入常开的 workflow.log 与控制台，
+  文件按 flush_interval 批量刷新，ERROR 及以上级别立即刷新
+- Logger: 旧的自定义日志记录器接口，现通过同一后端写出
+
+各脚本在模块开头调用 setup_logging()，只有第一次调用生效，
+之后的调用（包括 parameters.py 中的调用）直接返回。
 """
 
 from datetime import datetime
 import os
+import queue
+import atexit
+import logging
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import List, Optional
+
+# 默认日志文件与格式
+DEFAULT_LOG_FILE = 'workflow.log'
+DEFAULT_LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# 文件刷新间隔（秒）：0 表示每条记录都立即写入磁盘
+DEFAULT_FLUSH_INTERVAL = 1.0
+
+# 当前生效的后端，未配置时为 None
+_BACKEND: Optional['_LoggingBackend'] = None
+_BACKEND_LOCK = threading.Lock()
+
+
+class _PassthroughFormatter(logging.Formatter):
+    """对带有 preformatted 标记的记录（来自 Logger 类）原样输出消息，其余按格式串格式化"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        if getattr(record, 'preformatted', False):
+            return record.getMessage()
+        return super().format(record)
+
+
+class BufferedFileHandler(logging.FileHandler):
+    """
+    保持文件常开、按时间间隔批量刷新的文件处理器
+
+    参数:
+        filename: 日志文件路径，所在目录不存在时自动创建
+        flush_interval: 刷新间隔（秒），0 表示每条记录都刷新
+    """
+
+    def __init__(self, filename: str, flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+                 mode: str = 'a', encoding: str = 'utf-8'):
+        log_dir = os.path.dirname(filename)
+        if log_dir:
+            os.makedirs(log_dir, exist_ok=True)
+        self.flush_interval = flush_interval
+        self._last_flush = time.monotonic()
+        super().__init__(filename, mode=mode, encoding=encoding)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        super().emit(record)
+        if record.levelno >= logging.ERROR:
+            self.force_flush()
+
+    def flush(self) -> None:
+        # StreamHandler.emit 每写一条都会调用 flush，这里只在超过刷新间隔时才真正写盘
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.force_flush()
+
+    def force_flush(self) -> None:
+        """立即将缓冲区写入磁盘"""
+        self.acquire()
+        try:
+            if self.stream and hasattr(self.stream, 'flush'):
+                self.stream.flush()
+            self._last_flush = time.monotonic()
+        finally:
+            self.release()
+
+
+class _DeferredFormatQueueHandler(QueueHandler):
+    """
+    只在调用线程中合并消息参数、展开异常堆栈，完整格式化留给后台线程
+
+    标准 QueueHandler.prepare 会在调用线程中完整格式化并复制记录，开销比直接写文件还大。
+    根日志记录器的处理器最后执行，此时可以直接修改记录而无需复制。
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _EXCEPTION_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_EXCEPTION_FORMATTER = logging.Formatter()
+
+
+class _FlushingQueueListener(QueueListener):
+    """队列空闲超过刷新间隔时主动刷新文件，避免最后几条日志长时间停留在缓冲区"""
+
+    def __init__(self, log_queue: queue.Queue, *handlers: logging.Handler, flush_interval: float):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.flush_interval = flush_interval
+
+    def dequeue(self, block: bool) -> logging.LogRecord:
+        if not block or self.flush_interval <= 0:
+            return super().dequeue(block)
+        while True:
+            try:
+                return self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                for handler in self.handlers:
+                    if isinstance(handler, BufferedFileHandler):
+                        handler.force_flush()
+
+
+class _LoggingBackend:
+    """根日志记录器上的 QueueHandler 与后台写出线程"""
+
+    def __init__(self, log_file: str, level: int, fmt: str, flush_interval: float, console: bool):
+        formatter = _PassthroughFormatter(fmt)
+        self.file_handler = BufferedFileHandler(log_file, flush_interval=flush_interval)
+        self.handlers: List[logging.Handler] = [self.file_handler]
+        if console:
+            self.handlers.append(logging.StreamHandler())
+        for handler in self.handlers:
+            handler.setFormatter(formatter)
+
+        self.queue_handler = _DeferredFormatQueueHandler(queue.SimpleQueue())
+        self.listener = _FlushingQueueListener(self.queue_handler.queue, *self.handlers,
+                                               flush_interval=flush_interval)
+
+        root_logger = logging.getLogger()
+        root_logger.setLevel(level)
+        root_logger.addHandler(self.queue_handler)
+        self.listener.start()
+
+    def stop(self) -> None:
+        """写出队列中剩余的记录并刷新文件（程序退出时调用）"""
+        self.listener.stop()
+        self.file_handler.force_flush()
+
+    def before_fork(self) -> None:
+        # 持有文件处理器的锁并清空缓冲区，子进程继承到的是空缓冲区，不会重复写出父进程的日志
+        self.file_handler.acquire()
+        if self.file_handler.stream:
+            self.file_handler.stream.flush()
+
+    def after_fork_in_parent(self) -> None:
+        self.file_handler.release()
+
+    def after_fork_in_child(self) -> None:
+        # 子进程中没有后台线程（且 os._exit 退出时不会执行 atexit），改为同步写出并逐条刷新
+        root_logger = logging.getLogger()
+        root_logger.removeHandler(self.queue_handler)
+        self.file_handler.flush_interval = 0
+        for handler in self.handlers:
+            root_logger.addHandler(handler)
+
+
+def setup_logging(log_file: str = DEFAULT_LOG_FILE, level: int = logging.INFO,
+                  fmt: str = DEFAULT_LOG_FORMAT, flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+                  console: bool = True) -> None:
+    """
+    配置全流程共用的日志后端，只有第一次调用生效
+
+    参数:
+        log_file: 日志文件路径
+        level: 根日志记录器级别
+        fmt: 日志格式串
+        flush_interval: 文件刷新间隔（秒），0 表示每条记录都立即写盘
+        console: 是否同时输出到控制台 (stderr)
+    """
+    global _BACKEND
+    with _BACKEND_LOCK:
+        if _BACKEND is not None:
+            return
+        _BACKEND = _LoggingBackend(log_file, level, fmt, flush_interval, console)
+    atexit.register(_BACKEND.stop)
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(before=_BACKEND.before_fork,
+                            after_in_parent=_BACKEND.after_fork_in_parent,
+                            after_in_child=_BACKEND.after_fork_in_child)
+
 
 class Logger:
-    def __init__(self, log_file: str = 'workflow.log'):
+    def __init__(self, log_file: str = DEFAULT_LOG_FILE):
         self.log_file = log_file
-        
+        self._logger = logging.getLogger('workflow')
+
     def log(self, operation: str, status: str, details: str):
         """
         记录日志
-        
+
         Args:
             operation: 操作名称
             status: 状态（如 "开始"、"成功"、"失败"、"错误" 等）
@@ -20,20 +205,11 @@ class Logger:
         """
         timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         log_message = f"[{timestamp}] {status}: {operation} - {details}"
-        
-        # 打印到控制台
-        print(log_message)
-        
-        # 写入日志文件
-        try:
-            log_dir = os.path.dirname(self.log_file)
-            if log_dir and not os.path.exists(log_dir):
-                os.makedirs(log_dir)
-                
-            with open(self.log_file, 'a', encoding='utf-8') as f:
-                f.write(log_message + '\n')
-        except Exception as e:
-            print(f"Warning: Failed to write to log file: {e}")
+
+        # 经共用后端写入控制台和日志文件（后端已由其他脚本配置时写入其日志文件）
+        setup_logging(log_file=self.log_file)
+        level = logging.ERROR if status in ("失败", "错误") else logging.INFO
+        self._logger.log(level, log_message, extra={'preformatted': True})
 
 # 创建全局logger实例
-logger = Logger() 
\ No newline at end of file
+logger = Logger()
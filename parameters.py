@@ -20,15 +20,23 @@
 - PROJECT_ROOT: str
     项目根目录的绝对路径
 - APP_NAME: str
-    当前应用名称，默认为 'myworld'
+    当前应用名称，环境变量 APP_NAME_ENV_VAR 非空时以其为准（批量模式下由运行器为每个应用设置）
 - OUTLINE: Dict[str, List[int]]
     访谈大纲结构，格式：{"分类名": [问题编号列表]}
 - QUESTION_MAP: Dict[int, str]
     问题编号到问题文本的映射
-- UNIQUE_CATEGORIES: List[str]
-    所有分类名称列表
+- UNIQUE_CATEGORIES: Set[str]
+    所有分类名称集合
+  以上三项由 ProjectConfig 在首次访问时解析大纲得到（模块级 __getattr__），
+  导入本模块不会读取任何文件
 
 公开函数:
+0. 项目配置:
+- get_project_config() -> ProjectConfig
+    获取当前应用的项目配置（惰性解析大纲、惰性构建路径配置）
+- discover_app_names(base_data_dir: Optional[str] = None) -> List[str]
+    列出数据目录下所有应用（各 *_dir 文件夹）的名称；其他应用的配置用 ProjectConfig(app_name) 单独构建
+
 1. 路径管理:
 - get_path(key: str) -> str
     获取单个文件或目录的路径
@@ -53,6 +61,9 @@
     返回:
         完整的文件或目录路径
 
+  按分类扫描得到的列表键（如 'grouped_inductive_q_jsons'）由 DirectoryIndex 缓存目录列表，
+  每次 get_path_list 都按目录修改时间刷新，因此同一进程中新写入的文件随即可见
+
 2. 项目管理:
 - setup_project(mode: str = "setup") -> bool
     项目初始化设置
@@ -85,33 +96,32 @@
 - _ensure_file_dir_initialized()
 - _build_project_file_dir_internal()
 - _PROJECT_FILE_DIR
+- _PROJECT_CONFIG
 - _ID_MANAGER
 
 """
 
 import os
 import csv
-import glob # For file pattern matching
+import fnmatch # For file pattern matching
 import re   # For sanitize_folder_name
+import time # For DirectoryIndex
 from collections import defaultdict
 import traceback # For detailed error reporting in parse_interview_outline
-from typing import Dict, List, Tuple, Optional, Any, Set, Callable
+from typing import Dict, List, Tuple, Optional, Any, Set, Callable, TYPE_CHECKING
 import shutil # For file operations
 import sys    # For command line arguments
 from datetime import datetime
 from dataclasses import dataclass
-import pandas as pd
 import logging  # 替换外部logger导入
+from logger import setup_logging
 
-# 配置内置logger
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('workflow.log', encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
+if TYPE_CHECKING:
+    # pandas 仅在建立ID系统时使用，运行时在函数内部导入，避免拖慢本模块的导入
+    import pandas as pd
+
+# 配置内置logger（全流程共用的日志后端）
+setup_logging()
 logger = logging.getLogger(__name__)
 
 # ===================== 公开接口 (Public Interfaces) =====================
@@ -119,16 +129,19 @@ logger = logging.getLogger(__name__)
 # --- 全局变量 ---
 PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR_BASE_NAME = "data_dir"
-APP_NAME = '金铲铲之战'
+APP_NAME_ENV_VAR = "PIPELINE_APP_NAME"
+APP_NAME = os.environ.get(APP_NAME_ENV_VAR) or '金铲铲之战'
+
+# 数据目录下应用文件夹的后缀：{应用名}_dir
+APP_DIR_SUFFIX = "_dir"
 
 # --- 调试配置 ---
 P_DBUG_RESPONDENT_ID = 10  # 调试目标受访者ID
 P_DBUG_QUESTION_TEXT_RAW = 7  # 调试目标问题文本
 
 # --- 全局数据结构 ---
-OUTLINE: Dict[str, List[int]] = {}  # {"中文Category名称": [问题号列表]}
-QUESTION_MAP: Dict[int, str] = {}   # 问题编号到问题文本的映射
-UNIQUE_CATEGORIES: List[str] = []   # 所有分类名称列表
+# OUTLINE / QUESTION_MAP / UNIQUE_CATEGORIES 不再在导入时解析，
+# 由模块末尾的 __getattr__ 转发到 get_project_config() 的同名属性
 
 # --- 常量定义 ---
 # 各阶段子目录的固定名称
@@ -144,6 +157,9 @@ SDIR_GROUP_UDATA = "user_data_dir"
 SDIR_GROUP_CBOOK = "codebook_data_dir"
 SDIR_GROUP_META = "meta_data_dir"
 
+# 目录修改时间距扫描时刻不足该时长（纳秒）时不信任缓存：同一时间粒度内的后续写入不会改变修改时间
+DIRECTORY_INDEX_RACY_WINDOW_NS = 2_000_000_000
+
 # --- 公开类定义 ---
 class IDManager:
     """ID管理器：处理内部ID和原始ID的转换"""
@@ -159,7 +175,157 @@ class IDManager:
         """内部ID转原始ID"""
         return self._internal_to_original[internal_id]
 
+class DirectoryIndex:
+    """
+    以目录修改时间失效的目录列表缓存
+
+    每个目录用 os.scandir 读取一次文件名并记录目录的 st_mtime_ns；之后的查询只需 stat 目录，
+    目录中有文件新增、删除或重命名（修改时间变化）以及目录被创建或删除时才重新扫描。
+    修改时间距扫描时刻过近（DIRECTORY_INDEX_RACY_WINDOW_NS 内）的列表在下次查询时总是重新扫描。
+    """
+    def __init__(self):
+        # 目录 -> (目录修改时间, 是否可信, 排序后的文件名)
+        self._listings: Dict[str, Tuple[int, bool, Tuple[str, ...]]] = {}
+        self._reported: Set[str] = set()
+
+    def list_files(self, directory: str) -> Optional[Tuple[str, ...]]:
+        """目录中的文件名（按名称排序），目录不存在时返回 None"""
+        directory = directory.rstrip(os.sep) or os.sep
+        try:
+            mtime_ns = os.stat(directory).st_mtime_ns
+        except OSError:
+            self._listings.pop(directory, None)
+            return None
+        cached = self._listings.get(directory)
+        if cached is not None and cached[0] == mtime_ns and cached[1]:
+            return cached[2]
+
+        scan_time_ns = time.time_ns()
+        try:
+            with os.scandir(directory) as entries:
+                names = tuple(sorted(entry.name for entry in entries if entry.is_file()))
+        except OSError:
+            self._listings.pop(directory, None)
+            return None
+        self._listings[directory] = (mtime_ns, scan_time_ns - mtime_ns > DIRECTORY_INDEX_RACY_WINDOW_NS, names)
+        return names
+
+    def glob(self, directory: str, pattern: str) -> Optional[List[str]]:
+        """目录中文件名匹配 pattern 的文件路径（按名称排序），目录不存在时返回 None"""
+        names = self.list_files(directory)
+        if names is None:
+            return None
+        directory = directory.rstrip(os.sep)
+        return [os.path.join(directory, name) for name in fnmatch.filter(names, pattern)]
+
+    def invalidate(self, directory: Optional[str] = None) -> None:
+        """丢弃某个目录（默认全部目录）的缓存列表"""
+        if directory is None:
+            self._listings.clear()
+        else:
+            self._listings.pop(directory.rstrip(os.sep) or os.sep, None)
+
+    def warn_once(self, message: str) -> None:
+        """同一条警告只记录一次，避免重复扫描时反复输出"""
+        if message not in self._reported:
+            self._reported.add(message)
+            logger.warning(message)
+
+class ProjectConfig:
+    """
+    单个应用的项目配置，所有内容在首次访问时才计算并缓存
+
+    属性:
+        outline: 访谈大纲 {"分类名": [问题编号列表]}
+        question_map: 问题编号到问题文本的映射
+        unique_categories: 所有分类名称集合
+        file_dir: 路径配置字典（结构见 _build_project_file_dir_internal）
+    """
+    def __init__(self, app_name: str = APP_NAME, project_root: str = PROJECT_ROOT,
+                 data_dir_base_name: str = DATA_DIR_BASE_NAME):
+        self.app_name = app_name
+        self.project_root = project_root
+        self.data_dir_base_name = data_dir_base_name
+        self._outline: Optional[Dict[str, List[int]]] = None
+        self._unique_categories: Optional[Set[str]] = None
+        self._question_map: Optional[Dict[int, str]] = None
+        self._file_dir: Optional[Dict[str, Any]] = None
+
+    def _ensure_outline_parsed(self) -> None:
+        if self._outline is None:
+            self._outline, self._unique_categories, self._question_map = \
+                parse_interview_outline(self.app_name, self.project_root, self.data_dir_base_name)
+
+    @property
+    def outline(self) -> Dict[str, List[int]]:
+        self._ensure_outline_parsed()
+        return self._outline
+
+    @property
+    def question_map(self) -> Dict[int, str]:
+        self._ensure_outline_parsed()
+        return self._question_map
+
+    @property
+    def unique_categories(self) -> Set[str]:
+        self._ensure_outline_parsed()
+        return self._unique_categories
+
+    @property
+    def base_data_dir(self) -> str:
+        """存放所有应用数据文件夹的基础目录"""
+        return os.path.join(self.project_root, self.data_dir_base_name)
+
+    @property
+    def file_dir(self) -> Dict[str, Any]:
+        """路径配置字典；按分类扫描文件的列表键在 get_path_list 首次访问时才填充"""
+        if self._file_dir is None:
+            self._file_dir = _build_project_file_dir_internal(
+                self.base_data_dir, self.app_name, self.unique_categories, scan_files=False
+            )
+        return self._file_dir
+
+    def scan_file_lists(self) -> Dict[str, Any]:
+        """
+        （重新）扫描分类目录，刷新 _SCANNED_FILE_LIST_KEYS 中的列表键并返回 file_dir
+
+        目录列表由共享的 DirectoryIndex 缓存，目录未变化时每个目录只需一次 stat。
+        """
+        _scan_grouped_file_lists(self.file_dir, self.unique_categories)
+        return self.file_dir
+
+    def reload(self) -> None:
+        """丢弃已缓存的大纲和路径配置，下次访问时重新解析"""
+        self._outline = self._unique_categories = self._question_map = None
+        self._file_dir = None
+
 # --- 公开函数 ---
+def get_project_config() -> ProjectConfig:
+    """获取当前应用 (APP_NAME) 的项目配置单例"""
+    global _PROJECT_CONFIG
+    if _PROJECT_CONFIG is None:
+        _PROJECT_CONFIG = ProjectConfig()
+    return _PROJECT_CONFIG
+
+def discover_app_names(base_data_dir: Optional[str] = None) -> List[str]:
+    """
+    列出数据目录下的所有应用名称（按名称排序）
+
+    参数:
+        base_data_dir: 存放应用文件夹的目录，默认为 PROJECT_ROOT/DATA_DIR_BASE_NAME
+    返回:
+        各 {应用名}_dir 文件夹对应的应用名称，目录不存在时返回空列表
+    """
+    base_data_dir = base_data_dir or os.path.join(PROJECT_ROOT, DATA_DIR_BASE_NAME)
+    try:
+        with os.scandir(base_data_dir) as entries:
+            return sorted(entry.name[:-len(APP_DIR_SUFFIX)] for entry in entries
+                          if entry.is_dir() and entry.name.endswith(APP_DIR_SUFFIX)
+                          and len(entry.name) > len(APP_DIR_SUFFIX))
+    except OSError as e:
+        logger.error(f"无法读取数据目录 '{base_data_dir}': {e}")
+        return []
+
 def get_path(key: str) -> str:
     """获取单个文件或目录的路径"""
     global _PROJECT_FILE_DIR
@@ -181,6 +347,10 @@ def get_path_list(key: str) -> List[Any]:
     if _PROJECT_FILE_DIR is None or not isinstance(_PROJECT_FILE_DIR, dict):
         raise RuntimeError("项目路径配置 _PROJECT_FILE_DIR 未能成功初始化或类型不正确。")
 
+    # 按分类扫描的列表每次访问都刷新（目录未变化时命中目录缓存），使本进程中新写入的文件可见
+    if key in _SCANNED_FILE_LIST_KEYS:
+        get_project_config().scan_file_lists()
+
     path_value = _PROJECT_FILE_DIR.get(key)
     if path_value is None:
         raise KeyError(f"路径列表键 '{key}' 在项目路径配置中未找到。可用键示例: 'grouped_user_g_txts', 'grouped_inductive_q_jsons'等。")
@@ -233,7 +403,12 @@ def get_id_manager() -> IDManager:
 
 # --- 内部变量 ---
 _PROJECT_FILE_DIR: Optional[Dict[str, Any]] = None
+_PROJECT_CONFIG: Optional[ProjectConfig] = None
 _ID_MANAGER: Optional[IDManager] = None
+_DIRECTORY_INDEX = DirectoryIndex()
+
+# 需要扫描分类目录才能得到的列表键，由 _scan_grouped_file_lists 填充
+_SCANNED_FILE_LIST_KEYS = ('grouped_inductive_q_jsons', 'grouped_inductive_q_cbook_jsons')
 
 # --- 内部函数 ---
 def sanitize_folder_name(name: str) -> str:
@@ -253,37 +428,41 @@ def validate_file_dir(file_dir: Dict[str, str]) -> bool:
     return all(key in file_dir and isinstance(file_dir[key], str) for key in required_keys)
 
 # --- @para-categ: 解析访谈大纲 ---
-def parse_interview_outline() -> Tuple[Dict[str, List[int]], Set[str]]:
+def parse_interview_outline(
+    app_name: str = APP_NAME,
+    project_root: str = PROJECT_ROOT,
+    data_dir_base_name: str = DATA_DIR_BASE_NAME
+) -> Tuple[Dict[str, List[int]], Set[str], Dict[int, str]]:
     """
     解析访谈大纲CSV文件，提取分类信息和问题编号映射。
     直接从项目根目录读取大纲文件，避免与 get_path 的循环依赖。
+    一般无需直接调用，通过 get_project_config() 访问解析结果。
     
     Returns:
-        Tuple[Dict[str, List[int]], Set[str]]: 
+        Tuple[Dict[str, List[int]], Set[str], Dict[int, str]]: 
             - 字典：分类名称到问题编号列表的映射
             - 集合：所有唯一的分类名称
+            - 字典：问题编号到问题文本的映射
     """
-    global QUESTION_MAP, OUTLINE  # 声明所有需要修改的全局变量
-    
     temp_outline_dict = defaultdict(list)
     temp_categories = set()
-    QUESTION_MAP.clear()  # 清空旧的映射
+    question_map: Dict[int, str] = {}
     
     try:
         # 直接从项目根目录读取大纲文件
-        outline_filename = f"{APP_NAME}-outline.csv"
-        outline_filepath = os.path.join(PROJECT_ROOT, outline_filename)
+        outline_filename = f"{app_name}-outline.csv"
+        outline_filepath = os.path.join(project_root, outline_filename)
         
         if not os.path.exists(outline_filepath):
             # 尝试在 00_rawdata_dir 中查找文件
-            raw_data_dir = os.path.join(PROJECT_ROOT, DATA_DIR_BASE_NAME, f"{APP_NAME}_dir", SDIR_00_RAW)
+            raw_data_dir = os.path.join(project_root, data_dir_base_name, f"{app_name}_dir", SDIR_00_RAW)
             alternative_path = os.path.join(raw_data_dir, outline_filename)
             
             if os.path.exists(alternative_path):
                 outline_filepath = alternative_path
             else:
-                print(f"错误: 未找到大纲文件: {outline_filepath} 或 {alternative_path}")
-                return {}, set()
+                logger.error(f"未找到大纲文件: {outline_filepath} 或 {alternative_path}")
+                return {}, set(), {}
         
         with open(outline_filepath, 'r', encoding='utf-8-sig') as f:
             reader = csv.reader(f)
@@ -306,25 +485,23 @@ def parse_interview_outline() -> Tuple[Dict[str, List[int]], Set[str]]:
                     
                     # 填充问题映射字典
                     if question_content:
-                        QUESTION_MAP[q_num] = question_content
+                        question_map[q_num] = question_content
                         
                 except ValueError:
                     continue
                     
-        return dict(temp_outline_dict), temp_categories
+        return dict(temp_outline_dict), temp_categories, question_map
         
     except Exception as e:
-        print(f"解析访谈大纲时出错: {e}")
-        print(f"详细错误信息: {traceback.format_exc()}")
-        return {}, set()
-
-# --- 面向外部的结构解析任务 ---
-OUTLINE, UNIQUE_CATEGORIES = parse_interview_outline()  # 更新为同时获取两个返回值
+        logger.error(f"解析访谈大纲时出错: {e}")
+        logger.error(f"详细错误信息: {traceback.format_exc()}")
+        return {}, set(), {}
 
 def _build_project_file_dir_internal(
     base_data_dir_for_app_folders: str,
     current_app_name: str,
-    categories_list: List[str]
+    categories_list: List[str],
+    scan_files: bool = True
 ) -> Dict[str, Any]:
     """
     (内部辅助函数) 根据给定的基础路径、应用名称和分类列表，
@@ -339,17 +516,26 @@ def _build_project_file_dir_internal(
         current_app_name (str): 当前正在处理的应用/项目名称 (例如: 'myworld')。
         categories_list (List[str]): 包含所有唯一分类名称 (通常是中文) 的字符串列表。
                                    这些名称将用作 '02_interview_outline_dir' 下的子文件夹名。
+        scan_files (bool): 是否立即扫描分类目录填充 _SCANNED_FILE_LIST_KEYS 中的列表键；
+                           为 False 时这些键缺失，由 get_path_list 在首次访问时扫描。
 
     Returns:
         Dict[str, Any]: file_dir 字典，包含路径字符串、路径列表或文件名模式。
                         键名和结构示例:
                         - 'APP_PATH': str - 当前应用的项目根目录 (例如: '.../data_dir/myworld_dir/')
+                        - 'build_manifest': str - 增量构建清单文件路径 (在 APP_PATH 下)。
+                        - 'pipeline_manifest': str - 流水线运行器记录各阶段输入指纹的清单文件路径 (在 APP_PATH 下)。
+                        - 'project_store': str - 可选的项目存储 (SQLite) 路径 (在 APP_PATH 下)，见 project_store.py。
                         - 'UI': str - 原始访谈数据CSV文件路径。
                         - 'UI_ol': str - 原始访谈大纲CSV文件路径 (在00_rawdata_dir中)。
                         - 'UI_path': str - '00_rawdata_dir/' 目录本身的路径。
                         - 'UI_utxt': str, 'UI_qtxt': str - 预处理后的文本文件路径。
                         - 'UI_utxt_path': str - '01_preprocessed_for_llm_dir/' 目录本身的路径。
+                        - 'UI_column_map': str - 01 阶段题号到CSV列映射的缓存文件路径。
                         - 'inductive_global_dir': str - 归纳编码的全局输出目录。
+                        - 'inductive_quote_cache': str - 03 阶段引文定位缓存文件路径。
+                        - 'inductive_merge_index': str - 02 阶段增量合并索引文件路径。
+                        - 'inductive_coding_store': str - 02 阶段生成的列式编码存储 (SQLite) 路径，供 03/04 读取。
                         - 'deductive_global_dir': str - 演绎编码的全局输出目录。
                         - '02_outline_parent_dir': str - '02_interview_outline_dir' 的路径。
                         - '_category_base_paths': Dict[str, Dict[str, str]] - 映射原始category名到其功能子目录路径:
@@ -362,6 +548,8 @@ def _build_project_file_dir_internal(
                                 }, ...
                             }
                         - 'grouped_user_g_txts': List[str] - 各分类下 'question_data_dir/user_g.txt' 的路径列表。
+                        - 'grouped_question_txts', 'grouped_user_txts': List[str] - 01 生成的各分类专题文本与分类纵向文本路径列表。
+                        - 'grouped_raw_codebook_csvs': List[str] - 04 生成的各分类编码本CSV路径列表。
                         - 'grouped_inductive_q_jsons': List[List[str]] - 各分类下 'question_data_dir/' 中匹配模式的JSON文件路径的嵌套列表。
                         - (更多 'grouped_...' 键，值为 List[str] 或 List[List[str]])
                         - 'pattern_...': str - 文件名匹配模式。
@@ -376,6 +564,9 @@ def _build_project_file_dir_internal(
     current_app_path = os.path.join(base_data_dir_for_app_folders, app_folder_name)
 
     file_dir['APP_PATH'] = os.path.join(current_app_path, '')
+    file_dir['build_manifest'] = os.path.join(current_app_path, f"{current_app_name}_build_manifest.json")
+    file_dir['pipeline_manifest'] = os.path.join(current_app_path, f"{current_app_name}_pipeline_manifest.json")
+    file_dir['project_store'] = os.path.join(current_app_path, f"{current_app_name}_project_store.sqlite")
 
     # --- 固定路径填充 ---
     raw_data_dir = os.path.join(current_app_path, SDIR_00_RAW)
@@ -388,6 +579,7 @@ def _build_project_file_dir_internal(
     file_dir['UI_utxt_path'] = os.path.join(preproc_dir, '') # 目录路径
     file_dir['UI_utxt'] = os.path.join(preproc_dir, f"{current_app_name}_user.txt")
     file_dir['UI_qtxt'] = os.path.join(preproc_dir, f"{current_app_name}_question.txt")
+    file_dir['UI_column_map'] = os.path.join(preproc_dir, f"{current_app_name}_column_map.json")
 
     inductive_dir = os.path.join(current_app_path, SDIR_03_INDUCTIVE)
     file_dir['inductive_global_dir'] = os.path.join(inductive_dir, '') # 目录路径
@@ -395,6 +587,9 @@ def _build_project_file_dir_internal(
     file_dir['inductive_maxqda_opencode'] = os.path.join(inductive_dir, f"{current_app_name}_inductive_maxqda_opencode.txt")
     file_dir['inductive_maxqda_themecode'] = os.path.join(inductive_dir, f"{current_app_name}_inductive_maxqda_themecode.txt")
     file_dir['inductive_global_metadata'] = os.path.join(inductive_dir, f"{current_app_name}_inductive_metadata.json")
+    file_dir['inductive_quote_cache'] = os.path.join(inductive_dir, f"{current_app_name}_quote_location_cache.json")
+    file_dir['inductive_merge_index'] = os.path.join(inductive_dir, f"{current_app_name}_inductive_merge_index.json")
+    file_dir['inductive_coding_store'] = os.path.join(inductive_dir, f"{current_app_name}_inductive_codes.sqlite")
 
     deductive_dir = os.path.join(current_app_path, SDIR_04_DEDUCTIVE)
     file_dir['deductive_global_dir'] = os.path.join(deductive_dir, '') # 目录路径
@@ -414,12 +609,13 @@ def _build_project_file_dir_internal(
     # 为 get_category_specific_path 准备的辅助字典
     file_dir['_category_base_paths'] = {} 
     
-    # 初始化用于存储分组路径列表的键
+    # 初始化用于存储分组路径列表的键（需要扫描目录的键由 _scan_grouped_file_lists 填充）
     grouped_keys = [
-        'grouped_user_g_txts', 'grouped_inductive_q_jsons',
-        'grouped_deductive_llm_jsons_in_group', 'grouped_inductive_q_cbook_jsons',
+        'grouped_user_g_txts',
+        'grouped_deductive_llm_jsons_in_group',
         'grouped_raw_codebook_txts', 'grouped_final_codebooks_txts',
-        'grouped_meta_data_files', 'grouped_user_data_dirs'  # 添加新的键
+        'grouped_meta_data_files', 'grouped_user_data_dirs',  # 添加新的键
+        'grouped_question_txts', 'grouped_user_txts', 'grouped_raw_codebook_csvs'
     ]
     for key in grouped_keys:
         file_dir[key] = []
@@ -453,48 +649,68 @@ def _build_project_file_dir_internal(
         # 填充 grouped_ lists (确保路径的文件部分不含尾部斜杠)
         file_dir['grouped_user_g_txts'].append(os.path.join(qdata_abs_dir.rstrip(os.sep), "user_g.txt"))
         
-        # glob.glob 会在调用时查找文件，如果目录此时不存在或无匹配文件，则列表为空
-        # 确保传递给 glob 的目录路径存在，或者 glob 能处理不存在的路径（通常返回空列表）
-        qdata_for_glob = qdata_abs_dir.rstrip(os.sep)
-        if os.path.exists(qdata_for_glob):
-            files_ind_q = sorted(glob.glob(os.path.join(qdata_for_glob, file_dir['pattern_inductive_q_json'])))
-            if not files_ind_q:
-                print(f"警告: 在目录 '{qdata_for_glob}' 中未找到匹配的JSON文件")
-        else:
-            print(f"警告: 目录不存在: '{qdata_for_glob}'")
-            files_ind_q = []
-            
-        file_dir['grouped_inductive_q_jsons'].append(files_ind_q)
-        
         file_dir['grouped_deductive_llm_jsons_in_group'].append(
             os.path.join(qdata_abs_dir.rstrip(os.sep), file_dir['pattern_deductive_llm_in_group'])
         )
         
-        cbook_for_glob = cbook_abs_dir.rstrip(os.sep)
-        if os.path.exists(cbook_for_glob):
-            files_ind_cbook = sorted(glob.glob(os.path.join(cbook_for_glob, file_dir['pattern_inductive_q_cbook_json'])))
-        else:
-            files_ind_cbook = []
-        file_dir['grouped_inductive_q_cbook_jsons'].append(files_ind_cbook)
         file_dir['grouped_raw_codebook_txts'].append(os.path.join(cbook_abs_dir.rstrip(os.sep), "raw_codebooks.txt"))
         file_dir['grouped_final_codebooks_txts'].append(os.path.join(cbook_abs_dir.rstrip(os.sep), "codebook.txt"))
         file_dir['grouped_meta_data_files'].append(os.path.join(meta_abs_dir.rstrip(os.sep), f"{safe_category_folder_name}_metadata.json"))
 
+        # 01 生成的分类文本与 04 生成的编码本（文件名使用原始分类名称）
+        file_dir['grouped_question_txts'].append(
+            os.path.join(qdata_abs_dir.rstrip(os.sep), f"{current_app_name}_question_{original_category_name}.txt"))
+        file_dir['grouped_user_txts'].append(
+            os.path.join(udata_abs_dir.rstrip(os.sep), f"{current_app_name}_user_{original_category_name}.txt"))
+        file_dir['grouped_raw_codebook_csvs'].append(
+            os.path.join(cbook_abs_dir.rstrip(os.sep), f"raw_codebook_{original_category_name}.csv"))
+
     file_dir['grouped_qdata_category_dirs'] = all_qdata_category_dirs
     file_dir['grouped_user_data_dirs'] = all_udata_category_dirs  # 新增：存储收集的 user_data_dir 路径
+
+    if scan_files:
+        _scan_grouped_file_lists(file_dir, categories_list)
     
     # validate_file_dir 可以在 _ensure_file_dir_initialized 中调用，或由调用者负责
     return file_dir
 
+def _scan_grouped_file_lists(file_dir: Dict[str, Any], categories_list: List[str],
+                             directory_index: Optional[DirectoryIndex] = None) -> None:
+    """
+    (内部辅助函数) 扫描各分类目录，填充 'grouped_inductive_q_jsons' 与
+    'grouped_inductive_q_cbook_jsons'，顺序与 categories_list 一致。
+
+    目录列表来自 directory_index（默认为模块共享的缓存），目录缺失或无匹配文件的警告每个目录只记录一次。
+    """
+    directory_index = directory_index or _DIRECTORY_INDEX
+    files_by_key: Dict[str, List[List[str]]] = {key: [] for key in _SCANNED_FILE_LIST_KEYS}
+    for original_category_name in categories_list:
+        category_paths = file_dir['_category_base_paths'][original_category_name]
+
+        # 目录此时不存在或无匹配文件时列表为空
+        qdata_for_glob = category_paths[SDIR_GROUP_QDATA].rstrip(os.sep)
+        files_ind_q = directory_index.glob(qdata_for_glob, file_dir['pattern_inductive_q_json'])
+        if files_ind_q is None:
+            directory_index.warn_once(f"目录不存在: '{qdata_for_glob}'")
+            files_ind_q = []
+        elif not files_ind_q:
+            directory_index.warn_once(f"在目录 '{qdata_for_glob}' 中未找到匹配的JSON文件")
+        files_by_key['grouped_inductive_q_jsons'].append(files_ind_q)
+
+        cbook_for_glob = category_paths[SDIR_GROUP_CBOOK].rstrip(os.sep)
+        files_ind_cbook = directory_index.glob(cbook_for_glob, file_dir['pattern_inductive_q_cbook_json'])
+        files_by_key['grouped_inductive_q_cbook_jsons'].append(files_ind_cbook or [])
+
+    file_dir.update(files_by_key)
+
 def _ensure_file_dir_initialized() -> None:
     """(内部辅助函数) 确保 _PROJECT_FILE_DIR 已被初始化。"""
     global _PROJECT_FILE_DIR
     if _PROJECT_FILE_DIR is None:
         # 此处打印信息表明正在进行初始化
         logger.info("首次调用路径获取函数，正在为应用 '{}' 初始化项目路径配置...".format(APP_NAME))
-        base_dir = os.path.join(PROJECT_ROOT, DATA_DIR_BASE_NAME)
         try:
-            file_dir, outline = get_project_paths(base_dir, APP_NAME, UNIQUE_CATEGORIES)
+            file_dir = get_project_config().file_dir
             if not validate_file_dir(file_dir):
                 logger.warning("初始化生成的 file_dir 未通过基本验证（部分关键路径缺失）。")
             _PROJECT_FILE_DIR = file_dir  # 只保存 file_dir 部分
@@ -520,7 +736,7 @@ def get_project_paths(base_dir_for_apps: str, app_name: str, categories_list: Li
             - 大纲字典 (category -> question numbers)
     """
     file_dir = _build_project_file_dir_internal(base_dir_for_apps, app_name, categories_list)
-    return file_dir, OUTLINE
+    return file_dir, get_project_config().outline
 
 # --- 封装创建目录功能 ---
 
@@ -679,6 +895,8 @@ def initialize_id_system() -> IDManager:
         if _ID_MANAGER is not None:
             return _ID_MANAGER
             
+        import pandas as pd
+
         # 获取原始数据文件路径
         original_file = get_path('UI')
         
@@ -769,7 +987,7 @@ def move_original_data(source_project_root: str, app_name: str, target_file_dir:
         else:
             if not os.path.exists(dest_outline_filepath):
                 logger.warning(f"源大纲文件 '{source_outline_filepath}' 未找到，且目标位置也无此文件")
-                if UNIQUE_CATEGORIES:
+                if get_project_config().unique_categories:
                     return False
             else:
                 logger.info(f"大纲文件已在目标位置 '{dest_outline_filepath}'")
@@ -860,7 +1078,7 @@ def move_original_data_back(target_project_root: str, app_name: str, source_file
 
 # --- 处理原始数据 ---
 
-def process_raw_data(raw_df: pd.DataFrame) -> pd.DataFrame:
+def process_raw_data(raw_df: 'pd.DataFrame') -> 'pd.DataFrame':
     """
     处理DataFrame中的多行文本
     
@@ -974,7 +1192,7 @@ def manage_project_workflow(
             
         # 步骤2: 创建目录结构
         update_progress("创建目录结构")
-        file_dir, outline = get_project_paths(base_dir_for_apps, app_to_manage, UNIQUE_CATEGORIES)
+        file_dir, outline = get_project_paths(base_dir_for_apps, app_to_manage, get_project_config().unique_categories)
         if not create_project_dir(file_dir):
             logger.error("创建目录结构失败")
             return False
@@ -1002,6 +1220,8 @@ def setup_id_system() -> bool:
     logger.info("开始建立内部ID系统...")
     
     try:
+        import pandas as pd
+
         # 获取文件路径
         original_file = get_path('UI')
         id_file = get_path('UI_id')
@@ -1051,8 +1271,6 @@ def setup_id_system() -> bool:
  
 def setup_project(mode: str = "setup") -> bool:
     """项目初始化设置"""
-    global OUTLINE, UNIQUE_CATEGORIES, QUESTION_MAP
-    
     try:
         # 1. 设置基础参数
         param_base_data_dir = os.path.join(PROJECT_ROOT, DATA_DIR_BASE_NAME)
@@ -1085,8 +1303,8 @@ def setup_project(mode: str = "setup") -> bool:
             logger.info(f"文件已移回项目根目录: {PROJECT_ROOT}")
             
         # 5. 打印重要变量状态
-        logger.debug(f"OUTLINE: {OUTLINE}")
-        logger.debug(f"QUESTION_MAP: {QUESTION_MAP}")
+        logger.debug(f"OUTLINE: {get_project_config().outline}")
+        logger.debug(f"QUESTION_MAP: {get_project_config().question_map}")
         
         return True
         
@@ -1117,8 +1335,8 @@ def run(mode: str):
     else:
         logger.error("工作流程执行失败，请检查日志文件了解详细信息")
 
-    print(f"OUTLINE: {OUTLINE}")
-    print(f"QUESTION_MAP: {QUESTION_MAP}")
+    print(f"OUTLINE: {get_project_config().outline}")
+    print(f"QUESTION_MAP: {get_project_config().question_map}")
 
 # --- 测试函数 --- 
 
@@ -1128,6 +1346,7 @@ def test_data_access_interfaces():
     假定 _PROJECT_FILE_DIR 已经通过 _ensure_file_dir_initialized() 被填充。
     """
     logger.info("\n--- 开始测试数据访问接口 ---")
+    unique_categories = list(get_project_config().unique_categories)
     
     # 确保 _PROJECT_FILE_DIR 已初始化 (如果尚未初始化，则会在此处初始化)
     # 这一步很重要，因为它会使用全局的 APP_NAME, PROJECT_ROOT, DATA_DIR_BASE_NAME, UNIQUE_CATEGORIES
@@ -1172,8 +1391,8 @@ def test_data_access_interfaces():
         print(f"  get_path_list('{grouped_qdata_key}'): OK (获取到 {len(qdata_dirs_list)} 个路径)")
         if qdata_dirs_list:
             print(f"    示例路径[0]: '{qdata_dirs_list[0]}'")
-        elif UNIQUE_CATEGORIES: # 如果有分类但列表为空，可能 glob 未执行或目录未创建
-             print(f"    注意: '{grouped_qdata_key}' 返回空列表，但存在 {len(UNIQUE_CATEGORIES)} 个分类。")
+        elif unique_categories: # 如果有分类但列表为空，可能 glob 未执行或目录未创建
+             print(f"    注意: '{grouped_qdata_key}' 返回空列表，但存在 {len(unique_categories)} 个分类。")
         test_passed_count += 1
     except Exception as e:
         print(f"  get_path_list('{grouped_qdata_key}'): FAILED -> {e}")
@@ -1194,10 +1413,10 @@ def test_data_access_interfaces():
     print("\n3. 测试 get_category_specific_path():")
     category_to_test = "用户体验" # 假设这是您大纲中的一个中文分类名
                                  # 为了测试的健壮性，最好从 UNIQUE_CATEGORIES 中动态选择一个
-    if UNIQUE_CATEGORIES:
-        if category_to_test not in UNIQUE_CATEGORIES:
-            print(f"  注意: 测试用的分类 '{category_to_test}' 不在 UNIQUE_CATEGORIES 中。将使用第一个可用分类 '{UNIQUE_CATEGORIES[0]}' 进行测试。")
-            category_to_test_actual = UNIQUE_CATEGORIES[0]
+    if unique_categories:
+        if category_to_test not in unique_categories:
+            print(f"  注意: 测试用的分类 '{category_to_test}' 不在 UNIQUE_CATEGORIES 中。将使用第一个可用分类 '{unique_categories[0]}' 进行测试。")
+            category_to_test_actual = unique_categories[0]
         else:
             category_to_test_actual = category_to_test
             
@@ -1232,6 +1451,19 @@ def test_data_access_interfaces():
         print("  部分接口测试失败，请检查错误信息。")
     print("-----------------------------")
 
+# --- 惰性全局变量 (PEP 562) ---
+_LAZY_CONFIG_ATTRIBUTES = {
+    'OUTLINE': 'outline',
+    'QUESTION_MAP': 'question_map',
+    'UNIQUE_CATEGORIES': 'unique_categories',
+}
+
+def __getattr__(name: str) -> Any:
+    """首次访问 OUTLINE / QUESTION_MAP / UNIQUE_CATEGORIES 时才解析访谈大纲"""
+    if name in _LAZY_CONFIG_ATTRIBUTES:
+        return getattr(get_project_config(), _LAZY_CONFIG_ATTRIBUTES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 if __name__ == "__main__":
     # 使用标准日志系统
     logger.info("开始执行项目设置...")
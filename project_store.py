@@ -0,0 +1,474 @@
+"""
+项目存储模块
+
+把单个应用分散在各目录中的数据（原始访谈CSV、访谈大纲、各分类 question_data_dir 中的
+inductive_questionN.json 以及 codebook_data_dir 中的 raw_codebook_{分类}.csv）汇总到
+APP_PATH 下的一个 SQLite 文件中，按受访者、问题、分类建立索引，
+使"某受访者在某分类下的全部编码"之类的查询成为一次索引查询，而无需遍历目录并解析JSON。
+
+项目存储是可选的：各阶段脚本仍读写原有文件。存储由文件导入生成（build），
+_build_project_file_dir_internal 定义的目录布局则作为存储的导出视图（export），
+可在任意目录下重新生成各阶段所需的输入文件。
+
+表结构（除编码存储的各表外）：
+    meta              (key, value)                                   格式版本、应用名称、大纲表头
+    categories        (category_id, name, folder_name)               按大纲中首次出现的顺序
+    outline_questions (question_number, category_id, question_text, position)
+    csv_columns       (column_position, header, question_number)    UI_id 的各列及其对应题号
+    respondents       (respondent_id, original_id)                   内部ID (_id) 与原始ID（第一列原始数据）
+    answers           (respondent_id, column_position, answer_text)  UI_id 中的每个单元格
+    coded_files       (file_id, category_id, question_number)        source_files 中各 inductive_questionN.json 所属的分类与题号
+    raw_codebook_rows (category_id, position, code_name, definition, theme, source_question,
+                       frequency_in_question, representative_quotes)
+
+LLM 编码、主题与编码定义沿用 coding_store.py 的表结构（questions / initial_codes / entry_codes / ...），
+每个 inductive_questionN.json 作为一个来源文件写入，读取结果与 json.load 一致。
+
+用法:
+    python project_store.py build [--app 应用名]
+    python project_store.py export --target 目标数据目录 [--app 应用名] [--overwrite]
+    python project_store.py query --respondent 42 [--category 分类名] [--app 应用名]
+"""
+
+import os
+import re
+import csv
+import json
+import sqlite3
+import logging
+import argparse
+import urllib.request
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from coding_store import (
+    CodingTableWriter, create_coding_indexes, create_coding_tables, read_initial_codes, read_questions
+)
+from json_stream import JsonStreamError
+from logger import setup_logging
+from parameters import (
+    APP_NAME, SDIR_GROUP_CBOOK, SDIR_GROUP_QDATA, ProjectConfig, _build_project_file_dir_internal, sanitize_folder_name
+)
+from question_registry import QuestionRegistry, column_mapping_fingerprint, load_column_mapping
+
+logger = logging.getLogger(__name__)
+
+# 存储格式版本，表结构变化时递增以使旧库失效
+PROJECT_STORE_FORMAT_VERSION = 1
+
+# 只读连接的内存映射大小（字节）
+PROJECT_STORE_MMAP_SIZE = 1 << 28
+
+# raw_codebook_{分类}.csv 的列（与 04create_raw_codebook.py 一致）
+RAW_CODEBOOK_COLUMNS = ['code_name', 'definition', 'theme',
+                        'source_question', 'frequency_in_question', 'representative_quotes']
+
+# 访谈大纲CSV的默认表头（存储中未记录原表头时使用）
+OUTLINE_COLUMNS = ['q_num', 'Outlines', 'Questions']
+
+_QUESTION_NUMBER_PATTERN = re.compile(r'inductive_question\D*(\d+)')
+
+_SCHEMA = """
+CREATE TABLE categories (category_id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE, folder_name TEXT NOT NULL);
+CREATE TABLE outline_questions (
+    question_number INTEGER PRIMARY KEY, category_id INTEGER NOT NULL, question_text TEXT NOT NULL,
+    position INTEGER NOT NULL);
+CREATE TABLE csv_columns (column_position INTEGER PRIMARY KEY, header TEXT NOT NULL, question_number INTEGER);
+CREATE TABLE respondents (respondent_id INTEGER PRIMARY KEY, original_id TEXT);
+CREATE TABLE answers (
+    respondent_id INTEGER NOT NULL, column_position INTEGER NOT NULL, answer_text TEXT NOT NULL,
+    PRIMARY KEY (respondent_id, column_position)) WITHOUT ROWID;
+CREATE TABLE coded_files (file_id INTEGER PRIMARY KEY, category_id INTEGER, question_number INTEGER);
+CREATE TABLE raw_codebook_rows (
+    category_id INTEGER NOT NULL, position INTEGER NOT NULL, code_name TEXT, definition TEXT, theme TEXT,
+    source_question TEXT, frequency_in_question, representative_quotes TEXT);
+"""
+
+_INDEXES = """
+CREATE INDEX outline_questions_by_category ON outline_questions (category_id, position);
+CREATE INDEX csv_columns_by_question ON csv_columns (question_number);
+CREATE INDEX answers_by_column ON answers (column_position, respondent_id);
+CREATE INDEX coded_files_by_category ON coded_files (category_id, question_number);
+CREATE INDEX initial_codes_by_respondent ON initial_codes (respondent_id, question_id);
+CREATE UNIQUE INDEX raw_codebook_rows_by_category ON raw_codebook_rows (category_id, position);
+CREATE INDEX raw_codebook_rows_by_code ON raw_codebook_rows (code_name);
+"""
+
+# 受访者在某分类下的编码条目：条目所在问题的来源文件属于该分类
+_CATEGORY_ENTRY_FILTER = """WHERE respondent_id = ? AND question_id IN (
+    SELECT question_id FROM questions JOIN coded_files USING (file_id) JOIN categories USING (category_id)
+    WHERE categories.name = ?)"""
+
+
+def _read_csv_cells(csv_path: str) -> pd.DataFrame:
+    """以字符串原样读取CSV（空单元格为空字符串）"""
+    return pd.read_csv(csv_path, dtype=str, keep_default_na=False)
+
+
+def _parse_question_number(file_path: str) -> Optional[int]:
+    match = _QUESTION_NUMBER_PATTERN.search(os.path.basename(file_path))
+    return int(match.group(1)) if match else None
+
+
+def _map_columns_to_questions(config: ProjectConfig, headers: List[str]) -> Dict[str, int]:
+    """CSV表头到大纲题号的映射；与 01 使用相同的列映射缓存，缓存失效时重新匹配（不写回缓存）"""
+    outline_numbers = [number for numbers in config.outline.values() for number in numbers if number != 0]
+    fingerprint = column_mapping_fingerprint([header for header in headers if header != '_id'],
+                                             config.question_map, outline_numbers)
+    cached_mapping = load_column_mapping(config.file_dir['UI_column_map'], fingerprint)
+    registry = QuestionRegistry(headers, config.question_map, skip_headers=['_id'],
+                                question_numbers=outline_numbers, header_by_number=cached_mapping)
+    return {header: number for number, header in registry.header_by_number.items()}
+
+
+def _write_project_tables(conn: sqlite3.Connection, config: ProjectConfig) -> Dict[str, int]:
+    """写入分类、大纲问题、受访者与回答，返回分类名到 category_id 的映射"""
+    file_dir = config.file_dir
+    category_ids: Dict[str, int] = {}
+    for category_id, (category, question_numbers) in enumerate(config.outline.items()):
+        category_ids[category] = category_id
+        conn.execute("INSERT INTO categories VALUES (?, ?, ?)",
+                     (category_id, category, sanitize_folder_name(category)))
+        conn.executemany("INSERT INTO outline_questions VALUES (?, ?, ?, ?)", [
+            (number, category_id, config.question_map.get(number, ''), position)
+            for position, number in enumerate(question_numbers)
+        ])
+
+    if os.path.exists(file_dir['UI_ol']):
+        with open(file_dir['UI_ol'], 'r', encoding='utf-8-sig') as f:
+            outline_header = next(csv.reader(f), [])
+        conn.execute("INSERT INTO meta VALUES ('outline_header', ?)",
+                     (json.dumps(outline_header, ensure_ascii=False),))
+
+    id_csv_path = file_dir['UI_id']
+    if not os.path.exists(id_csv_path):
+        logger.warning(f"未找到带内部ID的访谈数据，项目存储中不含受访者与回答: '{id_csv_path}'")
+        return category_ids
+
+    df = _read_csv_cells(id_csv_path)
+    if '_id' not in df.columns:
+        raise ValueError(f"'{id_csv_path}' 中未找到内部ID列 '_id'")
+    headers = list(df.columns)
+    number_by_header = _map_columns_to_questions(config, headers)
+    conn.executemany("INSERT INTO csv_columns VALUES (?, ?, ?)", [
+        (position, header, number_by_header.get(header)) for position, header in enumerate(headers)
+    ])
+
+    id_position = headers.index('_id')
+    original_position = next((position for position, header in enumerate(headers) if header != '_id'), None)
+    respondent_rows, answer_rows = [], []
+    for row in df.itertuples(index=False, name=None):
+        respondent_id = int(row[id_position])
+        respondent_rows.append((respondent_id, row[original_position] if original_position is not None else None))
+        answer_rows.extend((respondent_id, position, text) for position, text in enumerate(row))
+    conn.executemany("INSERT INTO respondents VALUES (?, ?)", respondent_rows)
+    conn.executemany("INSERT INTO answers VALUES (?, ?, ?)", answer_rows)
+    logger.info(f"已导入 {len(df)} 位受访者的回答（{len(headers)} 列）")
+    return category_ids
+
+
+def _write_coding_tables(conn: sqlite3.Connection, config: ProjectConfig, category_ids: Dict[str, int]) -> int:
+    """写入各分类 question_data_dir 中的 inductive_questionN.json，返回导入的文件数"""
+    grouped_json_files = config.scan_file_lists()['grouped_inductive_q_jsons']
+    writer = CodingTableWriter(conn)
+    file_count = 0
+    for category, json_files in zip(config.unique_categories, grouped_json_files):
+        for json_path in json_files:
+            file_id = writer.add_source_file(json_path)
+            conn.execute("INSERT INTO coded_files VALUES (?, ?, ?)",
+                         (file_id, category_ids.get(category), _parse_question_number(json_path)))
+            try:
+                writer.add_question_file(json_path)
+            except (JsonStreamError, ValueError) as e:
+                raise ValueError(f"解析 '{json_path}' 失败: {e}") from e
+            file_count += 1
+    writer.flush()
+    return file_count
+
+
+def _write_codebook_rows(conn: sqlite3.Connection, config: ProjectConfig, category_ids: Dict[str, int]) -> int:
+    """写入各分类的 raw_codebook_{分类}.csv，返回导入的编码本数"""
+    codebook_count = 0
+    for category, category_id in category_ids.items():
+        csv_path = os.path.join(config.file_dir['_category_base_paths'][category][SDIR_GROUP_CBOOK],
+                                f"raw_codebook_{category}.csv")
+        if not os.path.exists(csv_path):
+            continue
+        df = _read_csv_cells(csv_path).reindex(columns=RAW_CODEBOOK_COLUMNS, fill_value='')
+        conn.executemany("INSERT INTO raw_codebook_rows VALUES (?, ?, ?, ?, ?, ?, ?, ?)", [
+            (category_id, position, code_name, definition, theme, source_question,
+             int(frequency) if frequency.isdigit() else frequency, quotes)
+            for position, (code_name, definition, theme, source_question, frequency, quotes)
+            in enumerate(df.itertuples(index=False, name=None))
+        ])
+        codebook_count += 1
+    return codebook_count
+
+
+def build_project_store(config: ProjectConfig, db_path: Optional[str] = None) -> bool:
+    """
+    从应用目录中的文件生成项目存储（先写临时文件再原子替换）
+
+    参数:
+        config: 应用的项目配置
+        db_path: 数据库文件路径，默认为 file_dir['project_store']
+
+    返回:
+        bool: 是否生成成功
+    """
+    db_path = db_path or config.file_dir['project_store']
+    if not config.outline:
+        logger.error(f"应用 '{config.app_name}' 的访谈大纲为空，无法生成项目存储")
+        return False
+
+    temp_path = f"{db_path}.tmp"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    conn = sqlite3.connect(temp_path)
+    try:
+        conn.executescript("PRAGMA journal_mode = OFF; PRAGMA synchronous = OFF;")
+        create_coding_tables(conn)
+        conn.executescript(_SCHEMA)
+
+        category_ids = _write_project_tables(conn, config)
+        file_count = _write_coding_tables(conn, config, category_ids)
+        codebook_count = _write_codebook_rows(conn, config, category_ids)
+
+        create_coding_indexes(conn)
+        conn.executescript(_INDEXES)
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+            ('version', str(PROJECT_STORE_FORMAT_VERSION)),
+            ('app_name', config.app_name),
+        ])
+        conn.commit()
+        conn.close()
+        os.replace(temp_path, db_path)
+        logger.info(f"项目存储已生成: '{db_path}' ({len(category_ids)} 个分类, "
+                    f"{file_count} 个编码文件, {codebook_count} 个编码本)")
+        return True
+    except Exception as e:
+        conn.close()
+        logger.error(f"生成项目存储失败 '{db_path}': {e}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return False
+
+
+class ProjectStore:
+    """
+    项目存储的只读视图
+
+    通过 ProjectStore.open() 打开；存储缺失或格式版本不一致时 open() 返回 None。
+    """
+
+    def __init__(self, conn: sqlite3.Connection, db_path: str, meta: Dict[str, str]):
+        self._conn = conn
+        self.db_path = db_path
+        self.app_name = meta['app_name']
+        self._meta = meta
+
+    @classmethod
+    def open(cls, db_path: str) -> Optional['ProjectStore']:
+        """以只读、内存映射方式打开存储，不可用时返回 None"""
+        if not db_path or not os.path.exists(db_path):
+            return None
+        try:
+            conn = sqlite3.connect(f"file:{urllib.request.pathname2url(os.path.abspath(db_path))}?mode=ro", uri=True)
+        except sqlite3.Error as e:
+            logger.warning(f"打开项目存储失败 '{db_path}': {e}")
+            return None
+        try:
+            conn.execute(f"PRAGMA mmap_size = {PROJECT_STORE_MMAP_SIZE}")
+            meta = dict(conn.execute("SELECT key, value FROM meta"))
+            if meta.get('version') != str(PROJECT_STORE_FORMAT_VERSION) or 'app_name' not in meta:
+                logger.info(f"项目存储格式已变化，忽略: '{db_path}'")
+                conn.close()
+                return None
+            return cls(conn, db_path, meta)
+        except sqlite3.Error as e:
+            logger.warning(f"读取项目存储失败 '{db_path}': {e}")
+            conn.close()
+            return None
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> 'ProjectStore':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def categories(self) -> List[str]:
+        """按大纲顺序排列的分类名称"""
+        return [name for name, in self._conn.execute("SELECT name FROM categories ORDER BY category_id")]
+
+    def category_questions(self, category: str) -> List[Tuple[int, str]]:
+        """分类下的 (题号, 问题文本)，按大纲顺序"""
+        return self._conn.execute(
+            "SELECT question_number, question_text FROM outline_questions JOIN categories USING (category_id) "
+            "WHERE categories.name = ? ORDER BY position", (category,)).fetchall()
+
+    def respondent_answers(self, respondent_id: int, category: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        受访者对大纲问题的回答
+
+        返回:
+            List[Dict]: {'category', 'question_number', 'question_text', 'answer'}，按大纲顺序
+        """
+        query = ("SELECT categories.name, o.question_number, o.question_text, a.answer_text "
+                 "FROM answers a JOIN csv_columns c USING (column_position) "
+                 "JOIN outline_questions o ON o.question_number = c.question_number "
+                 "JOIN categories USING (category_id) WHERE a.respondent_id = ?")
+        parameters: Tuple = (respondent_id,)
+        if category is not None:
+            query += " AND categories.name = ?"
+            parameters += (category,)
+        return [{'category': name, 'question_number': number, 'question_text': text, 'answer': answer}
+                for name, number, text, answer in self._conn.execute(
+                    query + " ORDER BY o.category_id, o.position", parameters)]
+
+    def codes_for_respondent(self, respondent_id: int, category: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        受访者的全部初始编码条目（可限定分类）
+
+        返回:
+            List[Dict]: {'category', 'question_number', 'question_text', 'entry'}，
+                        entry 与 inductive_questionN.json 中的初始编码条目一致，按文件中的顺序排列
+        """
+        if category is None:
+            entries = read_initial_codes(self._conn, "WHERE respondent_id = ?", (respondent_id,))
+        else:
+            entries = read_initial_codes(self._conn, _CATEGORY_ENTRY_FILTER, (respondent_id, category))
+        if not entries:
+            return []
+
+        question_ids = sorted({question_id for question_id, _ in entries})
+        placeholders = ', '.join('?' * len(question_ids))
+        question_info = {
+            question_id: (name, number, text)
+            for question_id, name, number, text in self._conn.execute(
+                "SELECT q.question_id, categories.name, f.question_number, q.question_text FROM questions q "
+                "LEFT JOIN coded_files f USING (file_id) LEFT JOIN categories USING (category_id) "
+                f"WHERE q.question_id IN ({placeholders})", question_ids)
+        }
+        result = []
+        for question_id, entry in entries:
+            name, number, text = question_info[question_id]
+            result.append({'category': name, 'question_number': number, 'question_text': text, 'entry': entry})
+        return result
+
+    def raw_codebook(self, category: str) -> List[Dict[str, Any]]:
+        """分类的初始编码本各行（列与 raw_codebook_{分类}.csv 一致）"""
+        return [dict(zip(RAW_CODEBOOK_COLUMNS, row)) for row in self._conn.execute(
+            f"SELECT {', '.join(RAW_CODEBOOK_COLUMNS)} FROM raw_codebook_rows JOIN categories USING (category_id) "
+            "WHERE categories.name = ? ORDER BY position", (category,))]
+
+    def export_file_layout(self, base_data_dir: str, overwrite: bool = False) -> bool:
+        """
+        按 _build_project_file_dir_internal 的目录布局将存储写出为文件
+
+        写出访谈大纲、原始访谈CSV (UI / UI_id)、各分类的 inductive_questionN.json 与 raw_codebook_{分类}.csv；
+        01-04 的其余输出可在导出目录上重新运行各阶段生成。
+
+        参数:
+            base_data_dir: 存放应用文件夹的目录（应用文件夹为 {应用名}_dir）
+            overwrite: 应用文件夹已存在且非空时是否仍然写入
+
+        返回:
+            bool: 是否导出成功
+        """
+        conn = self._conn
+        categories = self.categories()
+        file_dir = _build_project_file_dir_internal(base_data_dir, self.app_name, categories, scan_files=False)
+        app_path = file_dir['APP_PATH']
+        if os.path.isdir(app_path) and os.listdir(app_path) and not overwrite:
+            logger.error(f"导出目录已存在且非空（可使用 overwrite）: '{app_path}'")
+            return False
+
+        def write_csv(df: pd.DataFrame, path: str, encoding: str = 'utf-8') -> None:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            df.to_csv(path, index=False, encoding=encoding)
+
+        try:
+            outline_header = json.loads(self._meta.get('outline_header', '[]'))
+            if len(outline_header) < len(OUTLINE_COLUMNS):
+                outline_header = OUTLINE_COLUMNS
+            outline_rows = conn.execute(
+                "SELECT o.question_number, categories.name, o.question_text FROM outline_questions o "
+                "JOIN categories USING (category_id) ORDER BY o.question_number").fetchall()
+            write_csv(pd.DataFrame(outline_rows, columns=outline_header[:3]), file_dir['UI_ol'], 'utf-8-sig')
+
+            headers = [header for header, in conn.execute("SELECT header FROM csv_columns ORDER BY column_position")]
+            if headers:
+                cells: Dict[int, List[str]] = {}
+                for respondent_id, answer in conn.execute(
+                        "SELECT respondent_id, answer_text FROM answers ORDER BY respondent_id, column_position"):
+                    cells.setdefault(respondent_id, []).append(answer)
+                id_df = pd.DataFrame(list(cells.values()), columns=headers)
+                write_csv(id_df, file_dir['UI_id'])
+                write_csv(id_df.drop(columns='_id'), file_dir['UI'])
+
+            for file_id, path, category in conn.execute(
+                    "SELECT s.file_id, s.path, categories.name FROM source_files s "
+                    "JOIN coded_files USING (file_id) JOIN categories USING (category_id) "
+                    "ORDER BY s.file_id").fetchall():
+                qdata_dir = file_dir['_category_base_paths'][category][SDIR_GROUP_QDATA]
+                os.makedirs(qdata_dir, exist_ok=True)
+                with open(os.path.join(qdata_dir, os.path.basename(path)), 'w', encoding='utf-8') as f:
+                    json.dump(read_questions(conn, "WHERE file_id = ?", (file_id,)), f, ensure_ascii=False, indent=2)
+
+            for category, csv_path in zip(categories, file_dir['grouped_raw_codebook_csvs']):
+                rows = self.raw_codebook(category)
+                if rows:
+                    write_csv(pd.DataFrame(rows, columns=RAW_CODEBOOK_COLUMNS), csv_path, 'utf-8-sig')
+        except (OSError, sqlite3.Error, ValueError) as e:
+            logger.error(f"导出项目存储失败 '{app_path}': {e}")
+            return False
+
+        logger.info(f"项目存储已导出到: '{app_path}'")
+        return True
+
+
+def parse_arguments() -> argparse.Namespace:
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="生成、导出或查询应用的项目存储 (SQLite)")
+    parser.add_argument('--app', default=APP_NAME, help="应用名称（默认 APP_NAME）")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('build', help="从应用目录中的文件生成项目存储")
+    export_parser = subparsers.add_parser('export', help="按项目目录布局将存储导出为文件")
+    export_parser.add_argument('--target', required=True, help="存放应用文件夹的目标数据目录")
+    export_parser.add_argument('--overwrite', action='store_true', help="目标应用文件夹非空时仍然写入")
+    query_parser = subparsers.add_parser('query', help="查询受访者的回答与初始编码")
+    query_parser.add_argument('--respondent', type=int, required=True, help="受访者内部ID (_id)")
+    query_parser.add_argument('--category', help="只查询指定分类")
+    return parser.parse_args()
+
+
+def main() -> None:
+    setup_logging()
+    args = parse_arguments()
+    config = ProjectConfig(args.app)
+    db_path = config.file_dir['project_store']
+
+    if args.command == 'build':
+        raise SystemExit(0 if build_project_store(config, db_path) else 1)
+
+    store = ProjectStore.open(db_path)
+    if store is None:
+        logger.error(f"项目存储不可用，请先运行 build: '{db_path}'")
+        raise SystemExit(1)
+    with store:
+        if args.command == 'export':
+            raise SystemExit(0 if store.export_file_layout(args.target, args.overwrite) else 1)
+        for answer in store.respondent_answers(args.respondent, args.category):
+            print(f"[{answer['category']}] Q{answer['question_number']} {answer['question_text']}: {answer['answer']}")
+        for code in store.codes_for_respondent(args.respondent, args.category):
+            entry = code['entry']
+            print(f"[{code['category']}] Q{code['question_number']} {entry.get('code_name')}: "
+                  f"{entry.get('supporting_quote')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,398 @@
+"""
+问题注册表模块
+
+在 CSV 表头、访谈大纲题号（QUESTION_MAP）与规范化问题键三者之间建立一次性的映射，
+供 01create_user_and_question_data.py、03inductive_create_maxqda_themecode.py 与 04create_raw_codebook.py 共用，
+避免在每个被访者、每个问题上重复清理问题文本，并在处理开始前集中报告无法对应的问题。
+
+对应关系：
+    CSV 表头 --(文本匹配)--> 大纲题号 --(QUESTION_MAP)--> 大纲问题文本
+    CSV 表头 / 大纲问题文本 --(normalize)--> 规范化问题键
+
+表头与题号的匹配见 assign_headers_to_questions：以字符 n-gram 索引找出候选表头并打分，
+再对全部问题与表头求总分最大的一一对应；没有候选表头的题号视为未匹配，不会退回到任意列。
+匹配结果可经 save_column_mapping 持久化，表头与大纲问题不变时由 load_column_mapping 直接读取。
+"""
+
+import os
+import json
+import hashlib
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 表头相似度索引使用的字符 n-gram 长度
+COLUMN_MATCH_NGRAM = 2
+
+# 无包含关系时，表头与问题文本的 n-gram Dice 系数至少达到该值才视为匹配
+MIN_COLUMN_MATCH_SCORE = 0.6
+
+# 列映射缓存格式版本，匹配规则变化时递增以使旧缓存失效
+COLUMN_MAP_FORMAT_VERSION = 1
+
+
+def normalize_question_text(text: str) -> str:
+    """移除标点符号和空格，只保留字母和数字，用于表头与大纲问题文本的匹配"""
+    return ''.join(char for char in str(text) if char.isalnum())
+
+
+def _char_ngrams(text: str, n: int = COLUMN_MATCH_NGRAM) -> Set[str]:
+    """规范化文本的字符 n-gram 集合，短于 n 的文本整体作为一个 gram"""
+    if len(text) <= n:
+        return {text} if text else set()
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class HeaderMatcher:
+    """
+    表头相似度索引：一次性规范化全部表头并建立字符 n-gram 倒排索引
+
+    问题文本与表头的匹配分数：
+        - 规范化后一方包含另一方：1 + n-gram Dice 系数（包含关系总是优先）
+        - 否则为 n-gram Dice 系数，低于 MIN_COLUMN_MATCH_SCORE 视为不匹配
+    只有与问题文本共享至少一个 n-gram 的表头才会被打分。
+    """
+
+    def __init__(self, headers: Iterable[str]):
+        self.headers = list(headers)
+        self._normalized = [normalize_question_text(header) for header in self.headers]
+        self._gram_counts = []
+        self._index: Dict[str, List[int]] = {}
+        for header_index, normalized in enumerate(self._normalized):
+            grams = _char_ngrams(normalized)
+            self._gram_counts.append(len(grams))
+            for gram in grams:
+                self._index.setdefault(gram, []).append(header_index)
+
+    def candidates(self, question_text: str) -> Dict[int, float]:
+        """返回 {表头下标: 匹配分数}，只包含达到匹配条件的表头"""
+        target = normalize_question_text(question_text)
+        target_grams = _char_ngrams(target)
+        shared_counts: Dict[int, int] = {}
+        for gram in target_grams:
+            for header_index in self._index.get(gram, ()):
+                shared_counts[header_index] = shared_counts.get(header_index, 0) + 1
+
+        scores: Dict[int, float] = {}
+        for header_index, shared in shared_counts.items():
+            header_grams = self._gram_counts[header_index]
+            dice = 2 * shared / (len(target_grams) + header_grams)
+            # 包含关系意味着较短一方的 n-gram 全部共享，先用计数排除再做子串判断
+            if shared == header_grams or shared == len(target_grams):
+                normalized = self._normalized[header_index]
+                if normalized in target or target in normalized:
+                    scores[header_index] = 1 + dice
+                    continue
+            if dice >= MIN_COLUMN_MATCH_SCORE:
+                scores[header_index] = dice
+        return scores
+
+
+def _max_weight_assignment(weights: List[List[float]]) -> List[Optional[int]]:
+    """
+    求使总分最大的行列一一对应（匈牙利算法，O(n^2 m)）
+
+    参数:
+        weights: n x m 的非负分数矩阵，0 表示不可匹配
+
+    返回:
+        List[Optional[int]]: 每行对应的列下标，未匹配（或只能匹配到 0 分列）时为 None
+    """
+    n = len(weights)
+    m = len(weights[0]) if n else 0
+    if n == 0 or m == 0:
+        return [None] * n
+    transposed = n > m
+    if transposed:
+        weights = [list(column) for column in zip(*weights)]
+        n, m = m, n
+
+    # 最小化 -weight；u/v 为势，match_col[j] 为第 j 列匹配的行（均以 1 为起点，0 表示空）
+    inf = float('inf')
+    u = [0.0] * (n + 1)
+    v = [0.0] * (m + 1)
+    match_col = [0] * (m + 1)
+    way = [0] * (m + 1)
+    for row in range(1, n + 1):
+        match_col[0] = row
+        col0 = 0
+        min_reduced = [inf] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[col0] = True
+            row0 = match_col[col0]
+            delta = inf
+            col1 = 0
+            for col in range(1, m + 1):
+                if not used[col]:
+                    reduced = -weights[row0 - 1][col - 1] - u[row0] - v[col]
+                    if reduced < min_reduced[col]:
+                        min_reduced[col] = reduced
+                        way[col] = col0
+                    if min_reduced[col] < delta:
+                        delta = min_reduced[col]
+                        col1 = col
+            for col in range(m + 1):
+                if used[col]:
+                    u[match_col[col]] += delta
+                    v[col] -= delta
+                else:
+                    min_reduced[col] -= delta
+            col0 = col1
+            if match_col[col0] == 0:
+                break
+        while col0:
+            col1 = way[col0]
+            match_col[col0] = match_col[col1]
+            col0 = col1
+
+    assignment: List[Optional[int]] = [None] * (m if transposed else n)
+    for col in range(1, m + 1):
+        row = match_col[col]
+        if row and weights[row - 1][col - 1] > 0:
+            if transposed:
+                assignment[col - 1] = row - 1
+            else:
+                assignment[row - 1] = col - 1
+    return assignment
+
+
+def assign_headers_to_questions(question_texts: Dict[int, str], headers: List[str]) -> Dict[int, str]:
+    """
+    为大纲问题与表头求全局最优的一一对应
+
+    先用 HeaderMatcher 为每个问题找出候选表头，再按 "问题-表头" 候选关系划分连通分量，
+    在每个分量内用匈牙利算法求总分最大的对应，因此结果与问题、表头的遍历顺序无关。
+
+    参数:
+        question_texts: 题号到标准问题文本的映射
+        headers: 候选的CSV表头列表（不应包含ID列）
+
+    返回:
+        Dict[int, str]: 题号到表头的映射，没有候选表头的题号不在结果中
+    """
+    matcher = HeaderMatcher(headers)
+    candidates = {number: matcher.candidates(text) for number, text in question_texts.items()}
+
+    # 按候选关系划分连通分量（并查集，问题以 ('q', 题号)、表头以 ('h', 下标) 为节点）
+    parent: Dict[Tuple[str, int], Tuple[str, int]] = {}
+
+    def find(node: Tuple[str, int]) -> Tuple[str, int]:
+        parent.setdefault(node, node)
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for number, scores in candidates.items():
+        for header_index in scores:
+            parent[find(('q', number))] = find(('h', header_index))
+
+    components: Dict[Tuple[str, int], Tuple[List[int], List[int]]] = {}
+    for number in sorted(candidates):
+        if candidates[number]:
+            components.setdefault(find(('q', number)), ([], []))[0].append(number)
+    for header_index in range(len(headers)):
+        if ('h', header_index) in parent:
+            root = find(('h', header_index))
+            if root in components:
+                components[root][1].append(header_index)
+
+    header_by_number: Dict[int, str] = {}
+    for numbers, header_indices in components.values():
+        weights = [[candidates[number].get(header_index, 0.0) for header_index in header_indices]
+                   for number in numbers]
+        for number, column in zip(numbers, _max_weight_assignment(weights)):
+            if column is not None:
+                header_by_number[number] = headers[header_indices[column]]
+    return header_by_number
+
+
+@dataclass(frozen=True)
+class QuestionEntry:
+    """注册表中的一个问题：至少有表头或题号之一"""
+    key: str                      # 规范化问题键（有表头时由表头生成，否则由大纲问题文本生成）
+    header: Optional[str] = None  # CSV表头原文，大纲问题未匹配到表头时为 None
+    number: Optional[int] = None  # 大纲题号，表头未匹配到大纲问题时为 None
+    outline_text: Optional[str] = None  # QUESTION_MAP 中的标准问题文本
+
+
+class QuestionRegistry:
+    """
+    CSV 表头、大纲题号与规范化问题键之间的映射
+
+    参数:
+        headers: CSV表头列表（按原始顺序），为空时只登记大纲问题
+        question_map: 题号到标准问题文本的映射（QUESTION_MAP）
+        normalize: 生成问题键的规范化函数，默认为 normalize_question_text
+        skip_headers: 不参与题号匹配的表头（如ID列），它们仍会登记问题键
+        question_numbers: 参与匹配的题号，默认为 question_map 中的全部题号
+        header_by_number: 已知的题号到表头映射（如 load_column_mapping 的结果），提供时跳过匹配
+    """
+
+    def __init__(self, headers: Iterable[str], question_map: Dict[int, str],
+                 normalize: Optional[Callable[[str], str]] = None,
+                 skip_headers: Iterable[str] = (),
+                 question_numbers: Optional[Iterable[int]] = None,
+                 header_by_number: Optional[Dict[int, str]] = None):
+        self.normalize = normalize or normalize_question_text
+        self.headers = list(headers)
+        skip_headers = set(skip_headers)
+
+        if question_numbers is None:
+            question_numbers = sorted(question_map)
+
+        # 全局求解大纲问题与表头的对应
+        question_numbers = [number for number in question_numbers if question_map.get(number)]
+        if header_by_number is None:
+            header_by_number = assign_headers_to_questions(
+                {number: question_map[number] for number in question_numbers},
+                [header for header in self.headers if header not in skip_headers]
+            )
+        self.header_by_number = dict(header_by_number)
+        number_by_header = {header: number for number, header in header_by_number.items()}
+
+        # 登记表头对应的问题
+        self._by_header: Dict[str, QuestionEntry] = {}
+        self._by_key: Dict[str, QuestionEntry] = {}
+        for header in self.headers:
+            number = number_by_header.get(header)
+            entry = QuestionEntry(
+                key=self.normalize(header),
+                header=header,
+                number=number,
+                outline_text=question_map.get(number) if number is not None else None
+            )
+            self._by_header[header] = entry
+            self._by_key.setdefault(entry.key, entry)
+
+        # 登记大纲问题：已匹配表头的沿用表头条目，其余单独登记
+        self._by_number: Dict[int, QuestionEntry] = {}
+        self._by_outline_key: Dict[str, QuestionEntry] = {}
+        for number in question_numbers:
+            outline_text = question_map.get(number)
+            if not outline_text:
+                continue
+            if number in header_by_number:
+                entry = self._by_header[header_by_number[number]]
+            else:
+                entry = QuestionEntry(key=self.normalize(outline_text), number=number,
+                                      outline_text=outline_text)
+            self._by_number[number] = entry
+            self._by_outline_key.setdefault(self.normalize(outline_text), entry)
+
+        self.unmatched_headers: List[str] = [
+            header for header in self.headers
+            if header not in skip_headers and header not in number_by_header
+        ]
+        self.unmatched_numbers: List[int] = [
+            number for number, entry in self._by_number.items() if entry.header is None
+        ]
+
+    def entry_for_header(self, header: str) -> Optional[QuestionEntry]:
+        """按CSV表头原文查找问题"""
+        return self._by_header.get(header)
+
+    def entry_for_number(self, number: int) -> Optional[QuestionEntry]:
+        """按大纲题号查找问题"""
+        return self._by_number.get(number)
+
+    def resolve(self, question_text: str) -> Optional[QuestionEntry]:
+        """
+        将任意问题文本（如LLM结果中的 question_text）解析为注册表中的问题
+
+        先按规范化后的表头精确匹配，再按规范化后的大纲问题文本匹配；都失败时返回 None
+        """
+        return self.entry_for_key(self.normalize(question_text))
+
+    def entry_for_key(self, key: str) -> Optional[QuestionEntry]:
+        """按已规范化的问题键查找问题：先匹配表头，再匹配大纲问题文本"""
+        entry = self._by_key.get(key)
+        if entry is None:
+            entry = self._by_outline_key.get(key)
+        return entry
+
+    def log_unmatched(self, logger) -> None:
+        """集中报告未匹配到大纲问题的表头和未匹配到表头的大纲题号"""
+        for number in self.unmatched_numbers:
+            logger.warning(f"题号 {number} 未匹配到任何CSV列: '{self._by_number[number].outline_text}'")
+        if self.unmatched_headers:
+            logger.warning(f"以下CSV列未匹配到任何大纲题号: {self.unmatched_headers}")
+
+
+def _content_hash(value: Any) -> str:
+    digest = hashlib.sha1(json.dumps(value, ensure_ascii=False).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def column_mapping_fingerprint(headers: Iterable[str], question_map: Dict[int, str],
+                               question_numbers: Iterable[int]) -> Dict[str, Any]:
+    """
+    列映射缓存的校验信息：表头行与参与匹配的大纲问题的内容哈希，以及匹配参数
+
+    大纲只对参与匹配的 (题号, 问题文本) 取哈希，分类等与匹配无关的修改不会使缓存失效
+    """
+    outline_items = [[number, question_map[number]] for number in sorted(question_numbers)
+                     if question_map.get(number)]
+    return {
+        'version': COLUMN_MAP_FORMAT_VERSION,
+        'ngram': COLUMN_MATCH_NGRAM,
+        'min_score': MIN_COLUMN_MATCH_SCORE,
+        'header_hash': _content_hash(list(headers)),
+        'outline_hash': _content_hash(outline_items),
+    }
+
+
+def load_column_mapping(mapping_file: str, fingerprint: Dict[str, Any]) -> Optional[Dict[int, str]]:
+    """
+    读取已保存的题号到表头映射
+
+    参数:
+        mapping_file: 列映射缓存文件路径
+        fingerprint: column_mapping_fingerprint 的返回值
+
+    返回:
+        Optional[Dict[int, str]]: 文件存在且校验信息一致时返回映射，否则返回 None
+    """
+    if not mapping_file or not os.path.exists(mapping_file):
+        return None
+    try:
+        with open(mapping_file, 'r', encoding='utf-8') as f:
+            payload = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning(f"读取列映射缓存失败，将重新匹配 '{mapping_file}': {e}")
+        return None
+    if not isinstance(payload, dict) or payload.get('fingerprint') != fingerprint:
+        logger.info(f"CSV表头或访谈大纲已变化，重新匹配列映射: '{mapping_file}'")
+        return None
+    try:
+        return {int(number): header for number, header in payload.get('header_by_number', {}).items()}
+    except (AttributeError, ValueError) as e:
+        logger.warning(f"列映射缓存内容无效，将重新匹配 '{mapping_file}': {e}")
+        return None
+
+
+def save_column_mapping(mapping_file: str, fingerprint: Dict[str, Any],
+                        header_by_number: Dict[int, str]) -> bool:
+    """
+    保存题号到表头映射（先写临时文件再原子替换）
+
+    返回:
+        bool: 是否写入成功
+    """
+    temp_file = f"{mapping_file}.tmp"
+    try:
+        os.makedirs(os.path.dirname(mapping_file) or '.', exist_ok=True)
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump({
+                'fingerprint': fingerprint,
+                'header_by_number': {str(number): header for number, header in sorted(header_by_number.items())},
+            }, f, ensure_ascii=False, indent=2)
+        os.replace(temp_file, mapping_file)
+        logger.info(f"已保存列映射缓存: {len(header_by_number)} 个题号 ('{mapping_file}')")
+        return True
+    except OSError as e:
+        logger.error(f"保存列映射缓存失败 '{mapping_file}': {e}")
+        return False
@@ -0,0 +1,435 @@
+"""
+引文定位引擎
+
+在被访者回答中定位LLM给出的 supporting_quote，返回的位置字典与
+03inductive_create_maxqda_themecode.py 中 get_segments_and_codes_for_answer 的约定一致：
+    - start / end: 匹配在空白规范化后的回答中的起止位置
+    - matched_text: 实际匹配的文本
+    - match_type: 'exact'(精确匹配) 或 'fuzzy'(模糊匹配)
+    - score: (仅模糊匹配) fuzzywuzzy 的相似度分数
+
+精确匹配失败时，提供两种模糊定位模式：
+1. legacy: 枚举回答中长度在引文长度 ±30% 内的全部子串，逐一交给 fuzzywuzzy 打分。
+2. indexed: 先在滑动窗口上做字符 q-gram 计数过滤，剔除不可能达到阈值的候选窗口，
+   再按相似度上界从高到低对幸存窗口做与 legacy 相同的 fuzzywuzzy 打分，
+   上界已不可能进入前 N 名时提前停止。
+
+indexed 模式的过滤是无损的：fuzz.ratio 的分数为 round(100 * 2M / (|a| + |b|))，
+其中匹配字符数 M 不超过两串的最长公共子序列，也就不超过两串字符多重集的交集大小。
+交集上界达不到阈值（或达不到当前第 N 名）的窗口不可能出现在 extractBests 的结果中，
+因此两种模式返回的结果完全相同，只是 indexed 模式省去了绝大多数 SequenceMatcher 调用。
+两种模式的对比见 benchmark_quote_locator.py。
+
+定位结果可以交给 QuoteLocationCache 缓存：进程内按 LRU 淘汰，并可选地持久化到磁盘，
+键为规范化后的回答与引文的哈希，重复出现的引文和重复运行的转换都无需再次模糊匹配。
+
+依赖说明：
+- fuzzywuzzy: 模糊匹配打分
+"""
+
+import os
+import re
+import json
+import hashlib
+import logging
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from fuzzywuzzy import process, fuzz, utils
+
+logger = logging.getLogger(__name__)
+
+# --- 常量定义 ---
+LOCATOR_MODE_LEGACY = 'legacy'
+LOCATOR_MODE_INDEXED = 'indexed'
+LOCATOR_MODES = (LOCATOR_MODE_LEGACY, LOCATOR_MODE_INDEXED)
+
+FUZZY_SCORE_THRESHOLD = 85   # 模糊匹配的最低分数
+MIN_LEN_FOR_FUZZY = 3        # 参与模糊匹配的最短长度
+LENGTH_TOLERANCE = 0.3       # 候选窗口长度相对引文长度的浮动比例
+FUZZY_RESULT_LIMIT = 5       # 参与位置比较的最佳候选数量
+
+DEFAULT_CACHE_SIZE = 20000   # 引文定位缓存的最大条目数
+# 磁盘缓存格式版本，定位规则或参数变化后旧缓存自动失效
+CACHE_FORMAT_VERSION = 1
+
+# 与 fuzzywuzzy.utils.full_process 使用的替换规则保持一致
+_NON_WORD_PATTERN = re.compile(r"(?ui)\W")
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def normalize_whitespace(text: str) -> str:
+    """将连续空白压缩为单个空格并去除首尾空白"""
+    return _WHITESPACE_PATTERN.sub(' ', text).strip()
+
+
+def find_exact_locations(processed_text: str, processed_quote: str) -> List[Dict[str, Any]]:
+    """
+    查找引文在文本中所有不重叠的精确出现位置
+
+    参数:
+        processed_text: 已规范化空白的源文本
+        processed_quote: 已规范化空白的引文
+
+    返回:
+        List[Dict]: 精确匹配位置列表，未找到时为空列表
+    """
+    locations = []
+    current_pos = 0
+    while current_pos < len(processed_text):
+        idx = processed_text.find(processed_quote, current_pos)
+        if idx == -1:
+            break
+        locations.append({
+            'start': idx,
+            'end': idx + len(processed_quote),
+            'matched_text': processed_text[idx : idx + len(processed_quote)],
+            'match_type': 'exact'
+        })
+        current_pos = idx + len(processed_quote)
+    return locations
+
+
+def _candidate_length_range(quote_len: int) -> Tuple[int, int]:
+    """返回候选窗口长度的闭区间 [最短, 最长]"""
+    slack = int(quote_len * LENGTH_TOLERANCE)
+    return quote_len - slack, quote_len + slack
+
+
+def enumerate_candidate_windows(processed_text: str, processed_quote: str) -> List[str]:
+    """
+    (legacy) 枚举所有长度在引文长度 ±30% 内的子串
+
+    返回的顺序（起点优先、长度次之）决定了同分候选的先后，indexed 模式按同样的顺序处理同分。
+    """
+    shortest, longest = _candidate_length_range(len(processed_quote))
+    text_len = len(processed_text)
+    return [processed_text[i:j] for i in range(text_len)
+            for j in range(i + shortest, i + longest + 1)
+            if j <= text_len and j - i >= MIN_LEN_FOR_FUZZY]
+
+
+def _comparable_chars(processed_text: str) -> Optional[str]:
+    """
+    逐字符复现 full_process 的替换与小写化，使任意窗口的打分输入都能由切片得到
+
+    返回:
+        Optional[str]: 与源文本等长的可比较字符串；
+                       若小写化会改变长度或依赖上下文（希腊字母 Σ），返回 None
+    """
+    comparable = _NON_WORD_PATTERN.sub(' ', processed_text).lower()
+    if len(comparable) != len(processed_text) or 'Σ' in processed_text:
+        return None
+    return comparable
+
+
+def _filter_candidate_windows(processed_text: str, processed_quote: str) -> Optional[List[Tuple[int, int, float]]]:
+    """
+    用字符 q-gram 计数过滤筛选候选窗口
+
+    对每一种候选长度在可比较字符串上滑动窗口，增量维护窗口与引文的字符交集大小，
+    只保留交集上界能够达到 FUZZY_SCORE_THRESHOLD 的窗口。
+
+    返回:
+        Optional[List[Tuple[int, int, float]]]: 按 (起点, 终点) 排序的 (起点, 终点, 相似度上界) 列表；
+            逐字符处理无法复现 full_process 或引文处理后为空时返回 None，由调用方退回完整枚举
+    """
+    comparable = _comparable_chars(processed_text)
+    query = utils.full_process(processed_quote)
+    if comparable is None or not query:
+        return None
+
+    query_counts: Dict[str, int] = defaultdict(int)
+    for ch in query:
+        if ch != ' ':
+            query_counts[ch] += 1
+    query_spaces = query.count(' ')
+    query_len = len(query)
+    # 100 * 2 * 交集 / (|a| + |b|) >= 阈值 - 0.5 的整数形式
+    required = 2 * FUZZY_SCORE_THRESHOLD - 1
+
+    text_len = len(comparable)
+    # 窗口首尾连续空格的长度，full_process 会把它们 strip 掉
+    leading_spaces = [0] * (text_len + 1)
+    for i in range(text_len - 1, -1, -1):
+        if comparable[i] == ' ':
+            leading_spaces[i] = leading_spaces[i + 1] + 1
+    trailing_spaces = [0] * (text_len + 1)
+    for j in range(1, text_len + 1):
+        if comparable[j - 1] == ' ':
+            trailing_spaces[j] = trailing_spaces[j - 1] + 1
+
+    shortest, longest = _candidate_length_range(len(processed_quote))
+    kept_windows: List[Tuple[int, int, float]] = []
+    for length in range(max(shortest, MIN_LEN_FOR_FUZZY), min(longest, text_len) + 1):
+        window_counts: Dict[str, int] = defaultdict(int)
+        overlap = 0
+        spaces = 0
+        for i in range(text_len - length + 1):
+            if i == 0:
+                incoming = comparable[:length]
+            else:
+                incoming = comparable[i + length - 1]
+                outgoing = comparable[i - 1]
+                if outgoing == ' ':
+                    spaces -= 1
+                else:
+                    window_counts[outgoing] -= 1
+                    if window_counts[outgoing] < query_counts.get(outgoing, 0):
+                        overlap -= 1
+            for ch in incoming:
+                if ch == ' ':
+                    spaces += 1
+                else:
+                    if window_counts[ch] < query_counts.get(ch, 0):
+                        overlap += 1
+                    window_counts[ch] += 1
+
+            if spaces == length:
+                continue  # 处理后为空串，分数必为0
+            inner_spaces = spaces - leading_spaces[i] - trailing_spaces[i + length]
+            window_len = length - spaces + inner_spaces
+            overlap_bound = overlap + min(query_spaces, inner_spaces)
+            if 400 * overlap_bound >= required * (query_len + window_len):
+                # 与 difflib 的 ratio 使用相同的浮点表达式，保证取整方向一致
+                kept_windows.append((i, i + length, 2.0 * overlap_bound / (query_len + window_len)))
+
+    kept_windows.sort()
+    return kept_windows
+
+
+def _extract_bests_bounded(processed_text: str, processed_quote: str,
+                           windows: List[Tuple[int, int, float]]) -> List[Tuple[str, int]]:
+    """
+    按相似度上界从高到低对候选窗口打分，上界低于当前第 N 名分数时提前停止
+
+    打分方式与 process.extractBests(scorer=fuzz.ratio) 相同，
+    同分时保留枚举顺序靠前的候选，因此返回结果与其完全一致。
+    """
+    query = utils.full_process(processed_quote)
+    best: List[Tuple[int, int, str]] = []  # (-分数, 枚举顺序, 子串)
+    for order in sorted(range(len(windows)), key=lambda k: -windows[k][2]):
+        start, end, bound = windows[order]
+        if len(best) >= FUZZY_RESULT_LIMIT and utils.intr(100 * bound) < -best[-1][0]:
+            break
+        candidate = processed_text[start:end]
+        score = fuzz.ratio(query, utils.full_process(candidate))
+        if score >= FUZZY_SCORE_THRESHOLD:
+            best.append((-score, order, candidate))
+            best.sort()
+            del best[FUZZY_RESULT_LIMIT:]
+    return [(candidate, -neg_score) for neg_score, _, candidate in best]
+
+
+def find_fuzzy_locations(processed_text: str, processed_quote: str,
+                         mode: str = LOCATOR_MODE_INDEXED) -> List[Dict[str, Any]]:
+    """
+    对候选窗口打分并换算为文本位置
+
+    参数:
+        processed_text: 已规范化空白的源文本
+        processed_quote: 已规范化空白的引文
+        mode: 候选窗口生成模式，'legacy' 或 'indexed'
+
+    返回:
+        List[Dict]: 去重后的模糊匹配位置，按分数从高到低排序
+    """
+    if mode == LOCATOR_MODE_LEGACY:
+        windows = None
+    elif mode == LOCATOR_MODE_INDEXED:
+        windows = _filter_candidate_windows(processed_text, processed_quote)
+    else:
+        raise ValueError(f"无效的引文定位模式: '{mode}'，必须是 {LOCATOR_MODES} 之一")
+
+    if windows is None:
+        candidates = enumerate_candidate_windows(processed_text, processed_quote)
+        if not candidates:
+            logger.debug("模糊定位: 没有可供比较的候选子串")
+            return []
+        results = process.extractBests(processed_quote, candidates,
+                                       scorer=fuzz.ratio, score_cutoff=FUZZY_SCORE_THRESHOLD,
+                                       limit=FUZZY_RESULT_LIMIT)
+    else:
+        results = _extract_bests_bounded(processed_text, processed_quote, windows)
+
+    fuzzy_locations = []
+    for matched_text, score in results:
+        s_idx = 0
+        while s_idx < len(processed_text):
+            pos = processed_text.find(matched_text, s_idx)
+            if pos == -1:
+                break
+            is_new = all(not (loc['start'] == pos and loc['end'] == pos + len(matched_text))
+                         for loc in fuzzy_locations)
+            if is_new:
+                fuzzy_locations.append({'start': pos, 'end': pos + len(matched_text),
+                                        'matched_text': matched_text,
+                                        'match_type': 'fuzzy', 'score': score})
+            s_idx = pos + len(matched_text)
+    fuzzy_locations.sort(key=lambda x: x['score'], reverse=True)
+    return fuzzy_locations
+
+
+def locate_quote(text_to_search_in: str, quote_to_find: str,
+                 mode: str = LOCATOR_MODE_INDEXED) -> List[Dict[str, Any]]:
+    """
+    在文本中定位引文：优先返回全部精确匹配，否则返回得分最高的一个模糊匹配
+
+    参数:
+        text_to_search_in: 要搜索的源文本
+        quote_to_find: 要定位的引文文本
+        mode: 模糊定位模式，'legacy' 或 'indexed'
+
+    返回:
+        List[Dict]: 匹配位置列表，未找到时为空列表
+    """
+    if not quote_to_find:
+        return []
+
+    processed_text = normalize_whitespace(text_to_search_in)
+    processed_quote = normalize_whitespace(quote_to_find)
+    if not processed_quote:
+        return []
+
+    locations = find_exact_locations(processed_text, processed_quote)
+    if locations:
+        return locations
+
+    if len(processed_quote) < MIN_LEN_FOR_FUZZY:
+        return []
+    fuzzy_locations = find_fuzzy_locations(processed_text, processed_quote, mode)
+    return fuzzy_locations[:1]
+
+
+class QuoteLocationCache:
+    """
+    引文定位结果缓存：进程内 LRU，可选持久化到 JSON 文件
+
+    键为规范化后的回答与引文的 SHA-1 哈希，值为 locate_quote 的返回结果。
+    定位结果与模式无关（legacy 与 indexed 结果一致），因此键中不包含模式。
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_CACHE_SIZE, cache_file: Optional[str] = None):
+        self.max_entries = max_entries
+        self.cache_file = cache_file
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        self._dirty = False
+        if cache_file:
+            self.load()
+
+    @staticmethod
+    def make_key(text_to_search_in: str, quote_to_find: str) -> str:
+        """由规范化后的回答与引文生成缓存键"""
+        digest = hashlib.sha1()
+        digest.update(normalize_whitespace(text_to_search_in).encode('utf-8'))
+        digest.update(b'\x00')
+        digest.update(normalize_whitespace(quote_to_find).encode('utf-8'))
+        return digest.hexdigest()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """查询缓存，命中时将条目移到最近使用的位置"""
+        locations = self._entries.get(key)
+        if locations is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return [dict(loc) for loc in locations]
+
+    def put(self, key: str, locations: List[Dict[str, Any]]) -> None:
+        """写入缓存，超出容量时淘汰最久未使用的条目"""
+        self._entries[key] = [dict(loc) for loc in locations]
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        self._dirty = True
+
+    def locate(self, text_to_search_in: str, quote_to_find: str,
+               mode: str = LOCATOR_MODE_INDEXED) -> List[Dict[str, Any]]:
+        """带缓存的 locate_quote"""
+        key = self.make_key(text_to_search_in, quote_to_find)
+        locations = self.get(key)
+        if locations is None:
+            locations = locate_quote(text_to_search_in, quote_to_find, mode=mode)
+            self.put(key, locations)
+        return locations
+
+    def snapshot(self) -> Dict[str, List[Dict[str, Any]]]:
+        """返回当前全部条目的浅拷贝（按最近使用顺序），用于向工作进程下发缓存"""
+        return dict(self._entries)
+
+    def merge(self, entries: Dict[str, List[Dict[str, Any]]], hits: int = 0, misses: int = 0) -> None:
+        """合并其他缓存（如工作进程）新增的条目与命中统计，已有的键保持不变"""
+        for key, locations in entries.items():
+            if key not in self._entries:
+                self.put(key, locations)
+        self.hits += hits
+        self.misses += misses
+
+    def _cache_params(self) -> Dict[str, Any]:
+        return {
+            'version': CACHE_FORMAT_VERSION,
+            'threshold': FUZZY_SCORE_THRESHOLD,
+            'length_tolerance': LENGTH_TOLERANCE,
+            'min_len_for_fuzzy': MIN_LEN_FOR_FUZZY,
+            'fuzzy_result_limit': FUZZY_RESULT_LIMIT,
+        }
+
+    def load(self) -> bool:
+        """
+        从磁盘加载缓存，文件不存在、损坏或参数不一致时保持空缓存
+
+        返回:
+            bool: 是否成功加载
+        """
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return False
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                payload = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"读取引文定位缓存失败，将重新建立缓存 '{self.cache_file}': {e}")
+            return False
+        if not isinstance(payload, dict) or payload.get('params') != self._cache_params():
+            logger.info(f"引文定位缓存的格式或参数已变化，忽略旧缓存: '{self.cache_file}'")
+            return False
+        entries = payload.get('entries', {})
+        for key, locations in list(entries.items())[-self.max_entries:]:
+            self._entries[key] = locations
+        logger.info(f"已加载引文定位缓存: {len(self._entries)} 条 ('{self.cache_file}')")
+        return True
+
+    def save(self) -> bool:
+        """
+        将缓存写回磁盘（先写临时文件再原子替换），未变化时跳过
+
+        返回:
+            bool: 是否写入成功或无需写入
+        """
+        if not self.cache_file or not self._dirty:
+            return True
+        temp_file = f"{self.cache_file}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.cache_file) or '.', exist_ok=True)
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump({'params': self._cache_params(), 'entries': self._entries},
+                          f, ensure_ascii=False)
+            os.replace(temp_file, self.cache_file)
+            self._dirty = False
+            logger.info(f"已保存引文定位缓存: {len(self._entries)} 条 ('{self.cache_file}')")
+            return True
+        except OSError as e:
+            logger.error(f"保存引文定位缓存失败 '{self.cache_file}': {e}")
+            return False
+
+    def stats_summary(self) -> str:
+        """返回命中/未命中统计的单行摘要"""
+        total = self.hits + self.misses
+        hit_rate = self.hits / total * 100 if total else 0.0
+        return (f"引文定位缓存: 命中 {self.hits} 次, 未命中 {self.misses} 次, "
+                f"命中率 {hit_rate:.1f}%, 当前条目 {len(self._entries)}")
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+流水线运行器
+
+将各编号脚本建模为有向无环图 (DAG)，每个阶段以 file_dir 键声明输入与输出：
+
+    01 预处理 ──> llm 人工LLM归纳编码 ──┬──> 02 合并JSON ──> 03 MaxQDA转换
+                                        └──> 04 初始编码本
+
+运行规则：
+1. 阶段的输入文件指纹（含阶段脚本本身）与上次成功运行时一致、且输出文件完好时跳过，
+   指纹记录在 APP_PATH 下的流水线清单中（与 01 自身的构建清单分开）
+2. 上游阶段重新运行后，下游阶段的输入指纹随之变化，因而自动重新运行
+3. 依赖均已完成的阶段立即启动，相互独立的阶段（如 03 与 04）并行执行
+4. llm 为人工步骤：输出存在即视为完成，输出早于输入时提示可能需要重新编码；输出缺失时其下游阶段不运行
+
+每个阶段在独立的子进程中执行对应脚本，脚本的日志照常写入 workflow.log。
+子进程通过环境变量 APP_NAME_ENV_VAR 获得应用名称，因此同一份脚本可以处理任意应用。
+
+批量模式 (--apps / --all-apps) 在进程池中为每个应用各运行一条流水线，
+每个应用使用独立的 ProjectConfig，互不影响。
+
+用法:
+    python run_pipeline.py [--stages 02 03] [--force] [--dry-run]
+    python run_pipeline.py --all-apps [--jobs N]
+    python run_pipeline.py --apps bilibili 金铲铲之战
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+import subprocess
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, as_completed, wait
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+from logger import setup_logging
+from build_manifest import BuildManifest, fingerprint_value
+from parameters import APP_NAME_ENV_VAR, ProjectConfig, discover_app_names, get_project_config
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# 运行器与各阶段脚本所在目录
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 同时运行的阶段数上限
+MAX_PARALLEL_STAGES = 2
+
+# 批量模式下同时处理的应用数上限（每个应用最多再并行 MAX_PARALLEL_STAGES 个阶段）
+MAX_PARALLEL_APPS = max(1, (os.cpu_count() or 2) // MAX_PARALLEL_STAGES)
+
+
+@dataclass(frozen=True)
+class Stage:
+    """流水线中的一个阶段：script 为 None 表示人工步骤，code 为脚本导入的本地模块（随脚本一起计入指纹）"""
+    name: str
+    description: str
+    script: Optional[str]
+    inputs: Tuple[str, ...]
+    outputs: Tuple[str, ...]
+    depends_on: Tuple[str, ...] = ()
+    code: Tuple[str, ...] = ()
+
+
+# 所有阶段脚本都会导入的本地模块
+COMMON_CODE = ('parameters.py', 'logger.py')
+
+
+PIPELINE_STAGES: Tuple[Stage, ...] = (
+    Stage('01', "预处理访谈数据", '01create_user_and_question_data.py',
+          inputs=('UI_id', 'UI_ol'),
+          outputs=('UI_qtxt', 'UI_utxt', 'grouped_question_txts', 'grouped_user_txts'),
+          code=COMMON_CODE + ('question_registry.py', 'build_manifest.py')),
+    Stage('llm', "人工LLM归纳编码", None,
+          inputs=('grouped_question_txts',),
+          outputs=('grouped_inductive_q_jsons',),
+          depends_on=('01',)),
+    Stage('02', "合并归纳编码JSON", '02inductive_merge_json.py',
+          inputs=('grouped_inductive_q_jsons',),
+          outputs=('inductive_merged_json',),
+          depends_on=('llm',),
+          code=COMMON_CODE + ('coding_store.py', 'json_stream.py')),
+    Stage('03', "生成MaxQDA主题编码文本", '03inductive_create_maxqda_themecode.py',
+          inputs=('inductive_merged_json', 'UI', 'UI_ol'),
+          outputs=('inductive_maxqda_themecode',),
+          depends_on=('02',),
+          code=COMMON_CODE + ('quote_locator.py', 'coding_index.py', 'coding_store.py',
+                              'json_stream.py', 'question_registry.py')),
+    Stage('04', "生成初始编码本", '04create_raw_codebook.py',
+          inputs=('grouped_inductive_q_jsons', 'UI_ol'),
+          outputs=('grouped_raw_codebook_csvs',),
+          depends_on=('llm',),
+          code=COMMON_CODE + ('coding_index.py', 'coding_store.py', 'json_stream.py',
+                              'question_registry.py')),
+)
+
+
+def resolve_paths(config: ProjectConfig, key: str) -> List[str]:
+    """将 file_dir 键解析为文件路径列表（嵌套列表展开）"""
+    value = config.file_dir.get(key)
+    if value is None:
+        raise KeyError(f"路径键 '{key}' 在项目路径配置中未找到")
+    if isinstance(value, str):
+        return [value]
+    paths: List[str] = []
+    for item in value:
+        paths.extend([item] if isinstance(item, str) else item)
+    return paths
+
+
+def existing_paths(config: ProjectConfig, keys: Tuple[str, ...]) -> Dict[str, List[str]]:
+    """各键对应的、实际存在的文件路径"""
+    return {key: [path for path in resolve_paths(config, key) if os.path.isfile(path)] for key in keys}
+
+
+class PipelineRunner:
+    """
+    按 DAG 调度流水线阶段
+
+    参数:
+        config: 应用的项目配置
+        stages: 全部阶段定义
+        selected: 只运行这些阶段（其上游阶段视为已完成），None 表示全部
+        force: 忽略清单，运行全部选中的阶段
+        dry_run: 只报告每个阶段是否过期，不执行
+    """
+
+    def __init__(self, config: ProjectConfig, stages: Tuple[Stage, ...] = PIPELINE_STAGES,
+                 selected: Optional[Set[str]] = None, force: bool = False, dry_run: bool = False):
+        self.config = config
+        self.stages = {stage.name: stage for stage in stages}
+        self.selected = selected
+        self.force = force
+        self.dry_run = dry_run
+        self.manifest = BuildManifest(config.file_dir['pipeline_manifest'])
+        self._file_lists_stale = True
+
+    def _refresh_file_lists(self) -> None:
+        """有阶段运行结束后重新扫描分类目录（其输出可能新增了文件）"""
+        if self._file_lists_stale:
+            self.config.scan_file_lists()
+            self._file_lists_stale = False
+
+    def _stage_inputs(self, stage: Stage) -> Optional[Dict[str, Optional[str]]]:
+        """阶段的输入指纹，任一输入键没有任何现存文件时返回 None"""
+        self._refresh_file_lists()
+        inputs: Dict[str, Optional[str]] = {}
+        for key, paths in existing_paths(self.config, stage.inputs).items():
+            if not paths:
+                return None
+            inputs[key] = fingerprint_value([[path, self.manifest.hash_file(path)] for path in sorted(paths)])
+        if stage.script:
+            inputs['script'] = self.manifest.hash_file(os.path.join(SCRIPT_DIR, stage.script))
+        if stage.code:
+            inputs['code'] = fingerprint_value([self.manifest.hash_file(os.path.join(SCRIPT_DIR, module))
+                                                for module in stage.code])
+        return inputs
+
+    def _stage_outputs(self, stage: Stage) -> List[str]:
+        self._refresh_file_lists()
+        return [path for paths in existing_paths(self.config, stage.outputs).values() for path in paths]
+
+    def _check_manual_stage(self, stage: Stage) -> bool:
+        """人工步骤：输出存在即视为完成，输出早于输入时给出提示"""
+        outputs = self._stage_outputs(stage)
+        if not outputs:
+            logger.warning(f"[{self.config.app_name}/{stage.name}] {stage.description} 尚未完成（未找到 {', '.join(stage.outputs)}），"
+                           f"其下游阶段不会运行")
+            return False
+        inputs = [path for paths in existing_paths(self.config, stage.inputs).values() for path in paths]
+        if inputs and max(map(os.path.getmtime, inputs)) > min(map(os.path.getmtime, outputs)):
+            logger.warning(f"[{self.config.app_name}/{stage.name}] 输入文件比 {stage.description} 的结果更新，LLM编码结果可能需要重新生成")
+        logger.info(f"[{self.config.app_name}/{stage.name}] {stage.description}: 已有 {len(outputs)} 个结果文件")
+        return True
+
+    def _run_script(self, stage: Stage) -> Tuple[bool, float]:
+        """在子进程中运行阶段脚本，返回 (是否成功, 耗时秒数)"""
+        start = time.perf_counter()
+        env = {**os.environ, APP_NAME_ENV_VAR: self.config.app_name}
+        result = subprocess.run([sys.executable, os.path.join(SCRIPT_DIR, stage.script)], cwd=SCRIPT_DIR, env=env)
+        return result.returncode == 0, time.perf_counter() - start
+
+    def run(self) -> bool:
+        """
+        运行流水线
+
+        返回:
+            bool: 选中的阶段全部完成（运行成功或无需运行）返回 True
+        """
+        done: Set[str] = set()
+        blocked: Set[str] = set()
+        would_run: Set[str] = set()  # dry-run 中判定需要运行的阶段
+        pending = [name for name in self.stages]
+        running: Dict = {}
+        all_ok = True
+
+        with ThreadPoolExecutor(max_workers=MAX_PARALLEL_STAGES) as executor:
+            while pending or running:
+                # 启动依赖均已完成的阶段
+                for name in list(pending):
+                    stage = self.stages[name]
+                    if any(dep in blocked for dep in stage.depends_on):
+                        logger.warning(f"[{self.config.app_name}/{name}] 上游阶段未完成，跳过 {stage.description}")
+                        pending.remove(name)
+                        blocked.add(name)
+                        continue
+                    if not all(dep in done for dep in stage.depends_on):
+                        continue
+                    pending.remove(name)
+
+                    if self.selected is not None and name not in self.selected:
+                        done.add(name)
+                        continue
+                    if stage.script is None:
+                        (done if self._check_manual_stage(stage) else blocked).add(name)
+                        continue
+
+                    inputs = self._stage_inputs(stage)
+                    if inputs is None:
+                        logger.warning(f"[{self.config.app_name}/{name}] 缺少输入文件（{', '.join(stage.inputs)}），跳过 {stage.description}")
+                        blocked.add(name)
+                        continue
+                    target = f"pipeline:{name}"
+                    upstream_would_run = any(dep in would_run for dep in stage.depends_on)
+                    if not self.force and not upstream_would_run and self.manifest.is_up_to_date(target, inputs):
+                        logger.info(f"[{self.config.app_name}/{name}] 输入未变化，跳过 {stage.description}")
+                        done.add(name)
+                        continue
+                    if self.dry_run:
+                        logger.info(f"[{self.config.app_name}/{name}] 需要运行: {stage.description}")
+                        would_run.add(name)
+                        done.add(name)
+                        continue
+
+                    logger.info(f"[{self.config.app_name}/{name}] 开始: {stage.description}")
+                    running[executor.submit(self._run_script, stage)] = (name, inputs)
+
+                if not running:
+                    if pending:
+                        # 剩余阶段的依赖均无法完成
+                        blocked.update(pending)
+                        pending.clear()
+                    continue
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name, inputs = running.pop(future)
+                    stage = self.stages[name]
+                    success, elapsed = future.result()
+                    self._file_lists_stale = True
+                    outputs = self._stage_outputs(stage)
+                    if success and outputs:
+                        self.manifest.record(f"pipeline:{name}", inputs, outputs)
+                        logger.info(f"[{self.config.app_name}/{name}] 完成: {stage.description} ({elapsed:.1f}s)")
+                        done.add(name)
+                    else:
+                        logger.error(f"[{self.config.app_name}/{name}] 失败: {stage.description} "
+                                     f"({'未生成输出文件' if success else '脚本异常退出'})")
+                        blocked.add(name)
+                        all_ok = False
+                self.manifest.save()
+
+        # 试运行只报告，不写入清单（计算输入指纹时缓存的文件哈希随之丢弃）
+        if not self.dry_run:
+            self.manifest.save()
+        wanted = set(self.stages) if self.selected is None else self.selected
+        return all_ok and not (blocked & wanted)
+
+
+def run_app_pipeline(app_name: str, selected: Optional[Set[str]] = None,
+                     force: bool = False, dry_run: bool = False) -> bool:
+    """为单个应用构建独立的项目配置并运行流水线（批量模式下在进程池的工作进程中执行）"""
+    config = ProjectConfig(app_name)
+    if not config.outline:
+        logger.error(f"[{app_name}] 未能解析访谈大纲，跳过该应用")
+        return False
+    logger.info(f"开始运行流水线: 应用 '{app_name}'")
+    return PipelineRunner(config, selected=selected, force=force, dry_run=dry_run).run()
+
+
+def run_batch(app_names: List[str], selected: Optional[Set[str]] = None, force: bool = False,
+              dry_run: bool = False, jobs: int = MAX_PARALLEL_APPS) -> Dict[str, bool]:
+    """
+    在进程池中并行运行多个应用的流水线
+
+    返回:
+        Dict[str, bool]: 应用名称到是否全部完成的映射
+    """
+    results: Dict[str, bool] = {}
+    with ProcessPoolExecutor(max_workers=max(1, min(jobs, len(app_names)))) as executor:
+        futures = {executor.submit(run_app_pipeline, app_name, selected, force, dry_run): app_name
+                   for app_name in app_names}
+        for future in as_completed(futures):
+            app_name = futures[future]
+            try:
+                results[app_name] = future.result()
+            except Exception as e:
+                logger.error(f"[{app_name}] 流水线异常终止: {e}")
+                results[app_name] = False
+    return results
+
+
+def parse_arguments() -> argparse.Namespace:
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="按依赖关系运行 01-04 各阶段，只运行过期的阶段")
+    parser.add_argument('--stages', nargs='+', choices=[stage.name for stage in PIPELINE_STAGES],
+                        help="只运行指定的阶段（默认全部）")
+    parser.add_argument('--force', action='store_true', help="忽略流水线清单，运行全部选中的阶段")
+    parser.add_argument('--dry-run', action='store_true', help="只报告需要运行的阶段，不执行")
+    app_group = parser.add_mutually_exclusive_group()
+    app_group.add_argument('--apps', nargs='+', help="批量运行指定应用的流水线（默认只运行 APP_NAME）")
+    app_group.add_argument('--all-apps', action='store_true', help="批量运行数据目录下所有应用的流水线")
+    parser.add_argument('--jobs', type=int, default=MAX_PARALLEL_APPS, help="批量模式下同时处理的应用数")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_arguments()
+    selected = set(args.stages) if args.stages else None
+
+    if not (args.apps or args.all_apps):
+        config = get_project_config()
+        logger.info(f"开始运行流水线: 应用 '{config.app_name}'")
+        runner = PipelineRunner(config, selected=selected, force=args.force, dry_run=args.dry_run)
+        if not runner.run():
+            logger.error("流水线未全部完成")
+            raise SystemExit(1)
+        logger.info("流水线运行完成")
+        return
+
+    app_names = args.apps or discover_app_names()
+    if not app_names:
+        logger.error("数据目录下没有找到任何应用文件夹")
+        raise SystemExit(1)
+    logger.info(f"批量运行 {len(app_names)} 个应用的流水线: {', '.join(app_names)}")
+    results = run_batch(app_names, selected=selected, force=args.force, dry_run=args.dry_run, jobs=args.jobs)
+    failed = [app_name for app_name in app_names if not results.get(app_name)]
+    if failed:
+        logger.error(f"以下应用的流水线未全部完成: {', '.join(failed)}")
+        raise SystemExit(1)
+    logger.info("全部应用的流水线运行完成")
+
+
+if __name__ == "__main__":
+    main()
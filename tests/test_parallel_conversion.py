@@ -0,0 +1,56 @@
+"""
+03 阶段并行转换一致性测试
+
+对每个已有合并JSON的应用，分别以串行和多进程执行 MaxQDA 转换，校验两者输出逐字节一致。
+03 脚本在导入时按 PIPELINE_APP_NAME 确定当前应用，因此每个应用的转换在独立的子进程中执行；
+两次转换各自使用独立的内存缓存，不读写磁盘缓存和输出文件。
+"""
+
+import os
+import sys
+import subprocess
+
+import pytest
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from parameters import APP_NAME_ENV_VAR, ProjectConfig, discover_app_names  # noqa: E402
+
+PARALLEL_WORKERS = 3
+
+# 在子进程中执行：加载当前应用的数据，将串行与并行转换结果分别写入 argv 指定的文件
+CONVERSION_SCRIPT = """
+import sys
+import importlib
+maxqda = importlib.import_module('03inductive_create_maxqda_themecode')
+llm_data, original_data, csv_headers = maxqda.load_data(
+    maxqda.get_path('inductive_merged_json'), maxqda.get_path('UI'))
+assert llm_data and original_data and csv_headers, "数据加载失败"
+id_column = csv_headers[0]
+for workers, output_path in ((1, sys.argv[1]), (int(sys.argv[3]), sys.argv[2])):
+    text = maxqda.run_maxqda_conversion(llm_data, original_data, csv_headers, id_column,
+                                        questions_to_skip_coding=[id_column], workers=workers)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+"""
+
+
+def _apps_with_merged_json():
+    return [app_name for app_name in discover_app_names()
+            if os.path.exists(ProjectConfig(app_name).file_dir['inductive_merged_json'])]
+
+
+@pytest.mark.parametrize('app_name', _apps_with_merged_json())
+def test_parallel_conversion_matches_serial(app_name, tmp_path):
+    serial_path = tmp_path / 'serial.txt'
+    parallel_path = tmp_path / 'parallel.txt'
+    env = dict(os.environ, **{APP_NAME_ENV_VAR: app_name})
+    subprocess.run(
+        [sys.executable, '-c', CONVERSION_SCRIPT, str(serial_path), str(parallel_path), str(PARALLEL_WORKERS)],
+        cwd=PROJECT_ROOT, env=env, check=True, capture_output=True
+    )
+
+    serial_bytes = serial_path.read_bytes()
+    assert serial_bytes, f"{app_name} 串行转换输出为空"
+    assert parallel_path.read_bytes() == serial_bytes